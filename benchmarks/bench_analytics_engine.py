@@ -0,0 +1,138 @@
+"""
+内存统计引擎基准测试
+生成多年的模拟账本数据，分别用 SQLite 日汇总表查询（关闭查询缓存）和内存列式统计引擎
+计算同一组多年区间统计，核对两者结果一致并比较耗时；另外记录引擎的首次读取和增量更新耗时。
+
+用法: python benchmarks/bench_analytics_engine.py [--rows 200000] [--years 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database_manager import DatabaseManager
+
+
+CATEGORIES = [
+    ("支出", "餐饮", "外卖"), ("支出", "餐饮", "食堂"), ("支出", "交通", "地铁"),
+    ("支出", "购物", "日用品"), ("支出", "生活缴费", "房租"), ("支出", "娱乐", "电影"),
+    ("收入", "薪资", "工作薪资"), ("收入", "理财", "存款利息"),
+]
+ACCOUNTS = ["现金", "微信"]
+
+
+def populate(db, rows, years):
+    """批量写入模拟交易数据，返回账本ID"""
+    db.add_ledger("基准测试账本", "个人", "")
+    ledger_id = db.get_ledgers()[0][0]
+    start = date.today() - timedelta(days=365 * years)
+    rng = random.Random(42)
+    batch = []
+    for _ in range(rows):
+        transaction_type, category, subcategory = rng.choice(CATEGORIES)
+        amount = rng.randint(100, 50000) / 100
+        if transaction_type == "支出":
+            amount = -amount
+        day = start + timedelta(days=rng.randrange(365 * years))
+        refund = rng.choice([0.0] * 9 + [1.5])
+        batch.append((ledger_id, day.strftime("%Y-%m-%d"), transaction_type, category, subcategory,
+                      amount, rng.choice(ACCOUNTS), "", rng.random() < 0.3, refund, ""))
+    db.add_transactions_bulk(batch)
+    return ledger_id
+
+
+def normalize(result):
+    """把查询结果转换为可比较的形式（sqlite3.Row 转为元组，列表按内容排序）"""
+    if isinstance(result, list):
+        return sorted(tuple(item) for item in result)
+    if hasattr(result, 'categories'):
+        return (result.gross_income, result.total_refund, result.gross_expense, result.expense_refund,
+                result.settled_amount, result.unsettled_amount, result.expense_count, result.refund_count,
+                sorted(result.accounts), {key: sorted(value) for key, value in result.categories.items()})
+    return result
+
+
+def time_call(call, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内存统计引擎基准测试")
+    parser.add_argument("--rows", type=int, default=200000, help="模拟交易记录数")
+    parser.add_argument("--years", type=int, default=8, help="数据覆盖的年数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bookkeeping_bench_")
+    # 关闭查询缓存，测量每次实际执行 SQL 的耗时
+    db = DatabaseManager(os.path.join(workdir, "bench.db"), query_cache_entries=0, analytics=True)
+    started = time.perf_counter()
+    ledger_id = populate(db, args.rows, args.years)
+    print(f"写入 {args.rows} 条记录耗时 {time.perf_counter() - started:.1f}s")
+
+    engine = db.analytics
+    started = time.perf_counter()
+    engine.get_statistics_summary("2000-01-01", "2000-01-01")
+    print(f"统计引擎首次读取耗时 {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    today = date.today()
+    end = today.strftime("%Y-%m-%d")
+    all_start = (today - timedelta(days=365 * args.years)).strftime("%Y-%m-%d")
+    year_start = (today - timedelta(days=365)).strftime("%Y-%m-%d")
+
+    cases = []
+    for scope, lid in (("账本", ledger_id), ("全部", None)):
+        for span, start in (("全部年份", all_start), ("近一年", year_start)):
+            label = f"{scope}/{span}"
+            cases += [
+                (f"get_statistics_summary[{label}]", "get_statistics_summary", (start, end, lid)),
+                (f"get_category_statistics(sub)[{label}]", "get_category_statistics", (start, end, "支出", "sub", lid)),
+                (f"get_account_statistics[{label}]", "get_account_statistics", (start, end, lid)),
+                (f"get_settlement_statistics[{label}]", "get_settlement_statistics", (start, end, lid)),
+                (f"get_refund_statistics[{label}]", "get_refund_statistics", (start, end, lid)),
+                (f"get_week_trends[{label}]", "get_week_trends", (start, end, lid)),
+                (f"get_period_snapshot[{label}]", "get_period_snapshot", (start, end, lid)),
+            ]
+
+    mismatches = 0
+    sql_total = engine_total = 0.0
+    print(f"\n{'方法':<48}{'SQLite(ms)':>12}{'引擎(ms)':>10}{'加速':>8}")
+    for name, method, call_args in cases:
+        sql_call = lambda: getattr(db, method)(*call_args)
+        engine_call = lambda: getattr(engine, method)(*call_args)
+        same = normalize(sql_call()) == normalize(engine_call())
+        mismatches += 0 if same else 1
+        sql_ms = time_call(sql_call)
+        engine_ms = time_call(engine_call)
+        sql_total += sql_ms
+        engine_total += engine_ms
+        mark = "" if same else "  !! 结果不一致"
+        print(f"{name:<48}{sql_ms:>12.2f}{engine_ms:>10.2f}{sql_ms / engine_ms:>7.1f}x{mark}")
+    print(f"{'合计':<48}{sql_total:>12.2f}{engine_total:>10.2f}{sql_total / engine_total:>7.1f}x")
+
+    # 增量更新：写入一条记录后的第一次查询包含按变更事件更新列数组的耗时
+    updates = []
+    for i in range(20):
+        db.add_transaction(ledger_id, end, "支出", "餐饮", "外卖", -1.0 - i, "现金", "", False, 0.0, "")
+        started = time.perf_counter()
+        engine.get_statistics_summary(all_start, end, ledger_id)
+        updates.append(time.perf_counter() - started)
+    print(f"\n单条写入后增量更新并查询耗时 {sorted(updates)[len(updates) // 2] * 1000:.2f}ms（中位数）")
+
+    db.cleanup_all_connections()
+    print(f"{len(cases) - mismatches}/{len(cases)} 个统计结果与 SQLite 一致")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
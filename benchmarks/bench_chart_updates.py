@@ -0,0 +1,80 @@
+"""
+图表刷新基准测试
+模拟统计页面的连续刷新（金额变化、类别不变），比较每次新建 Figure 重新绘制
+与复用图形对象原地更新（render_chart）两种方式绘制三张圆环图和周折线图的耗时。
+
+用法: python benchmarks/bench_chart_updates.py [--refreshes 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from chart_rendering import PieChart, TrendChart, render_chart
+from chart_utils import ChartUtils
+
+PIE_SIZE = (400, 300)
+TREND_SIZE = (1000, 600)
+
+
+def make_specs(step, theme):
+    """第 step 次刷新的图表描述：各项金额随刷新变化，类别和日期不变"""
+    income = PieChart("收入结构", [8000 + step * 10, 1200, 300], ["工资", "理财", "其他"], theme)
+    expense = PieChart("支出结构", [1500 + step * 7, 900, 640, 420, 300, 180, 120, 60],
+                       ["餐饮", "购物", "交通", "娱乐", "居住", "医疗", "教育", "其他"], theme)
+    account = PieChart("账户分布", [5200, 3100 + step * 5, 2400, 900], ["现金", "微信", "支付宝", "银行卡"], theme)
+    dates = [f"01-{day:02d}" for day in range(1, 8)]
+    incomes = [0, 8000 + step * 10, 0, 300, 0, 1200, 0]
+    expenses = [120 + step, 340, 80, 910, 60, 450, 230]
+    trend = TrendChart("本周每日收支趋势", dates, incomes, expenses,
+                       [i - e for i, e in zip(incomes, expenses)], "本周暂无数据", theme)
+    return [(income, PIE_SIZE), (expense, PIE_SIZE), (account, PIE_SIZE), (trend, TREND_SIZE)]
+
+
+def rebuild(spec, size):
+    """每次新建 Figure 完整绘制（原来的刷新方式）"""
+    width, height = size
+    figure = Figure(figsize=(width / 100, height / 100), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    if isinstance(spec, PieChart):
+        ChartUtils.create_pie_chart(figure, spec.values, spec.labels, spec.title, theme=spec.theme)
+    else:
+        ChartUtils.create_trend_chart(figure, spec.dates, spec.incomes, spec.expenses, spec.net_incomes,
+                                      spec.title, spec.empty_text, spec.theme)
+    canvas.draw()
+
+
+def reuse(spec, size):
+    render_chart(spec, size[0], size[1], 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图表刷新基准测试")
+    parser.add_argument("--refreshes", type=int, default=20, help="模拟刷新次数")
+    args = parser.parse_args()
+    # 测试环境可能没有中文字体，忽略缺字警告
+    warnings.filterwarnings("ignore")
+
+    theme = ChartUtils.theme_colors()
+    print(f"{'图表':<12}{'重新创建(ms)':>14}{'原地更新(ms)':>14}{'加速':>8}")
+    for index in range(4):
+        timings = []
+        for draw in (rebuild, reuse):
+            draw(*make_specs(0, theme)[index])  # 预热：字体缓存和首次创建
+            started = time.perf_counter()
+            for step in range(1, args.refreshes + 1):
+                draw(*make_specs(step, theme)[index])
+            timings.append((time.perf_counter() - started) * 1000 / args.refreshes)
+        title = make_specs(0, theme)[index][0].title
+        print(f"{title:<12}{timings[0]:>14.1f}{timings[1]:>14.1f}{timings[0] / timings[1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+实时区间汇总基准测试
+生成多年的模拟账本数据，比较日汇总表上的区间快照查询（关闭查询缓存）与树状数组实时汇总的耗时，
+核对两者结果一致；再逐条写入、修改、删除记录，测量每次写入后刷新汇总卡片和完整快照的耗时。
+
+用法: python benchmarks/bench_live_aggregates.py [--rows 200000] [--years 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database_manager import DatabaseManager
+from period_snapshot import PeriodSnapshot
+from bench_analytics_engine import populate, normalize, time_call
+
+# 先在日汇总表上按整数键分组，再关联类别和账户名称，结果行数与区间天数无关
+_SNAPSHOT_SQL = '''
+    SELECT s.transaction_type, c.parent_category, c.sub_category, a.name as account, s.is_settled,
+           s.income, s.expense, s.refund_amount, s.count, s.refund_count
+    FROM (
+        SELECT transaction_type, category_id, account_id, is_settled,
+               SUM(income) as income, SUM(expense) as expense,
+               SUM(refund_amount) as refund_amount,
+               SUM(txn_count) as count, SUM(refund_count) as refund_count
+        FROM daily_rollups
+        WHERE rollup_date BETWEEN ? AND ? {ledger_filter}
+        GROUP BY transaction_type, category_id, account_id, is_settled
+    ) s
+    JOIN categories c ON c.id = s.category_id
+    LEFT JOIN accounts a ON a.id = s.account_id
+'''
+
+
+def query_period_snapshot(db, start_date, end_date, ledger_id=None):
+    """在日汇总表上一次查询得到区间统计快照，用于与实时区间汇总比较耗时和核对结果"""
+    params = (start_date, end_date) + ((ledger_id,) if ledger_id else ())
+    sql = _SNAPSHOT_SQL.format(ledger_filter="AND ledger_id = ?" if ledger_id else "")
+    with db.get_read_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return PeriodSnapshot.from_rows(start_date, end_date, ledger_id, rows)
+
+
+def median_us(samples):
+    return sorted(samples)[len(samples) // 2] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时区间汇总基准测试")
+    parser.add_argument("--rows", type=int, default=200000, help="模拟交易记录数")
+    parser.add_argument("--years", type=int, default=8, help="数据覆盖的年数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bookkeeping_bench_")
+    # 关闭查询缓存，测量每次实际执行 SQL 的耗时
+    db = DatabaseManager(os.path.join(workdir, "bench.db"), query_cache_entries=0)
+    started = time.perf_counter()
+    ledger_id = populate(db, args.rows, args.years)
+    print(f"写入 {args.rows} 条记录耗时 {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    db.get_period_totals("2000-01-01", "2000-01-01")
+    print(f"实时区间汇总首次构建耗时 {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    today = date.today()
+    end = today.strftime("%Y-%m-%d")
+    all_start = (today - timedelta(days=365 * args.years)).strftime("%Y-%m-%d")
+    month_start = today.strftime("%Y-%m-01")
+
+    mismatches = 0
+    print(f"\n{'区间':<24}{'SQLite(ms)':>12}{'实时汇总(ms)':>14}{'加速':>8}")
+    for label, start, lid in (("账本/全部年份", all_start, ledger_id), ("全部/全部年份", all_start, None),
+                              ("账本/本月", month_start, ledger_id)):
+        sql_call = lambda: query_period_snapshot(db, start, end, lid)
+        live_call = lambda: db.get_period_snapshot(start, end, lid)
+        same = normalize(sql_call()) == normalize(live_call())
+        mismatches += 0 if same else 1
+        sql_ms = time_call(sql_call)
+        live_ms = time_call(live_call)
+        mark = "" if same else "  !! 结果不一致"
+        print(f"{label:<24}{sql_ms:>12.2f}{live_ms:>14.3f}{sql_ms / live_ms:>7.0f}x{mark}")
+
+    # 逐条写入：每次写入后的第一次查询包含按变更事件更新树状数组的耗时
+    with db.get_read_connection() as conn:
+        record_ids = [row[0] for row in conn.execute('SELECT id FROM transactions ORDER BY id LIMIT 200')]
+    totals, snapshots = [], []
+    for i, record_id in enumerate(record_ids):
+        db.add_transaction(ledger_id, end, "支出", "餐饮", "外卖", -1.0 - i, "现金", "", False, 0.0, "")
+        started = time.perf_counter()
+        db.get_period_totals(all_start, end, ledger_id)
+        totals.append(time.perf_counter() - started)
+        db.update_transaction(record_id, end, "支出", "交通", "地铁",
+                              -2.0 - i, "微信", "", True, 0.5, "")
+        started = time.perf_counter()
+        db.get_period_snapshot(all_start, end, ledger_id)
+        snapshots.append(time.perf_counter() - started)
+    print(f"\n单条写入后刷新汇总卡片耗时 {median_us(totals):.0f}µs（中位数）")
+    print(f"单条修改后刷新完整快照耗时 {median_us(snapshots):.0f}µs（中位数）")
+
+    same = normalize(query_period_snapshot(db, all_start, end, ledger_id)) == \
+        normalize(db.get_period_snapshot(all_start, end, ledger_id))
+    mismatches += 0 if same else 1
+    db.cleanup_all_connections()
+    print("写入后结果与 SQLite 一致" if same else "!! 写入后结果与 SQLite 不一致")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
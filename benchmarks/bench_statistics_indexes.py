@@ -0,0 +1,126 @@
+"""
+统计查询索引基准测试
+生成模拟账本数据，捕获各统计方法实际执行的SQL，
+用 EXPLAIN QUERY PLAN 检查是否由覆盖索引或日汇总表主键直接完成（index-only scan），并记录耗时。
+
+用法: python benchmarks/bench_statistics_indexes.py [--rows 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database_manager import DatabaseManager
+
+
+CATEGORIES = [
+    ("支出", "餐饮", "外卖"), ("支出", "餐饮", "食堂"), ("支出", "交通", "地铁"),
+    ("支出", "购物", "日用品"), ("支出", "生活缴费", "房租"),
+    ("收入", "薪资", "工作薪资"), ("收入", "理财", "存款利息"),
+]
+ACCOUNTS = ["现金", "微信"]
+
+
+def populate(db, rows, years=5):
+    """写入模拟交易数据，返回账本ID"""
+    db.add_ledger("基准测试账本", "个人", "")
+    ledger_id = db.get_ledgers()[0][0]
+    start = date.today() - timedelta(days=365 * years)
+    rng = random.Random(42)
+    for _ in range(rows):
+        transaction_type, category, subcategory = rng.choice(CATEGORIES)
+        amount = rng.randint(100, 50000) / 100
+        if transaction_type == "支出":
+            amount = -amount
+        day = start + timedelta(days=rng.randrange(365 * years))
+        refund = rng.choice([0.0] * 9 + [1.5])
+        db.add_transaction(ledger_id, day.strftime("%Y-%m-%d"), transaction_type, category, subcategory,
+                           amount, rng.choice(ACCOUNTS), "", rng.random() < 0.3, refund, "")
+    db.add_budget(ledger_id, "餐饮", "monthly", 3000.0)
+    return ledger_id
+
+
+def capture_statements(db, call):
+    """执行一次统计方法，返回它在读连接上执行的SQL（参数已展开）"""
+    statements = []
+    with db.get_read_connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        with db.get_read_connection() as conn:
+            conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def query_plan(db, sql):
+    with db.get_read_connection() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def time_call(call, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计查询索引基准测试")
+    parser.add_argument("--rows", type=int, default=50000, help="模拟交易记录数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bookkeeping_bench_")
+    # 关闭查询缓存，否则重复调用只测到缓存命中
+    db = DatabaseManager(os.path.join(workdir, "bench.db"), query_cache_entries=0)
+    started = time.perf_counter()
+    ledger_id = populate(db, args.rows)
+    print(f"写入 {args.rows} 条记录耗时 {time.perf_counter() - started:.1f}s")
+
+    today = date.today()
+    year_start = today.replace(month=1, day=1).strftime("%Y-%m-%d")
+    end = today.strftime("%Y-%m-%d")
+    week_start = (today - timedelta(days=6)).strftime("%Y-%m-%d")
+
+    cases = []
+    for scope, lid in (("账本", ledger_id), ("全部", None)):
+        cases += [
+            (f"get_statistics_summary[{scope}]", lambda lid=lid: db.get_statistics_summary(year_start, end, lid)),
+            (f"get_category_statistics(parent)[{scope}]",
+             lambda lid=lid: db.get_category_statistics(year_start, end, "支出", "parent", lid)),
+            (f"get_category_statistics(sub)[{scope}]",
+             lambda lid=lid: db.get_category_statistics(year_start, end, "支出", "sub", lid)),
+            (f"get_account_statistics[{scope}]", lambda lid=lid: db.get_account_statistics(year_start, end, lid)),
+            (f"get_settlement_statistics[{scope}]", lambda lid=lid: db.get_settlement_statistics(year_start, end, lid)),
+            (f"get_refund_statistics[{scope}]", lambda lid=lid: db.get_refund_statistics(year_start, end, lid)),
+            (f"get_week_trends[{scope}]", lambda lid=lid: db.get_week_trends(week_start, end, lid)),
+        ]
+    cases.append(("get_budget_progress", lambda: db.get_budget_progress(ledger_id, "餐饮", "monthly", end)))
+
+    failures = 0
+    print(f"\n{'方法':<44}{'耗时(ms)':>10}  查询计划")
+    for name, call in cases:
+        plans = []
+        for sql in capture_statements(db, call):
+            plans += [p for p in query_plan(db, sql) if "transactions" in p or "daily_rollups" in p]
+        # daily_rollups 是 WITHOUT ROWID 表，按主键查找本身就是只读索引
+        covered = bool(plans) and all("COVERING INDEX" in p or "PRIMARY KEY" in p for p in plans)
+        failures += 0 if covered else 1
+        mark = "OK " if covered else "!! "
+        print(f"{name:<44}{time_call(call):>10.2f}  {mark}{' | '.join(plans)}")
+
+    db.cleanup_all_connections()
+    print(f"\n{len(cases) - failures}/{len(cases)} 个统计方法由覆盖索引或日汇总表完成")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
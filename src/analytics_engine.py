@@ -0,0 +1,507 @@
+"""
+内存列式统计引擎
+把全部交易记录一次性读入 NumPy 列数组（日期为整数日序号，金额为整数分，类别和账户为字典编码的整数），
+区间统计用向量化的条件掩码和 bincount 完成，不再对 SQLite 反复执行 GROUP BY。
+写入提交后根据变更事件只重新读取改动的记录，列数组随之增量更新。
+
+统计方法与 DatabaseManager 中的同名方法参数和返回格式一致，可以直接替换使用。
+只能感知本进程经 DatabaseManager 发布了变更事件的写入，用其他方式修改数据库后需调用 invalidate()。
+
+图形界面不使用本引擎：界面的区间统计由实时区间汇总（见 live_aggregates 模块）按前缀和求出，
+比对全部记录做掩码扫描更快，也不必把整张交易表常驻内存。本引擎供脚本和基准测试
+（benchmarks/bench_analytics_engine.py）通过 DatabaseManager(analytics=True) 启用。
+"""
+
+import threading
+
+import numpy as np
+
+from money import Money
+from period_snapshot import PeriodSnapshot
+from change_events import TRANSACTION_ADDED, TRANSACTION_DELETED, ACCOUNT_CHANGED, LEDGER_CHANGED
+
+
+# 收支类型编码
+INCOME, EXPENSE, OTHER = 0, 1, 2
+_TYPE_NAMES = {INCOME: "收入", EXPENSE: "支出"}
+_TYPE_CODES = {name: code for code, name in _TYPE_NAMES.items()}
+
+# 别名不在 MONEY_COLUMNS 中，金额保持整数分
+_SELECT_TRANSACTIONS = '''
+    SELECT id, ledger_id, transaction_date,
+           CASE transaction_type WHEN '收入' THEN 0 WHEN '支出' THEN 1 ELSE 2 END,
+           category_id, COALESCE(account_id, 0),
+           amount AS amount_cents, COALESCE(refund_amount, 0) AS refund_cents,
+           CASE WHEN is_settled = 1 THEN 1 ELSE 0 END
+    FROM transactions
+'''
+
+# 列名与数据类型，顺序与 _SELECT_TRANSACTIONS 的结果列一致
+_COLUMNS = (
+    ('id', np.int64), ('ledger', np.int64), ('day', np.int32), ('type', np.int8),
+    ('category', np.int32), ('account', np.int32), ('amount', np.int64), ('refund', np.int64),
+    ('settled', np.int8),
+)
+
+# 未排序的新增行超过该行数（且超过已排序行数的 1/8）时合并排序
+_MIN_MERGE_ROWS = 1024
+
+
+def day_number(date_str):
+    """把 yyyy-MM-dd 转换为整数日序号（自 1970-01-01 起的天数）"""
+    return int(np.datetime64(date_str, 'D').astype(np.int64))
+
+
+def _day_numbers(dates):
+    return np.array(dates, dtype='datetime64[D]').astype(np.int32)
+
+
+def _exclude(codes, keep, size):
+    """keep 为 False 的行归入编号为 size 的额外分组，统计后丢弃"""
+    return codes if keep is None else np.where(keep, codes, size)
+
+
+def _both(keep, condition):
+    return condition if keep is None else keep & condition
+
+
+def _bincount(codes, weights, size):
+    """按编码分组求和（weights 为 None 时计数），只返回前 size 个分组
+
+    金额为整数分，在 2**53 以内 float64 累加没有误差。
+    """
+    if weights is None:
+        return np.bincount(codes, minlength=size + 1)[:size]
+    totals = np.bincount(codes, weights=weights, minlength=size + 1)[:size]
+    return np.rint(totals).astype(np.int64)
+
+
+def _split_amount(amount):
+    """把原始金额拆分为正数部分和负数部分的绝对值，与日汇总表的 income / expense 对应"""
+    return np.where(amount > 0, amount, 0), np.where(amount < 0, -amount, 0)
+
+
+class _Dictionary:
+    """数据库ID到连续整数编码的字典
+
+    编码只增不减，已删除的ID保留编码、名称置为 None，列数组中的编码因此始终有效。
+    """
+
+    def __init__(self):
+        self.codes = {}   # 数据库ID -> 编码
+        self.names = []   # 编码 -> 名称（或名称元组）
+
+    def __len__(self):
+        return len(self.names)
+
+    def update(self, rows):
+        """按数据库中现有的 (ID, 名称) 行刷新，新的ID追加编码"""
+        present = set()
+        for record_id, name in rows:
+            present.add(record_id)
+            if record_id in self.codes:
+                self.names[self.codes[record_id]] = name
+            else:
+                self.codes[record_id] = len(self.names)
+                self.names.append(name)
+        for record_id, code in self.codes.items():
+            if record_id not in present:
+                self.names[code] = None
+
+
+class AnalyticsEngine:
+    """内存列式统计引擎
+
+    列数组的前 _sorted 行按日期排序，日期区间由两次二分查找得到连续切片；
+    新增或修改的记录追加在末尾（原位置标记为无效），积累到一定数量或无效行过半时重新排序合并。
+    首次查询时读入全部交易记录，之后每次查询前先处理积压的变更事件：
+    单条记录的增改按ID重新读取，删除直接标记，批量导入按ID水位读取新增的记录，
+    账本变化时整体重新读取。
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        # 暂存的变更事件使用单独的锁，写入线程发布事件时不必等待正在进行的统计查询
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._loaded = False
+        self._unsubscribe = db_manager.changes.subscribe(self._on_changes)
+        self._reset()
+
+    def close(self):
+        """停止接收变更事件并释放列数组"""
+        self._unsubscribe()
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def invalidate(self):
+        """丢弃全部列数组，下一次查询时重新读取"""
+        with self._lock:
+            self._loaded = False
+
+    def _reset(self):
+        self._size = 0
+        self._sorted = 0
+        self._dead = 0
+        self._index = {}       # 交易ID -> 行号
+        self._watermark = 0    # 整体读取或批量读取到的最大交易ID
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in _COLUMNS}
+        self._alive = np.zeros(0, dtype=np.bool_)
+        self._categories = _Dictionary()   # 名称为 (主类别, 子类别)
+        self._accounts = _Dictionary()
+        self._level_codes = {}             # 层级 -> (类别编码到名称编码的数组, 名称列表)
+
+    def _on_changes(self, events):
+        """变更事件在写入线程中到达，只暂存，查询时再处理"""
+        with self._pending_lock:
+            self._pending.extend(events)
+
+    # ---- 读取与增量更新
+
+    def _sync(self):
+        """保证列数组反映全部已发布的写入；调用方需持有锁"""
+        with self._pending_lock:
+            events, self._pending = self._pending, []
+        if not self._loaded:
+            self._load_all()
+            return
+        if not events:
+            return
+
+        changed_ids = {}
+        reload_accounts = False
+        load_new = False
+        for event in events:
+            if event.kind == ACCOUNT_CHANGED:
+                reload_accounts = True
+            elif event.is_transaction and event.record_id is not None:
+                changed_ids[event.record_id] = event.kind
+            elif event.kind == TRANSACTION_ADDED:
+                # 批量导入：读取水位以上的全部记录
+                load_new = True
+            elif event.kind == LEDGER_CHANGED or event.is_transaction:
+                self._load_all()
+                return
+
+        deleted = [record_id for record_id, kind in changed_ids.items() if kind == TRANSACTION_DELETED]
+        refetch = [record_id for record_id, kind in changed_ids.items() if kind != TRANSACTION_DELETED]
+        rows = []
+        with self.db_manager.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            if reload_accounts:
+                self._refresh_accounts(cursor)
+            if load_new:
+                cursor.execute(_SELECT_TRANSACTIONS + ' WHERE id > ?', (self._watermark,))
+                rows = cursor.fetchall()
+            for start in range(0, len(refetch), 500):
+                chunk = refetch[start:start + 500]
+                cursor.execute(_SELECT_TRANSACTIONS + f" WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                rows += cursor.fetchall()
+            if rows:
+                self._refresh_dictionaries(cursor, rows)
+
+        # 修改过的记录先删除原来的行，再和新增记录一起追加到末尾
+        rows = list({row[0]: row for row in rows}.values())
+        for record_id in deleted + refetch + [row[0] for row in rows]:
+            self._remove(record_id)
+        if rows:
+            self._append(rows)
+            if load_new:
+                self._watermark = max(self._watermark, max(row[0] for row in rows))
+
+        unsorted = self._size - self._sorted
+        if self._dead * 2 > self._size or unsorted > max(_MIN_MERGE_ROWS, self._sorted // 8):
+            self._merge()
+
+    def _load_all(self):
+        """整体读取全部交易记录"""
+        self._reset()
+        with self.db_manager.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            self._refresh_categories(cursor)
+            self._refresh_accounts(cursor)
+            # yyyy-MM-dd 格式的日期按字符串排序即按时间排序
+            cursor.execute(_SELECT_TRANSACTIONS + ' ORDER BY transaction_date, id')
+            rows = cursor.fetchall()
+
+        columns = self._encode(rows)
+        self._columns = columns
+        self._size = self._sorted = len(rows)
+        self._alive = np.ones(self._size, dtype=np.bool_)
+        self._index = dict(zip(columns['id'].tolist(), range(self._size)))
+        self._watermark = int(columns['id'].max()) if rows else 0
+        self._loaded = True
+
+    def _refresh_categories(self, cursor):
+        cursor.execute('SELECT id, parent_category, sub_category FROM categories')
+        self._categories.update((row[0], (row[1], row[2])) for row in cursor.fetchall())
+        self._level_codes = {}
+
+    def _refresh_accounts(self, cursor):
+        cursor.execute('SELECT id, name FROM accounts')
+        self._accounts.update(cursor.fetchall())
+
+    def _refresh_dictionaries(self, cursor, rows):
+        """记录引用了新建的类别或账户时先刷新字典"""
+        if any(row[4] not in self._categories.codes for row in rows):
+            self._refresh_categories(cursor)
+        if any(row[5] and row[5] not in self._accounts.codes for row in rows):
+            self._refresh_accounts(cursor)
+
+    def _encode(self, rows):
+        """把查询结果行转换为列数组，类别ID和账户ID替换为字典编码"""
+        if rows:
+            ids, ledgers, dates, types, categories, accounts, amounts, refunds, settled = zip(*rows)
+        else:
+            ids = ledgers = dates = types = categories = accounts = amounts = refunds = settled = ()
+        category_code = self._categories.codes
+        account_code = self._accounts.codes
+        values = {
+            'id': ids, 'ledger': ledgers, 'day': _day_numbers(dates), 'type': types,
+            'category': [category_code.get(category_id, -1) for category_id in categories],
+            'account': [account_code.get(account_id, -1) for account_id in accounts],
+            'amount': amounts, 'refund': refunds, 'settled': settled,
+        }
+        return {name: np.asarray(values[name], dtype=dtype) for name, dtype in _COLUMNS}
+
+    def _append(self, rows):
+        """把记录追加到未排序部分"""
+        encoded = self._encode(rows)
+        start, end = self._size, self._size + len(rows)
+        self._grow(end)
+        for name, _dtype in _COLUMNS:
+            self._columns[name][start:end] = encoded[name]
+        self._alive[start:end] = True
+        self._index.update(zip(encoded['id'].tolist(), range(start, end)))
+        self._size = end
+
+    def _grow(self, size):
+        """按倍数扩大列数组容量"""
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, _MIN_MERGE_ROWS)
+        for name, dtype in _COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+        alive = np.zeros(capacity, dtype=np.bool_)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+
+    def _remove(self, record_id):
+        position = self._index.pop(record_id, None)
+        if position is not None:
+            self._alive[position] = False
+            self._dead += 1
+
+    def _merge(self):
+        """去掉无效行，全部行按日期重新排序"""
+        keep = np.flatnonzero(self._alive[:self._size])
+        keep = keep[np.argsort(self._columns['day'][keep], kind='stable')]
+        for name, _dtype in _COLUMNS:
+            self._columns[name] = self._columns[name][keep]
+        self._size = self._sorted = len(keep)
+        self._alive = np.ones(self._size, dtype=np.bool_)
+        self._index = dict(zip(self._columns['id'].tolist(), range(self._size)))
+        self._dead = 0
+
+    # ---- 查询
+
+    def _select(self, start_date, end_date, ledger_id, names):
+        """取出日期区间内各行的指定列，返回 (列字典, 保留掩码)
+
+        已排序部分按二分查找得到切片，未排序部分按日期筛选后拼接在后面；
+        保留掩码标记有效且属于指定账本的行，全部保留时为 None。
+        调用方需在持有锁时调用；返回的数组都是副本而不是列数组的视图，
+        释放锁之后再做 bincount 等计算，不会读到其他线程同时写入的增量更新或删除标记。
+        """
+        self._sync()
+        first, last = day_number(start_date), day_number(end_date)
+        day = self._columns['day']
+        lo, hi = np.searchsorted(day[:self._sorted], (first, last + 1)).tolist()
+        tail_day = day[self._sorted:self._size]
+        tail = self._sorted + np.flatnonzero((tail_day >= first) & (tail_day <= last))
+
+        def take(column):
+            if len(tail) == 0:
+                return column[lo:hi].copy()
+            return np.concatenate((column[lo:hi], column[tail]))
+
+        rows = {name: take(self._columns[name]) for name in names}
+        keep = take(self._alive) if self._dead else None
+        if ledger_id:
+            keep = _both(keep, take(self._columns['ledger']) == ledger_id)
+        return rows, keep
+
+    def _level(self, level):
+        """类别编码到某一层级名称编码的映射，返回 (映射数组, 名称列表)"""
+        level = "parent" if level == "parent" else "sub"
+        if level not in self._level_codes:
+            names = {}
+            codes = np.zeros(max(len(self._categories), 1), dtype=np.int64)
+            for code, name in enumerate(self._categories.names):
+                label = None if name is None else name[0 if level == "parent" else 1]
+                codes[code] = names.setdefault(label, len(names))
+            self._level_codes[level] = (codes, list(names))
+        return self._level_codes[level]
+
+    def get_statistics_summary(self, start_date, end_date, ledger_id=None):
+        """获取收支汇总统计"""
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('type', 'amount', 'refund'))
+        codes = _exclude(rows['type'], keep, 3)
+        amounts = _bincount(codes, rows['amount'], 3)
+        refunds = _bincount(codes, rows['refund'], 3)
+        gross_income = Money(int(amounts[INCOME]))
+        total_refund = Money(int(refunds[INCOME]))
+        gross_expense = Money(int(amounts[EXPENSE]))
+        expense_refund = Money(int(refunds[EXPENSE]))
+
+        actual_income = gross_income - total_refund
+        actual_expense = gross_expense - expense_refund
+        return {
+            'gross_income': gross_income,
+            'total_refund': total_refund,
+            'actual_income': actual_income,
+            'gross_expense': gross_expense,
+            'expense_refund': expense_refund,
+            'actual_expense': actual_expense,
+            'net_income': actual_income - actual_expense,
+            'total_income': actual_income,
+            'total_expense': actual_expense
+        }
+
+    def get_category_statistics(self, start_date, end_date, transaction_type, level="parent", ledger_id=None):
+        """获取类别统计，返回 [(名称, 金额, 笔数), ...]，按金额降序"""
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('type', 'category', 'amount'))
+            level_codes, names = self._level(level)
+        category = rows['category']
+        keep = _both(keep, (rows['type'] == _TYPE_CODES.get(transaction_type, OTHER)) & (category >= 0))
+        codes = _exclude(level_codes[category], keep, len(names))
+        amounts = _bincount(codes, np.abs(rows['amount']), len(names))
+        counts = _bincount(codes, None, len(names))
+        return sorted(
+            ((names[code], Money(int(amounts[code])), int(counts[code]))
+             for code in np.flatnonzero(counts).tolist() if names[code] is not None),
+            key=lambda item: item[1], reverse=True)
+
+    def get_account_statistics(self, start_date, end_date, ledger_id=None):
+        """获取账户统计，返回 [(账户, 收入, 支出, 笔数), ...]，按收支金额之和降序"""
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('account', 'amount'))
+            names = list(self._accounts.names)
+        account = rows['account']
+        codes = _exclude(account, _both(keep, account >= 0), len(names))
+        income, expense = _split_amount(rows['amount'])
+        incomes = _bincount(codes, income, len(names))
+        expenses = _bincount(codes, expense, len(names))
+        counts = _bincount(codes, None, len(names))
+        return sorted(
+            ((names[code], Money(int(incomes[code])), Money(int(expenses[code])), int(counts[code]))
+             for code in np.flatnonzero(counts).tolist() if names[code] is not None),
+            key=lambda item: item[1] + item[2], reverse=True)
+
+    def get_settlement_statistics(self, start_date, end_date, ledger_id=None):
+        """获取销账状态统计"""
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('type', 'settled', 'amount'))
+        codes = _exclude(rows['settled'], _both(keep, rows['type'] == EXPENSE), 2)
+        amounts = _bincount(codes, np.abs(rows['amount']), 2)
+        settled_amount = Money(int(amounts[1]))
+        unsettled_amount = Money(int(amounts[0]))
+        return {
+            'settled_amount': settled_amount,
+            'unsettled_amount': unsettled_amount,
+            'total_amount': settled_amount + unsettled_amount
+        }
+
+    def get_refund_statistics(self, start_date, end_date, ledger_id=None):
+        """获取退款统计"""
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('type', 'amount', 'refund'))
+        codes = _exclude(rows['type'], keep, 3)
+        refund = rows['refund']
+        total_refund = Money(int(_bincount(codes, refund, 3)[EXPENSE]))
+        if not total_refund:
+            return {
+                'total_refund': Money(0),
+                'refund_count': 0,
+                'total_amount': Money(0),
+                'total_count': 0,
+                'refund_ratio': 0.0
+            }
+        total_amount = Money(int(_bincount(codes, np.abs(rows['amount']), 3)[EXPENSE]))
+        return {
+            'total_refund': total_refund,
+            'refund_count': int(_bincount(codes, refund > 0, 3)[EXPENSE]),
+            'total_amount': total_amount,
+            'total_count': int(_bincount(codes, None, 3)[EXPENSE]),
+            'refund_ratio': (total_refund / total_amount * 100) if total_amount > 0 else 0
+        }
+
+    def get_week_trends(self, start_date, end_date, ledger_id=None):
+        """获取区间内每日收支趋势，返回 [(日期, 收入, 支出, 笔数), ...]，按日期升序"""
+        first, last = day_number(start_date), day_number(end_date)
+        if last < first:
+            return []
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id, ('day', 'amount'))
+        days = last - first + 1
+        codes = _exclude(rows['day'] - first, keep, days)
+        income, expense = _split_amount(rows['amount'])
+        incomes = _bincount(codes, income, days)
+        expenses = _bincount(codes, expense, days)
+        counts = _bincount(codes, None, days)
+        present = np.flatnonzero(counts)
+        dates = np.datetime_as_string((present + first).astype('datetime64[D]')).tolist()
+        return [(date, Money(income), Money(expense), count)
+                for date, income, expense, count in zip(
+                    dates, incomes[present].tolist(), expenses[present].tolist(), counts[present].tolist())]
+
+    def get_period_snapshot(self, start_date, end_date, ledger_id=None):
+        """一次计算区间内的全部统计数据，返回 PeriodSnapshot
+
+        按 (收支类型, 类别, 账户, 销账状态) 的组合编码用 bincount 分组，
+        再交给 PeriodSnapshot.from_rows 汇总，结果与 DatabaseManager.get_period_snapshot 一致。
+        """
+        with self._lock:
+            rows, keep = self._select(start_date, end_date, ledger_id,
+                                      ('type', 'category', 'account', 'settled', 'amount', 'refund'))
+            categories = list(self._categories.names)
+            accounts = list(self._accounts.names)
+        category_slots = max(len(categories), 1)
+        account_slots = len(accounts) + 1  # 编码 -1（未选择或已删除的账户）占第 0 位
+        size = 3 * category_slots * account_slots * 2
+        keys = (((rows['type'].astype(np.int64) * category_slots + rows['category']) * account_slots
+                 + rows['account'] + 1) * 2 + rows['settled'])
+        codes = _exclude(keys, _both(keep, rows['category'] >= 0), size)
+        amount = rows['amount']
+        refund = rows['refund']
+        income, expense = _split_amount(amount)
+        counts = _bincount(codes, None, size)
+        present = np.flatnonzero(counts)
+        incomes = _bincount(codes, income, size)[present]
+        expenses = _bincount(codes, expense, size)[present]
+        refunds = _bincount(codes, refund, size)[present]
+        refund_counts = _bincount(codes, refund > 0, size)[present]
+
+        grouped = []
+        for key, income, expense, refund_total, count, refund_count in zip(
+                present.tolist(), incomes.tolist(), expenses.tolist(), refunds.tolist(),
+                counts[present].tolist(), refund_counts.tolist()):
+            key, is_settled = divmod(key, 2)
+            key, account = divmod(key, account_slots)
+            transaction_type, category = divmod(key, category_slots)
+            if categories[category] is None:
+                continue
+            parent_category, sub_category = categories[category]
+            grouped.append((_TYPE_NAMES.get(transaction_type), parent_category, sub_category,
+                            accounts[account - 1] if account else None, is_settled,
+                            Money(income), Money(expense), Money(refund_total), count, refund_count))
+        return PeriodSnapshot.from_rows(start_date, end_date, ledger_id, grouped)
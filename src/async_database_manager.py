@@ -0,0 +1,133 @@
+"""
+异步数据库管理器模块
+为自动化脚本和本地接口提供 DatabaseManager 的 asyncio 封装：
+读方法在有界线程池中执行，各自使用连接池中的只读连接，WAL 模式下可以并行查询；
+写方法交给 DatabaseManager 的后台写入线程，等待其组提交完成。
+
+用法:
+    async with AsyncDatabaseManager(db_path="bookkeeping.db") as db:
+        summary, trends = await asyncio.gather(
+            db.get_statistics_summary(start, end),
+            db.get_week_trends(start, end),
+        )
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database_manager import DatabaseManager
+
+
+# 以协程形式提供的只读方法
+READ_METHODS = (
+    'get_ledgers', 'get_categories', 'get_accounts', 'get_account_balance', 'get_transfers',
+    'get_transaction', 'get_transactions', 'get_transactions_page', 'count_transactions',
+    'search_transactions', 'get_transactions_by_date_range', 'get_day_transactions',
+    'get_statistics_summary', 'get_category_statistics', 'get_account_statistics',
+    'get_settlement_statistics', 'get_refund_statistics', 'get_week_trends',
+    'get_peak_consumption_hours', 'get_period_snapshot', 'get_period_totals',
+    'get_budgets', 'get_budget_progress', 'get_all_budget_progress',
+)
+
+# 以协程形式提供的写方法，由后台写入线程执行
+WRITE_METHODS = (
+    'add_ledger', 'delete_ledger',
+    'add_transaction', 'add_transactions_bulk', 'update_transaction', 'delete_transaction',
+    'add_account', 'add_account_without_ledger', 'upsert_account', 'update_account', 'delete_account',
+    'update_account_balance', 'update_balances_bulk',
+    'add_transfer', 'update_transfer', 'delete_transfer',
+    'add_budget', 'upsert_budgets_bulk', 'update_budget', 'delete_budget', 'copy_budgets',
+)
+
+
+class _ReadCall:
+    """一次在线程池中执行的读调用，记录执行线程以便取消时中断查询"""
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.thread_id = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        with self.lock:
+            self.thread_id = threading.get_ident()
+        try:
+            return self.fn(*self.args, **self.kwargs)
+        finally:
+            with self.lock:
+                self.thread_id = None
+
+
+class AsyncDatabaseManager:
+    """DatabaseManager 的异步封装，读写方法与 DatabaseManager 同名，均为协程
+
+    读方法在最多 max_workers 个线程中并行执行，线程数不超过连接池的读连接数；
+    协程被取消时，尚未开始的查询不再执行，正在执行的查询通过 sqlite3 中断尽快结束。
+    """
+
+    def __init__(self, db_manager=None, db_path="bookkeeping.db", max_workers=None):
+        self._owns_db_manager = db_manager is None
+        self.db_manager = db_manager or DatabaseManager(db_path)
+        if max_workers is None:
+            max_workers = self.db_manager.max_readers
+        self.max_workers = max(1, min(int(max_workers), self.db_manager.max_readers))
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="AsyncDatabaseReader")
+
+    async def _read(self, fn, *args, **kwargs):
+        """在线程池中执行只读调用，取消时中断正在执行的查询"""
+        call = _ReadCall(fn, args, kwargs)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, call.run)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            with call.lock:
+                if call.thread_id is not None:
+                    self.db_manager.interrupt_reads(call.thread_id)
+            raise
+
+    async def _write(self, fn, *args, **kwargs):
+        """交给后台写入线程执行，写入并提交后返回结果；取消只对尚未执行的写操作生效"""
+        return await asyncio.wrap_future(self.db_manager.submit(fn, *args, **kwargs))
+
+    async def run_read(self, fn, *args, **kwargs):
+        """在读线程池中执行任意只读函数，例如组合多个查询的自定义统计"""
+        return await self._read(fn, *args, **kwargs)
+
+    async def close(self):
+        """关闭线程池；由本对象创建的 DatabaseManager 同时关闭其全部连接"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+        if self._owns_db_manager:
+            await loop.run_in_executor(None, self.db_manager.cleanup_all_connections)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+def _make_read_method(name):
+    async def method(self, *args, **kwargs):
+        return await self._read(getattr(self.db_manager, name), *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(DatabaseManager, name).__doc__
+    return method
+
+
+def _make_write_method(name):
+    async def method(self, *args, **kwargs):
+        return await self._write(getattr(self.db_manager, name), *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(DatabaseManager, name).__doc__
+    return method
+
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_read_method(_name))
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_write_method(_name))
+del _name
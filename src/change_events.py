@@ -0,0 +1,115 @@
+"""
+数据变更通知模块
+DatabaseManager 在每次写入提交后发布变更事件，说明改动涉及的账本、日期和账户，
+界面组件据此只刷新受影响的行、统计区间和列表，而不是在每次写入后重新加载全部页面。
+"""
+
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import NamedTuple
+
+
+# 事件类型
+TRANSACTION_ADDED = "transaction_added"
+TRANSACTION_UPDATED = "transaction_updated"
+TRANSACTION_DELETED = "transaction_deleted"
+ACCOUNT_CHANGED = "account_changed"
+TRANSFER_CHANGED = "transfer_changed"
+BUDGET_CHANGED = "budget_changed"
+LEDGER_CHANGED = "ledger_changed"
+CATEGORY_CHANGED = "category_changed"
+
+TRANSACTION_EVENTS = (TRANSACTION_ADDED, TRANSACTION_UPDATED, TRANSACTION_DELETED)
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """一次已提交的数据变更
+
+    ledger_id 为 None 表示不限于某个账本（如账户、转账）或写入时无法确定账本；
+    record_id 为 None 表示一次写入了多条记录（如批量导入）。
+    交易记录事件的 before / after 为改动前后的记录值，每项为 TransactionValues，
+    订阅者据此可以增量更新汇总数据而无需重新查询数据库。
+    generation 为该次提交完成后的写入代数，由 DatabaseManager 在发布时填写。
+    """
+
+    kind: str
+    ledger_id: int = None
+    dates: tuple = ()      # 受影响的日期（yyyy-MM-dd），修改记录时同时包含修改前后的日期
+    accounts: tuple = ()   # 受影响的账户名称
+    record_id: int = None
+    before: tuple = ()     # 修改、删除前的记录值
+    after: tuple = ()      # 新增、修改后的记录值
+    generation: int = None
+
+    @property
+    def is_transaction(self):
+        return self.kind in TRANSACTION_EVENTS
+
+    def affects_ledger(self, ledger_id):
+        """是否可能影响指定账本的数据"""
+        return self.ledger_id is None or self.ledger_id == ledger_id
+
+    def affects_dates(self, start_date, end_date):
+        """受影响的日期是否落在 [start_date, end_date] 区间内"""
+        return any(start_date <= date <= end_date for date in self.dates)
+
+
+class TransactionValues(NamedTuple):
+    """交易记录中参与统计的字段，金额为整数分"""
+
+    ledger_id: int
+    transaction_date: str
+    transaction_type: str
+    category_id: int
+    account_id: int
+    amount: int
+    is_settled: bool
+    refund_amount: int
+
+
+def _unique(values):
+    """去掉空值和重复值，保持原有顺序"""
+    return tuple(dict.fromkeys(value for value in values if value))
+
+
+def change_event(kind, ledger_id=None, dates=(), accounts=(), record_id=None, before=(), after=()):
+    """构建变更事件，日期和账户去掉空值和重复值"""
+    return ChangeEvent(kind, ledger_id, _unique(dates), _unique(accounts), record_id, tuple(before), tuple(after))
+
+
+class ChangeBus:
+    """变更事件的订阅与发布
+
+    回调在执行写入的线程中调用，参数为同一次提交产生的事件元组；
+    界面组件应通过 Qt 信号转到界面线程处理。单个回调出错不会影响写入和其他订阅者。
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """订阅变更事件，返回取消订阅的函数"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, events):
+        """向全部订阅者发布一组事件"""
+        events = tuple(events)
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception:
+                traceback.print_exc()
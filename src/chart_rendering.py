@@ -0,0 +1,440 @@
+"""
+图表后台渲染模块
+统计页面的圆环图和折线图不再在界面线程中布局、光栅化：界面线程只把数据和主题颜色
+打包成可序列化的图表描述，由工作线程（多核时为工作进程）用 Agg 后端绘制成 RGBA 位图，
+完成后以信号送回界面线程，ChartView 直接把位图画到控件上。
+Agg 绘图期间不释放 GIL，多核机器上使用进程池才能让几张图表并行绘制。
+绘制结果按图表内容和尺寸的哈希缓存（ChartImageCache），来回切换时间段或主题时
+相同的图表直接显示缓存的位图，不再经过 matplotlib。
+统计页面默认使用 native_charts 中的原生控件，本模块用于设置为 matplotlib 绘制时和导出图表。
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import astuple
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PyQt6.QtCore import QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+
+from chart_specs import PieChart, TrendChart
+from chart_utils import DonutChart, TrendLineChart
+
+
+# 图表描述对应的可复用 matplotlib 图表
+CHART_CLASSES = {PieChart: DonutChart, TrendChart: TrendLineChart}
+
+
+# 各工作线程（进程）中按图表种类和标题保存的 (画布, 可复用图表)，同一张图表的后续绘制原地更新
+_charts = threading.local()
+
+
+def _chart_slot(spec, width, height, dpi):
+    slots = getattr(_charts, 'slots', None)
+    if slots is None:
+        slots = _charts.slots = {}
+    key = (type(spec), spec.title)
+    slot = slots.get(key)
+    if slot is None:
+        figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(figure)
+        slot = slots[key] = (canvas, CHART_CLASSES[type(spec)](figure))
+    else:
+        figure = slot[0].figure
+        if figure.dpi != dpi or tuple(figure.get_size_inches()) != (width / dpi, height / dpi):
+            figure.set_dpi(dpi)
+            figure.set_size_inches(width / dpi, height / dpi, forward=False)
+    return slot
+
+
+def _drop_chart_slot(spec):
+    getattr(_charts, 'slots', {}).pop((type(spec), spec.title), None)
+
+
+def render_chart(spec, width, height, dpi):
+    """用 Agg 后端把图表描述绘制为 width x height 像素的位图，返回 (宽, 高, RGBA 字节)
+
+    不涉及任何 Qt 对象，可在工作线程或工作进程中调用。同一线程中同种图表的图形对象会复用，
+    只更新数据并重绘变化的部分。
+    """
+    canvas, chart = _chart_slot(spec, width, height, dpi)
+    try:
+        spec.apply(chart)
+        chart.draw(canvas)
+    except Exception as e:
+        # 与 ChartUtils.safe_draw_canvas 相同，绘制出错时显示错误信息；出错的图表下次重新创建
+        _drop_chart_slot(spec)
+        figure = canvas.figure
+        figure.clear()
+        ax = figure.add_subplot(111)
+        ax.text(0.5, 0.5, f'绘制错误\n{str(e)}', ha='center', va='center',
+                transform=ax.transAxes, fontsize=12, color='red')
+        ax.axis('off')
+        canvas.draw()
+    buffer = np.asarray(canvas.buffer_rgba())
+    return buffer.shape[1], buffer.shape[0], buffer.tobytes()
+
+
+def export_chart(spec, path, figsize=(8, 6), dpi=150):
+    """用 matplotlib 把图表描述保存为文件，格式由扩展名决定（png、svg、pdf 等）"""
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    chart = CHART_CLASSES[type(spec)](figure, blit=False)
+    spec.apply(chart)
+    figure.savefig(path, facecolor=figure.get_facecolor())
+
+
+class ChartRenderer:
+    """图表渲染服务
+
+    多核时使用进程池，单核时使用线程池（进程间传输位图的开销得不到并行的回报）。
+    render() 立即返回，绘制完成后在工作线程中调用 callback(结果或异常)。
+    """
+
+    def __init__(self, max_workers=None, use_processes=None):
+        cpu_count = os.cpu_count() or 1
+        if use_processes is None:
+            use_processes = cpu_count > 1
+        self.max_workers = max_workers or max(1, min(3, cpu_count))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._use_processes = use_processes
+        self._closed = False
+
+    @property
+    def uses_processes(self):
+        return self._use_processes
+
+    def _get_executor(self):
+        """按需创建执行器，调用方需持有 _lock"""
+        if self._executor is None:
+            if self._use_processes:
+                # spawn 启动的进程不继承界面进程中 Qt 的线程和锁
+                self._executor = ProcessPoolExecutor(self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='chart-render')
+        return self._executor
+
+    def _fall_back_to_threads(self, broken):
+        """进程池不可用时改用线程池"""
+        with self._lock:
+            if self._executor is broken and self._use_processes:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._use_processes = False
+
+    def render(self, spec, width, height, dpi, callback):
+        """提交一次绘制；服务已关闭时返回 False"""
+        with self._lock:
+            if self._closed:
+                return False
+            executor = self._get_executor()
+            try:
+                future = executor.submit(render_chart, spec, width, height, dpi)
+            except BrokenProcessPool:
+                future = None
+        if future is None:
+            self._fall_back_to_threads(executor)
+            return self.render(spec, width, height, dpi, callback)
+
+        def on_done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._fall_back_to_threads(executor)
+                self.render(spec, width, height, dpi, callback)
+                return
+            callback(error if error is not None else future.result())
+
+        future.add_done_callback(on_done)
+        return True
+
+    def shutdown(self, wait=True):
+        """停止服务，尚未开始的绘制直接取消"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class ChartImageCache:
+    """图表位图缓存
+
+    以图表描述（数据、标签、标题、主题颜色）、像素尺寸和 dpi 的哈希为键，
+    内存中按最近使用顺序保留不超过 max_bytes 的 QPixmap；指定 disk_dir 时
+    另在该目录保存 PNG 文件，下次启动后仍可命中，目录总大小超过 max_disk_bytes 时删除最久未用的文件。
+    只能在界面线程中使用；磁盘写入在后台线程中进行。
+    """
+
+    # 绘图代码改变时增加版本号，使旧的磁盘缓存失效
+    VERSION = 1
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = None
+        self._pixmaps = OrderedDict()
+        self._bytes = 0
+        self._writer = None
+        self._written = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.set_disk_dir(disk_dir)
+
+    @classmethod
+    def key(cls, spec, width, height, dpi):
+        """图表内容和尺寸的哈希；不依赖 Python 的 hash()，不同进程中结果相同"""
+        content = (cls.VERSION, matplotlib.__version__, type(spec).__name__, astuple(spec),
+                   width, height, round(dpi, 3))
+        return hashlib.sha256(repr(content).encode('utf-8')).hexdigest()
+
+    def set_disk_dir(self, disk_dir):
+        """启用（目录）或关闭（None）磁盘缓存"""
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self.disk_dir = disk_dir
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.png')
+
+    def get(self, key):
+        """返回缓存的 QPixmap，没有时返回 None"""
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.hits += 1
+            return pixmap
+        if self.disk_dir:
+            path = self._path(key)
+            image = QImage(path)
+            if not image.isNull():
+                try:
+                    os.utime(path)  # 记录最近使用时间，清理时保留
+                except OSError:
+                    pass
+                self.disk_hits += 1
+                pixmap = QPixmap.fromImage(image)
+                self._remember(key, pixmap)
+                return pixmap
+        self.misses += 1
+        return None
+
+    def put(self, key, image):
+        """保存绘制结果（QImage），返回对应的 QPixmap"""
+        pixmap = QPixmap.fromImage(image)
+        self._remember(key, pixmap)
+        if self.disk_dir:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(1, thread_name_prefix='chart-cache')
+            self._writer.submit(self._write, self._path(key), image)
+        return pixmap
+
+    def _remember(self, key, pixmap):
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self._bytes -= self._size(old)
+        self._pixmaps[key] = pixmap
+        self._bytes += self._size(pixmap)
+        while self._bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self._bytes -= self._size(evicted)
+
+    @staticmethod
+    def _size(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+    def _write(self, path, image):
+        """在后台线程中写入 PNG（先写临时文件再改名，读取时不会读到半个文件）"""
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            if image.save(temporary, 'PNG'):
+                os.replace(temporary, path)
+                self._written += os.path.getsize(path)
+        except OSError:
+            traceback.print_exc()
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        # 每写入约十分之一的容量检查一次目录大小
+        if self._written > self.max_disk_bytes // 10:
+            self._written = 0
+            self._prune(os.path.dirname(path))
+
+    def _prune(self, disk_dir):
+        """目录总大小超过 max_disk_bytes 时按最近使用时间删除最旧的文件"""
+        try:
+            entries = []
+            with os.scandir(disk_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.png'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空内存中的缓存"""
+        self._pixmaps.clear()
+        self._bytes = 0
+
+    def close(self):
+        """等待未完成的磁盘写入"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+class ChartView(QWidget):
+    """显示后台渲染结果的图表控件，替代 FigureCanvasQTAgg
+
+    set_chart() 按控件当前大小提交绘制，绘制完成前继续显示上一张位图；
+    控件不可见时推迟到显示时绘制，大小改变时稍作延迟后按新尺寸重新绘制。
+    指定 cache 时先查找缓存，命中则直接显示，绘制结果也存入缓存。
+    """
+
+    rendered = pyqtSignal(int, str, object)  # 工作线程发出 (请求序号, 缓存键, 结果或异常)
+
+    RESIZE_DELAY = 150  # 大小改变后重新绘制的延迟（毫秒）
+
+    def __init__(self, renderer, figsize=(4, 3), parent=None, cache=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.cache = cache
+        self.figsize = figsize
+        self._spec = None
+        self._pixmap = None
+        self._request = 0
+        self._rendered_request = 0
+        self._requested = None
+        self._dirty = False
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.timeout.connect(self._render)
+        self.rendered.connect(self._on_rendered)
+
+    @property
+    def spec(self):
+        """当前显示（或正在绘制）的图表描述"""
+        return self._spec
+
+    @property
+    def pending(self):
+        """是否还有未完成的绘制"""
+        return self._dirty or self._rendered_request != self._request
+
+    def set_chart(self, spec):
+        """显示新的图表描述"""
+        self._spec = spec
+        self._dirty = True
+        if self.isVisible():
+            self._render()
+
+    def _render(self):
+        if self._spec is None or not self.isVisible():
+            return
+        self._dirty = False
+        ratio = self.devicePixelRatioF()
+        width = max(1, round(self.width() * ratio))
+        height = max(1, round(self.height() * ratio))
+        # 图表和尺寸都没有变化时不重复绘制（例如显示时紧接着的 resizeEvent）
+        key = (self._spec, width, height, ratio)
+        if key == self._requested:
+            return
+        self._requested = key
+        self._request += 1
+        request = self._request
+        dpi = 100 * ratio
+
+        cache_key = ''
+        if self.cache is not None:
+            cache_key = self.cache.key(self._spec, width, height, dpi)
+            pixmap = self.cache.get(cache_key)
+            if pixmap is not None:
+                # 命中缓存：直接显示，仍在进行的旧绘制结果会被丢弃
+                self._rendered_request = request
+                self._show(pixmap)
+                return
+
+        def deliver(result):
+            try:
+                self.rendered.emit(request, cache_key, result)
+            except RuntimeError:
+                pass  # 控件已销毁
+
+        self.renderer.render(self._spec, width, height, dpi, deliver)
+
+    def _on_rendered(self, request, cache_key, result):
+        # 只接受比当前显示更新的结果，过期的绘制直接丢弃
+        if request <= self._rendered_request:
+            return
+        if isinstance(result, BaseException):
+            traceback.print_exception(type(result), result, result.__traceback__)
+            return
+        self._rendered_request = request
+        width, height, data = result
+        image = QImage(data, width, height, width * 4, QImage.Format.Format_RGBA8888).copy()
+        if self.cache is not None and cache_key:
+            self._show(self.cache.put(cache_key, image))
+        else:
+            self._show(QPixmap.fromImage(image))
+
+    def _show(self, pixmap):
+        pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+        self._pixmap = pixmap
+        self.update()
+
+    def pixmap(self):
+        """最近一次显示的位图"""
+        return self._pixmap
+
+    def sizeHint(self):
+        return QSize(int(self.figsize[0] * 100), int(self.figsize[1] * 100))
+
+    def minimumSizeHint(self):
+        return QSize(10, 10)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._dirty:
+            self._render()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._spec is not None:
+            self._dirty = True
+            self._resize_timer.start(self.RESIZE_DELAY)
+
+    def paintEvent(self, event):
+        if self._pixmap is None:
+            return
+        painter = QPainter(self)
+        # 新尺寸的位图绘制完成前先缩放显示旧位图
+        painter.drawPixmap(self.rect(), self._pixmap)
+        painter.end()
@@ -0,0 +1,83 @@
+"""
+图表描述模块
+统计页面的图表数据和主题颜色打包成不可变、可序列化的描述，本模块不依赖 matplotlib：
+QPainter 原生图表控件（native_charts）和后台 matplotlib 渲染（chart_rendering）都使用这些描述。
+"""
+
+from dataclasses import dataclass
+
+from theme_manager import theme_manager
+
+# 周视图折线：(名称, 颜色, matplotlib 标记, 线型)
+TREND_SERIES = (('收入', '#4CAF50', 'o', '-'), ('支出', '#F44336', 's', '-'), ('净收支', '#2196F3', '^', '--'))
+
+
+def theme_colors():
+    """当前主题中图表使用的颜色：(图表颜色列表, 背景色, 文字颜色, 边框颜色)
+
+    在界面线程中读取后放入图表描述，后台线程或进程中绘图时不再访问 theme_manager。
+    """
+    return (tuple(theme_manager.get_color('chart_colors')), theme_manager.get_color('background'),
+            theme_manager.get_color('primary_text'), theme_manager.get_color('border'))
+
+
+def limit_data_display(labels, data, max_items=8):
+    """限制数据显示数量，其余合并为'其他'"""
+    if len(labels) <= max_items:
+        return labels, data
+
+    # 按值排序
+    combined = list(zip(labels, data))
+    combined.sort(key=lambda x: x[1], reverse=True)
+
+    # 取前max_items-1项
+    limited_labels = [item[0] for item in combined[:max_items-1]]
+    limited_data = [item[1] for item in combined[:max_items-1]]
+
+    # 其余合并为"其他"
+    other_amount = sum(item[1] for item in combined[max_items-1:])
+    limited_labels.append("其他")
+    limited_data.append(other_amount)
+
+    return limited_labels, limited_data
+
+
+@dataclass(frozen=True)
+class PieChart:
+    """圆环图描述，theme 为 theme_colors() 的返回值"""
+    title: str
+    values: tuple
+    labels: tuple
+    theme: tuple
+    colors: tuple = None
+
+    def __post_init__(self):
+        # 金额可能是 Money，统一转为浮点数，保证可以发送到工作进程
+        object.__setattr__(self, 'values', tuple(float(value) for value in self.values))
+        object.__setattr__(self, 'labels', tuple(str(label) for label in self.labels))
+
+    def apply(self, chart):
+        """把数据更新到可复用的 matplotlib 圆环图（chart_utils.DonutChart）"""
+        chart.update(self.values, self.labels, self.title, list(self.colors) if self.colors else None, self.theme)
+
+
+@dataclass(frozen=True)
+class TrendChart:
+    """每日收支折线图描述，dates 为空时显示 empty_text"""
+    title: str
+    dates: tuple
+    incomes: tuple
+    expenses: tuple
+    net_incomes: tuple
+    empty_text: str
+    theme: tuple
+
+    def __post_init__(self):
+        for name in ('incomes', 'expenses', 'net_incomes'):
+            object.__setattr__(self, name, tuple(float(value) for value in getattr(self, name)))
+        object.__setattr__(self, 'dates', tuple(self.dates))
+
+    def apply(self, chart):
+        """把数据更新到可复用的 matplotlib 折线图（chart_utils.TrendLineChart）"""
+        chart.update(self.dates, self.incomes, self.expenses, self.net_incomes, self.title, self.empty_text,
+                     self.theme)
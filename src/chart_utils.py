@@ -1,76 +1,51 @@
 """
 图表工具模块 - 提供通用的图表创建功能
+DonutChart / TrendLineChart 只在创建时生成一次图形对象，刷新时原地更新扇区角度、折线数据和文字，
+布局不变时不再执行 tight_layout。
 """
 import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from math import cos, radians, sin
+
 from matplotlib.figure import Figure
+from matplotlib.patches import Circle, Wedge
+from matplotlib.ticker import AutoLocator, FuncFormatter
+from chart_specs import TREND_SERIES, limit_data_display, theme_colors
 from theme_manager import theme_manager
 
 matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
 matplotlib.rcParams['axes.unicode_minus'] = False
+# matplotlib 加载之前主题管理器不会设置图表颜色，这里按当前主题补上
+theme_manager.update_matplotlib_colors()
 
 
 class ChartUtils:
     """图表工具类"""
     
     @staticmethod
-    def create_pie_chart(figure, data, labels, title, colors=None):
-        """创建圆环图"""
+    def theme_colors():
+        """当前主题中图表使用的颜色，见 chart_specs.theme_colors"""
+        return theme_colors()
+    
+    @staticmethod
+    def pie_colors(count, theme_colors):
+        """圆环图扇区颜色：依次使用主题图表颜色，不够时使用 Set3 色板"""
+        colors = []
+        for i in range(count):
+            if i < len(theme_colors):
+                # 解析十六进制颜色
+                hex_color = theme_colors[i].lstrip('#')
+                colors.append(tuple(int(hex_color[j:j+2], 16)/255.0 for j in (0, 2, 4)))
+            else:
+                colors.append(plt.cm.Set3(i))
+        return colors
+    
+    @staticmethod
+    def create_pie_chart(figure, data, labels, title, colors=None, theme=None):
+        """创建圆环图，theme 为 theme_colors() 的返回值，不指定时读取当前主题"""
         try:
-            # 清理之前的图形对象以释放内存
-            figure.clear()
-            ax = figure.add_subplot(111)
-            
-            # 获取主题颜色
-            theme_colors = theme_manager.get_color('chart_colors')
-            theme_bg = theme_manager.get_color('background')
-            theme_text = theme_manager.get_color('primary_text')
-            theme_border = theme_manager.get_color('border')
-            
-            if not data or sum(data) == 0:
-                ax.text(0.5, 0.5, '暂无数据', ha='center', va='center', 
-                       transform=ax.transAxes, fontsize=12, color=theme_text)
-                ax.set_title(title, fontsize=14, fontweight='bold', color=theme_text)
-                return
-            
-            # 设置颜色
-            if colors is None:
-                # 使用主题图表颜色
-                import matplotlib.colors as mcolors
-                colors = []
-                for i in range(len(data)):
-                    if i < len(theme_colors):
-                        # 解析十六进制颜色
-                        hex_color = theme_colors[i].lstrip('#')
-                        rgb = tuple(int(hex_color[i:i+2], 16)/255.0 for i in (0, 2, 4))
-                        colors.append(rgb)
-                    else:
-                        colors.append(plt.cm.Set3(i))
-            
-            # 创建圆环图（通过设置wedgeprops来实现）
-            wedges, texts, autotexts = ax.pie(
-                data, labels=labels, colors=colors, autopct='%1.1f%%', 
-                startangle=90, textprops={'fontsize': 9, 'color': theme_text},
-                wedgeprops=dict(width=0.6, edgecolor=theme_bg, linewidth=2)
-            )
-            
-            # 在中心添加圆圈形成圆环效果
-            centre_circle = plt.Circle((0, 0), 0.40, fc=theme_bg, linewidth=2, edgecolor=theme_border)
-            ax.add_artist(centre_circle)
-            
-            # 设置标题
-            ax.set_title(title, fontsize=14, fontweight='bold', pad=20, color=theme_text)
-            
-            # 确保圆环图是圆形
-            ax.axis('equal')
-            
-            # 设置背景色
-            figure.patch.set_facecolor(theme_bg)
-            ax.set_facecolor(theme_bg)
-            
-            figure.tight_layout()
-            
+            DonutChart(figure, blit=False).update(data, labels, title, colors, theme)
         except Exception as e:
             # 如果绘图出错，创建一个简单的错误显示
             figure.clear()
@@ -80,6 +55,11 @@ class ChartUtils:
             ax.set_title(title, fontsize=14, fontweight='bold')
             ax.axis('off')
     
+    @staticmethod
+    def create_trend_chart(figure, dates, incomes, expenses, net_incomes, title, empty_text, theme=None):
+        """创建每日收支折线图（收入、支出、净收支三条折线），dates 为空时显示 empty_text"""
+        TrendLineChart(figure, blit=False).update(dates, incomes, expenses, net_incomes, title, empty_text, theme)
+    
     @staticmethod
     def create_chart_widget(title, figsize=(4, 3)):
         """创建图表控件"""
@@ -111,24 +91,8 @@ class ChartUtils:
     
     @staticmethod
     def limit_data_display(labels, data, max_items=8):
-        """限制数据显示数量，其余合并为'其他'"""
-        if len(labels) <= max_items:
-            return labels, data
-        
-        # 按值排序
-        combined = list(zip(labels, data))
-        combined.sort(key=lambda x: x[1], reverse=True)
-        
-        # 取前max_items-1项
-        limited_labels = [item[0] for item in combined[:max_items-1]]
-        limited_data = [item[1] for item in combined[:max_items-1]]
-        
-        # 其余合并为"其他"
-        other_amount = sum(item[1] for item in combined[max_items-1:])
-        limited_labels.append("其他")
-        limited_data.append(other_amount)
-        
-        return limited_labels, limited_data
+        """限制数据显示数量，其余合并为'其他'，见 chart_specs.limit_data_display"""
+        return limit_data_display(labels, data, max_items)
     
     @staticmethod
     def safe_draw_canvas(canvas):
@@ -142,4 +106,257 @@ class ChartUtils:
             ax.text(0.5, 0.5, f'绘制错误\n{str(e)}', ha='center', va='center', 
                    transform=ax.transAxes, fontsize=12, color='red')
             ax.axis('off')
-            canvas.draw()
\ No newline at end of file
+            canvas.draw()
+
+class DonutChart:
+    """可复用的圆环图
+
+    扇区、标签、百分比、中心圆等图形对象只创建一次，update() 原地修改角度、颜色和文字。
+    blit 为 True 时这些对象标记为 animated：draw() 在背景（底色、标题）不变时
+    恢复缓存的背景，只重绘扇区和文字。
+    """
+
+    RADIUS = 1.0
+    RING_WIDTH = 0.6
+    HOLE_RADIUS = 0.40
+    LABEL_DISTANCE = 1.1
+    PCT_DISTANCE = 0.6
+    START_ANGLE = 90
+
+    def __init__(self, figure, blit=True):
+        self.figure = figure
+        self.blit = blit
+        figure.clear()
+        self.ax = figure.add_subplot(111)
+        self.ax.set(frame_on=False, xticks=[], yticks=[], xlim=(-1.25, 1.25), ylim=(-1.25, 1.25))
+        # 确保圆环图是圆形
+        self.ax.set_aspect('equal')
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+        # 在中心添加圆圈形成圆环效果
+        self.centre_circle = Circle((0, 0), self.HOLE_RADIUS, linewidth=2, animated=blit)
+        self.ax.add_artist(self.centre_circle)
+        self.empty_text = self.ax.text(0.5, 0.5, '暂无数据', ha='center', va='center',
+                                       transform=self.ax.transAxes, fontsize=12, animated=blit)
+        self._layout_key = None
+        self._background = None
+        self._background_key = None
+        self._static_key = None
+
+    def _ensure_wedges(self, count):
+        while len(self.wedges) < count:
+            wedge = Wedge((0, 0), self.RADIUS, 0, 0, width=self.RING_WIDTH, linewidth=2, animated=self.blit)
+            self.ax.add_patch(wedge)
+            self.wedges.append(wedge)
+            self.texts.append(self.ax.text(0, 0, '', va='center', fontsize=9, animated=self.blit))
+            self.autotexts.append(self.ax.text(0, 0, '', ha='center', va='center', fontsize=9,
+                                               animated=self.blit))
+
+    def update(self, data, labels, title, colors=None, theme=None):
+        """按新的数据原地更新图形对象"""
+        theme_colors, theme_bg, theme_text, theme_border = theme or ChartUtils.theme_colors()
+        # 金额可能是 Money，matplotlib 只接受浮点数
+        data = [float(value) for value in data]
+        if any(value < 0 for value in data):
+            raise ValueError("Wedge sizes 'x' must be non negative values")
+        total = sum(data)
+        count = len(data) if total > 0 else 0
+        if colors is None:
+            # 使用主题图表颜色
+            colors = ChartUtils.pie_colors(count, theme_colors)
+        
+        # 设置背景色和标题
+        self.figure.patch.set_facecolor(theme_bg)
+        self.ax.set_facecolor(theme_bg)
+        self.ax.set_title(title, fontsize=14, fontweight='bold', pad=20, color=theme_text)
+        
+        self._ensure_wedges(count)
+        theta1 = self.START_ANGLE
+        for i, (wedge, text, autotext) in enumerate(zip(self.wedges, self.texts, self.autotexts)):
+            visible = i < count
+            wedge.set_visible(visible)
+            text.set_visible(visible)
+            autotext.set_visible(visible)
+            if not visible:
+                continue
+            fraction = data[i] / total
+            theta2 = theta1 + 360 * fraction
+            angle = radians((theta1 + theta2) / 2)
+            x, y = cos(angle), sin(angle)
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            wedge.set_facecolor(colors[i])
+            wedge.set_edgecolor(theme_bg)
+            text.set_position((self.LABEL_DISTANCE * x, self.LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            text.set_text(labels[i])
+            text.set_color(theme_text)
+            autotext.set_position((self.PCT_DISTANCE * x, self.PCT_DISTANCE * y))
+            autotext.set_text('%1.1f%%' % (100 * fraction))
+            autotext.set_color(theme_text)
+            theta1 = theta2
+        
+        self.centre_circle.set_visible(count > 0)
+        self.centre_circle.set_facecolor(theme_bg)
+        self.centre_circle.set_edgecolor(theme_border)
+        self.empty_text.set_visible(count == 0)
+        self.empty_text.set_color(theme_text)
+        
+        # 画布大小、标题和标签都不变时布局不变，跳过 tight_layout
+        layout_key = (tuple(self.figure.bbox.size), title, tuple(labels[:count]))
+        if layout_key != self._layout_key:
+            self.figure.tight_layout()
+            self._layout_key = layout_key
+        self._static_key = (layout_key, theme_bg, theme_text)
+
+    def _animated_artists(self):
+        artists = self.wedges + [self.centre_circle] + self.texts + self.autotexts + [self.empty_text]
+        return [artist for artist in artists if artist.get_visible()]
+
+    def draw(self, canvas):
+        """绘制到画布（canvas 为 figure 所属的 Agg 画布）"""
+        if not self.blit:
+            canvas.draw()
+            return
+        if self._background is None or self._background_key != self._static_key:
+            # 背景有变化：完整绘制一次（animated 对象不参与），缓存为新背景
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+            self._background_key = self._static_key
+        else:
+            canvas.restore_region(self._background)
+        for artist in self._animated_artists():
+            self.ax.draw_artist(artist)
+        canvas.blit(self.figure.bbox)
+
+
+class TrendLineChart:
+    """可复用的每日收支折线图
+
+    三条折线、图例、网格和坐标轴格式只创建一次，update() 原地替换折线数据和刻度；
+    日期、纵轴刻度和画布大小都不变时跳过 tight_layout。纵轴范围取到整刻度，
+    金额小幅变化时坐标轴不变，blit 为 True 时 draw() 只在缓存的背景上重绘三条折线。
+    """
+
+    SERIES = TREND_SERIES
+
+    def __init__(self, figure, blit=True):
+        self.figure = figure
+        self.blit = blit
+        figure.clear()
+        self.ax = figure.add_subplot(111)
+        self.lines = [self.ax.plot([], [], marker=marker, label=label, color=color, linewidth=2, linestyle=style,
+                                   animated=blit)[0]
+                      for label, color, marker, style in self.SERIES]
+        self.ax.set_xlabel('日期', fontsize=12)
+        self.ax.set_ylabel('金额 (¥)', fontsize=12)
+        self.legend = self.ax.legend()
+        self.ax.grid(True, alpha=0.3)
+        
+        # 格式化Y轴显示
+        self.formatter = FuncFormatter(lambda x, p: f'¥{x:.0f}')
+        self.ax.yaxis.set_major_formatter(self.formatter)
+        
+        # 旋转X轴标签
+        self.ax.tick_params(axis='x', labelrotation=45)
+        self.empty_text = self.ax.text(0.5, 0.5, '', ha='center', va='center', fontsize=12,
+                                       transform=self.ax.transAxes)
+        self._layout_key = None
+        self._static_key = None
+        self._background = None
+        self._background_key = None
+        self._legend_region = None
+
+    @staticmethod
+    def _value_limits(series):
+        """纵轴范围：数据范围留出 5% 边距后扩展到相邻的整刻度"""
+        values = [value for values in series for value in values]
+        low, high = min(values), max(values)
+        if low == high:
+            low, high = low - 1, high + 1
+        margin = (high - low) * 0.05
+        low, high = low - margin, high + margin
+        ticks = AutoLocator().tick_values(low, high)
+        return (max([tick for tick in ticks if tick <= low], default=low),
+                min([tick for tick in ticks if tick >= high], default=high))
+
+    def update(self, dates, incomes, expenses, net_incomes, title, empty_text, theme=None):
+        """按新的数据原地更新折线和刻度"""
+        _theme_colors, theme_bg, theme_text, theme_border = theme or ChartUtils.theme_colors()
+        ax = self.ax
+        empty = not dates
+        
+        # 设置图表样式
+        self.figure.patch.set_facecolor(theme_bg)
+        ax.set_facecolor(theme_bg)
+        ax.set_title(title, fontsize=14, fontweight='bold', color=theme_text)
+        ax.xaxis.label.set_color(theme_text)
+        ax.yaxis.label.set_color(theme_text)
+        ax.tick_params(colors=theme_text)
+        for spine in ax.spines.values():
+            spine.set_edgecolor(theme_border)
+        self.legend.get_frame().set_facecolor(theme_bg)
+        self.legend.get_frame().set_edgecolor(theme_border)
+        for text in self.legend.get_texts():
+            text.set_color(theme_text)
+        
+        # 显示空图表
+        self.empty_text.set_text(empty_text)
+        self.empty_text.set_color(theme_text)
+        self.empty_text.set_visible(empty)
+        self.legend.set_visible(not empty)
+        ax.xaxis.label.set_visible(not empty)
+        ax.yaxis.label.set_visible(not empty)
+        
+        # 日期按序号作为横坐标，刻度文字为日期，避免分类坐标轴累积以前各周的日期
+        series = [[float(value) for value in values] for values in (incomes, expenses, net_incomes)]
+        positions = list(range(len(dates)))
+        for line, values in zip(self.lines, series):
+            line.set_data(positions, values)
+            line.set_visible(not empty)
+        if empty:
+            ax.grid(False)
+            ax.set_xticks([])
+            ax.set_yticks([])
+            x_limits, y_limits = (0, 1), (0, 1)
+        else:
+            ax.grid(True, alpha=0.3)
+            ax.set_xticks(positions, list(dates))
+            ax.yaxis.set_major_locator(AutoLocator())
+            ax.yaxis.set_major_formatter(self.formatter)
+            x_margin = 0.05 * (len(dates) - 1) if len(dates) > 1 else 0.5
+            x_limits = (-x_margin, len(dates) - 1 + x_margin)
+            y_limits = self._value_limits(series)
+        ax.set_xlim(x_limits)
+        ax.set_ylim(y_limits)
+        
+        # 纵轴刻度文字决定左侧留白，和日期、画布大小一起作为布局是否变化的依据
+        y_labels = tuple(self.formatter(value) for value in ax.yaxis.get_majorticklocs())
+        layout_key = (tuple(self.figure.bbox.size), title, tuple(dates), y_labels, empty)
+        if layout_key != self._layout_key:
+            self.figure.tight_layout()
+            self._layout_key = layout_key
+        self._static_key = (layout_key, x_limits, y_limits, empty_text, theme_bg, theme_text, theme_border)
+
+    def draw(self, canvas):
+        """绘制到画布（canvas 为 figure 所属的 Agg 画布）"""
+        if not self.blit:
+            canvas.draw()
+            return
+        if self._background is None or self._background_key != self._static_key:
+            # 坐标轴、图例等有变化：完整绘制一次（折线不参与），缓存背景和图例区域
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+            self._legend_region = (canvas.copy_from_bbox(self.legend.get_window_extent().padded(2))
+                                   if self.legend.get_visible() else None)
+            self._background_key = self._static_key
+        else:
+            canvas.restore_region(self._background)
+        for line in self.lines:
+            if line.get_visible():
+                self.ax.draw_artist(line)
+        # 图例应位于折线之上，恢复缓存的图例区域
+        if self._legend_region is not None:
+            canvas.restore_region(self._legend_region)
+        canvas.blit(self.figure.bbox)
@@ -0,0 +1,294 @@
+"""
+数据库连接池模块
+提供“单写多读”的SQLite连接管理：启用WAL日志模式，统一设置PRAGMA参数，
+并登记所有创建过的连接，便于应用退出时一次性关闭。
+批量写入时可以把多次写操作合并到一个事务中，只在结束时提交一次。
+写入代数和 data_version 一起构成数据库版本，供查询缓存判断结果是否过期。
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# 默认PRAGMA参数，可通过 ConnectionPool(pragmas=...) 覆盖
+DEFAULT_PRAGMAS = {
+    'cache_size': -16000,       # 页缓存大小，负数表示KB，约16MB
+    'mmap_size': 268435456,     # 内存映射大小，256MB
+    'temp_store': 'MEMORY',     # 临时表和排序放在内存中
+    'busy_timeout': 5000,       # 遇到锁时的等待时间（毫秒）
+    'synchronous': 'NORMAL',    # WAL模式下NORMAL即可保证一致性
+}
+
+
+class WriterConnection(sqlite3.Connection):
+    """写连接：处于批量写入中时，commit() 推迟到批量结束时统一执行"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_depth = 0
+
+    def commit(self):
+        if self.batch_depth:
+            return
+        super().commit()
+
+
+class ConnectionPool:
+    """SQLite连接池：一个写连接 + 最多 max_readers 个读连接"""
+
+    def __init__(self, db_path, max_readers=4, pragmas=None, row_factory=sqlite3.Row):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.max_readers = max(1, int(max_readers))
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        # 内存数据库的数据只对创建它的连接可见，读操作只能复用写连接
+        self._memory_db = db_path == ':memory:'
+
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._idle_readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(self.max_readers)
+        self._registry = []
+        self._registry_lock = threading.Lock()
+        # 各线程当前借出的读连接，用于中断正在执行的查询
+        self._borrowed = {}
+        # 写入代数：每次写连接使用结束时若修改过数据（无论提交或回滚）则加一；
+        # 各线程记录自己最近一次写入后的代数
+        self.write_generation = 0
+        self._local = threading.local()
+        # 专门用于读取 PRAGMA data_version 的连接，感知其他进程的提交
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+
+    def _open(self, read_only=False):
+        """创建新连接，设置PRAGMA并登记到注册表"""
+        busy_timeout = self.pragmas.get('busy_timeout', 5000)
+        conn = sqlite3.connect(self.db_path, timeout=busy_timeout / 1000.0,
+                               check_same_thread=False,
+                               factory=sqlite3.Connection if read_only else WriterConnection)
+        conn.row_factory = self.row_factory
+
+        if not self._memory_db:
+            conn.execute('PRAGMA journal_mode = WAL')
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        if read_only:
+            conn.execute('PRAGMA query_only = ON')
+
+        with self._registry_lock:
+            self._registry.append(conn)
+        return conn
+
+    def _get_writer(self):
+        """获取写连接，调用方需持有写锁"""
+        if self._writer is None:
+            self._writer = self._open()
+        return self._writer
+
+    @contextmanager
+    def writer(self):
+        """获取唯一的写连接，同一时间只允许一个线程写入
+
+        在批量写入中调用时使用保存点：出错只回滚本次操作，不影响批量中的其他操作。
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            changes = conn.total_changes
+            if conn.batch_depth:
+                conn.execute('SAVEPOINT pool_writer')
+                try:
+                    yield conn
+                except Exception:
+                    conn.execute('ROLLBACK TO pool_writer')
+                    conn.execute('RELEASE pool_writer')
+                    raise
+                else:
+                    conn.execute('RELEASE pool_writer')
+                finally:
+                    self._advance_generation(conn, changes)
+                return
+
+            try:
+                yield conn
+            except Exception:
+                conn.rollback()
+                raise
+            else:
+                # 调用方忘记提交时在退出上下文时补提交，避免事务一直挂起阻塞其他写入
+                if conn.in_transaction:
+                    conn.commit()
+            finally:
+                # 在提交之后增加代数，查询缓存不会把提交前读到的结果当作最新结果
+                self._advance_generation(conn, changes)
+
+    @contextmanager
+    def batch(self):
+        """批量写入：期间所有写操作共用一个事务，结束时只提交一次
+
+        批量期间写锁一直由当前线程持有，其他线程的写入会等待批量结束。
+        批量内抛出未处理的异常时整个批量回滚；嵌套调用并入外层批量。
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            if conn.batch_depth:
+                with self.writer() as conn:
+                    yield conn
+                return
+
+            if conn.in_transaction:
+                conn.commit()
+            changes = conn.total_changes
+            conn.execute('BEGIN IMMEDIATE')
+            conn.batch_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.batch_depth = 0
+                conn.rollback()
+                raise
+            else:
+                conn.batch_depth = 0
+                conn.commit()
+            finally:
+                self._advance_generation(conn, changes)
+
+    def _advance_generation(self, conn, changes):
+        """写连接使用结束后，若期间修改过数据则增加写入代数，调用方需持有写锁
+
+        changes 为使用前的 total_changes（包括触发器的修改）；只读的使用（如内存数据库的读操作）
+        不改变代数，查询缓存中的结果仍然有效。
+        """
+        if conn.total_changes != changes:
+            self.write_generation += 1
+        self._local.generation = self.write_generation
+
+    def committed_generation(self):
+        """当前线程最近一次写入（批量写入按整个批量计）结束后的写入代数"""
+        return getattr(self._local, 'generation', self.write_generation)
+
+    @contextmanager
+    def reader(self):
+        """从池中借出一个只读连接，池满时等待其他线程归还"""
+        if self._memory_db:
+            with self.writer() as conn:
+                yield conn
+            return
+
+        self._reader_slots.acquire()
+        try:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._open(read_only=True)
+            thread_id = threading.get_ident()
+            with self._registry_lock:
+                self._borrowed[thread_id] = conn
+            try:
+                yield conn
+            finally:
+                with self._registry_lock:
+                    self._borrowed.pop(thread_id, None)
+                self._release_reader(conn)
+        finally:
+            self._reader_slots.release()
+
+    @contextmanager
+    def pinned_reader(self):
+        """借出只读连接，同时返回写入代数：(连接, 代数)
+
+        在写锁内取得代数并执行 with 块，期间没有进行中的提交，块内读到的恰好是
+        代数不超过该值的全部提交。块内应只做必要的查询，写入会一直等待到块结束。
+        """
+        with self._writer_lock:
+            with self.reader() as conn:
+                yield conn, self.write_generation
+
+    def interrupt_reader(self, thread_id):
+        """中断指定线程当前读连接上正在执行的查询，该查询会抛出 sqlite3.OperationalError
+
+        返回是否找到了该线程借出的读连接。
+        """
+        with self._registry_lock:
+            conn = self._borrowed.get(thread_id)
+            if conn is None:
+                return False
+            conn.interrupt()
+        return True
+
+    def data_version(self):
+        """返回监视连接上的 PRAGMA data_version
+
+        其他连接（本进程的写连接或其他进程）提交后该值会改变；内存数据库只有一个连接，始终返回 0。
+        """
+        if self._memory_db:
+            return 0
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = self._open(read_only=True)
+            return self._monitor.execute('PRAGMA data_version').fetchone()[0]
+
+    def external_data_version(self, blocking=True):
+        """返回写连接上的 PRAGMA data_version
+        
+        本进程的写入都经由该连接，它只在其他进程提交后改变，可用来发现绕过本进程的修改。
+        blocking 为 False 且写锁正被其他线程持有时返回 None；内存数据库始终返回 0。
+        """
+        if self._memory_db:
+            return 0
+        if not self._writer_lock.acquire(blocking):
+            return None
+        try:
+            return self._get_writer().execute('PRAGMA data_version').fetchone()[0]
+        finally:
+            self._writer_lock.release()
+    
+    def _release_reader(self, conn):
+        """归还读连接；连接池已关闭时直接丢弃"""
+        with self._registry_lock:
+            alive = conn in self._registry
+        if not alive:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle_readers.put(conn)
+
+    def close_all(self):
+        """关闭注册表中的所有连接（包括其他线程正在持有的连接）"""
+        with self._writer_lock:
+            if self._writer is not None:
+                try:
+                    # 按需刷新索引统计信息，并在退出前把WAL内容写回主库，避免遗留较大的-wal文件
+                    self._writer.execute('PRAGMA optimize')
+                    self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                except sqlite3.Error:
+                    pass
+            self._writer = None
+            with self._monitor_lock:
+                self._monitor = None
+
+            with self._registry_lock:
+                connections = self._registry
+                self._registry = []
+
+            while True:
+                try:
+                    self._idle_readers.get_nowait()
+                except queue.Empty:
+                    break
+
+            for conn in connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass  # 忽略关闭时的错误
+
+    @property
+    def connection_count(self):
+        """当前已打开的连接数量"""
+        with self._registry_lock:
+            return len(self._registry)
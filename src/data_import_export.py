@@ -110,45 +110,62 @@ class ExportWorker(QThread):
         
         return file_path
     
-    def get_all_transactions(self):
-        """获取所有交易记录"""
-        with self.db_manager.get_connection() as conn:
+    def get_all_transactions(self, start_date=None, end_date=None, ledger_id=None):
+        """获取交易记录，可按日期范围和账本筛选"""
+        conditions = []
+        params = []
+        if start_date and end_date:
+            conditions.append('t.transaction_date BETWEEN ? AND ?')
+            params.extend([start_date, end_date])
+        if ledger_id:
+            conditions.append('t.ledger_id = ?')
+            params.append(ledger_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        with self.db_manager.get_read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
+            # 金额以分存储，在SQL中换算为元，无需再逐行四舍五入
+            cursor.execute(f'''
                 SELECT t.id, l.name as ledger_name, t.transaction_date, 
                        t.transaction_type, t.category, t.subcategory, 
-                       t.amount, t.account, t.description, 
-                       t.is_settled, t.refund_amount, t.refund_reason, t.created_time
-                FROM transactions t
+                       t.amount / 100.0 as amount, t.account, t.description, 
+                       t.is_settled, COALESCE(t.refund_amount, 0) / 100.0 as refund_amount,
+                       t.refund_reason, t.created_time
+                FROM transaction_details t
                 JOIN ledgers l ON t.ledger_id = l.id
+                {where}
                 ORDER BY t.transaction_date DESC, t.created_time DESC
-            ''')
+            ''', params)
             columns = [description[0] for description in cursor.description]
             rows = cursor.fetchall()
             return [dict(zip(columns, row)) for row in rows]
     
-    def get_all_budgets(self):
-        """获取所有预算配置"""
-        with self.db_manager.get_connection() as conn:
+    def get_all_budgets(self, ledger_id=None):
+        """获取预算配置，可按账本筛选"""
+        where = 'WHERE b.ledger_id = ?' if ledger_id else ''
+        params = [ledger_id] if ledger_id else []
+        
+        with self.db_manager.get_read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT b.id, l.name as ledger_name, b.category, b.budget_type,
-                       b.amount, b.warning_threshold, b.start_date, b.end_date,
+                       b.amount / 100.0 as amount, b.warning_threshold, b.start_date, b.end_date,
                        b.is_active, b.created_time, b.updated_time
                 FROM budgets b
                 JOIN ledgers l ON b.ledger_id = l.id
+                {where}
                 ORDER BY l.name, b.category
-            ''')
+            ''', params)
             columns = [description[0] for description in cursor.description]
             rows = cursor.fetchall()
             return [dict(zip(columns, row)) for row in rows]
     
     def get_all_accounts(self):
         """获取所有账户信息"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT id, name, type, balance, bank, description
+                SELECT id, name, type, balance / 100.0 as balance, bank, description
                 FROM accounts
                 ORDER BY name
             ''')
@@ -162,21 +179,14 @@ class ExportWorker(QThread):
         end_date = config.get('end_date')
         ledger_id = config.get('ledger_id')
         
-        return self.db_manager.get_transactions_by_date_range(start_date, end_date, ledger_id)
+        return self.get_all_transactions(start_date, end_date, ledger_id)
     
     def get_filtered_budgets(self, config):
         """获取筛选的预算配置"""
         ledger_id = config.get('ledger_id')
         if ledger_id:
-            budgets = self.db_manager.get_budgets(ledger_id)
-            # 转换为字典格式
-            result = []
-            for budget in budgets:
-                ledger_name = self.get_ledger_name(ledger_id)
-                budget_dict = budget.copy()
-                budget_dict['ledger_name'] = ledger_name
-                result.append(budget_dict)
-            return result
+            budgets = self.get_all_budgets(ledger_id)
+            return [budget for budget in budgets if budget['is_active']]
         return self.get_all_budgets()
     
     def get_filtered_accounts(self, config):
@@ -186,12 +196,13 @@ class ExportWorker(QThread):
     
     def get_date_range_transactions(self, start_date, end_date):
         """获取指定日期范围的交易记录"""
-        return self.db_manager.get_transactions_by_date_range(start_date, end_date)
+        return self.get_all_transactions(start_date, end_date)
     
     def get_ledger_name(self, ledger_id):
         """获取账本名称"""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor('SELECT name FROM ledgers WHERE id = ?', (ledger_id,))
+        with self.db_manager.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name FROM ledgers WHERE id = ?', (ledger_id,))
             result = cursor.fetchone()
             return result[0] if result else '未知账本'
     
@@ -201,25 +212,15 @@ class ExportWorker(QThread):
             # 交易记录特殊处理
             if 'is_settled' in df.columns:
                 df['is_settled'] = df['is_settled'].apply(lambda x: '是' if x else '否')
-            if 'amount' in df.columns:
-                df['amount'] = df['amount'].apply(lambda x: float(f"{x:.2f}"))
-            if 'refund_amount' in df.columns:
-                df['refund_amount'] = df['refund_amount'].apply(lambda x: float(f"{x:.2f}" if x else 0))
         
         elif data_type == 'budgets':
             # 预算配置特殊处理
             if 'is_active' in df.columns:
                 df['is_active'] = df['is_active'].apply(lambda x: '是' if x else '否')
-            if 'amount' in df.columns:
-                df['amount'] = df['amount'].apply(lambda x: float(f"{x:.2f}"))
             if 'warning_threshold' in df.columns:
                 df['warning_threshold'] = df['warning_threshold'].apply(lambda x: f"{x:.1f}%")
         
-        elif data_type == 'accounts':
-            # 账户信息特殊处理
-            if 'balance' in df.columns:
-                df['balance'] = df['balance'].apply(lambda x: float(f"{x:.2f}"))
-        
+        # 金额列在查询时已由整数分换算为元，这里不再逐行处理
         return df
     
     def save_excel_file(self, export_data, file_path, ledger_name):
@@ -482,21 +483,23 @@ class ImportWorker(QThread):
         success_count = 0
         error_count = 0
         
-        for idx, row in df.iterrows():
-            try:
-                if import_type == 'transactions':
-                    self.import_transaction(row, import_mode)
-                elif import_type == 'budgets':
-                    self.import_budget(row, import_mode)
-                elif import_type == 'accounts':
-                    self.import_account(row, import_mode)
-                
-                success_count += 1
-                self.progress_updated.emit(int((success_count / total_rows) * 100))
-                
-            except Exception as e:
-                error_count += 1
-                # 记录错误但继续处理其他记录
+        # 所有记录在一个事务中写入，只提交一次；单条记录出错只回滚该条
+        with self.db_manager.batch():
+            for idx, row in df.iterrows():
+                try:
+                    if import_type == 'transactions':
+                        self.import_transaction(row, import_mode)
+                    elif import_type == 'budgets':
+                        self.import_budget(row, import_mode)
+                    elif import_type == 'accounts':
+                        self.import_account(row, import_mode)
+                    
+                    success_count += 1
+                    self.progress_updated.emit(int((success_count / total_rows) * 100))
+                    
+                except Exception as e:
+                    error_count += 1
+                    # 记录错误但继续处理其他记录
         
         return {
             'total_rows': total_rows,
@@ -553,28 +556,20 @@ class ImportWorker(QThread):
         ledger_name = row.get('ledger_name', '默认账本')
         ledger_id = self.get_or_create_ledger(ledger_name)
         
-        # 插入交易记录
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO transactions 
-                (ledger_id, transaction_date, transaction_type, category, subcategory, 
-                 amount, account, description, is_settled, refund_amount, refund_reason, created_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                ledger_id,
-                row['transaction_date'],
-                row['transaction_type'],
-                row['category'],
-                row.get('subcategory', ''),
-                row['amount'],
-                row.get('account', ''),
-                row.get('description', ''),
-                row.get('is_settled', 0),
-                row.get('refund_amount', 0),
-                row.get('refund_reason', ''),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ))
+        # 插入交易记录（类别和账户名称由数据库管理器解析为ID）
+        self.db_manager.add_transaction(
+            ledger_id,
+            row['transaction_date'],
+            row['transaction_type'],
+            row['category'],
+            row.get('subcategory', ''),
+            row['amount'],
+            row.get('account', ''),
+            row.get('description', ''),
+            row.get('is_settled', 0),
+            row.get('refund_amount', 0),
+            row.get('refund_reason', '')
+        )
     
     def import_budget(self, row, import_mode):
         """导入单条预算配置"""
@@ -582,53 +577,41 @@ class ImportWorker(QThread):
         ledger_name = row.get('ledger_name', '默认账本')
         ledger_id = self.get_or_create_ledger(ledger_name)
         
-        # 插入预算配置
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO budgets 
-                (ledger_id, category, budget_type, amount, warning_threshold, 
-                 start_date, end_date, is_active, created_time, updated_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                ledger_id,
-                row['category'],
-                row['budget_type'],
-                row['amount'],
-                row.get('warning_threshold', 80.0),
-                row.get('start_date', datetime.now().strftime('%Y-%m-01')),
-                row.get('end_date', ''),
-                row.get('is_active', 1),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ))
+        # 添加或更新预算配置（金额由数据库管理器转换为分）
+        self.db_manager.upsert_budgets_bulk([(
+            ledger_id,
+            row['category'],
+            row['budget_type'],
+            row['amount'],
+            row.get('warning_threshold', 80.0),
+            row.get('start_date', datetime.now().strftime('%Y-%m-01')),
+            row.get('end_date', ''),
+            row.get('is_active', 1)
+        )])
     
     def import_account(self, row, import_mode):
         """导入单个账户信息"""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor('''
-                INSERT OR REPLACE INTO accounts 
-                (name, type, balance, bank, description)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                row['name'],
-                row['type'],
-                row.get('balance', 0.0),
-                row.get('bank', ''),
-                row.get('description', '')
-            ))
+        # 同名账户原地更新，保留账户ID，已有交易记录仍指向该账户
+        self.db_manager.upsert_account(
+            row['name'],
+            row['type'],
+            row.get('balance', 0),
+            row.get('bank', ''),
+            row.get('description', '')
+        )
     
     def get_or_create_ledger(self, ledger_name):
         """获取或创建账本ID"""
         with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor('SELECT id FROM ledgers WHERE name = ?', (ledger_name,))
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM ledgers WHERE name = ?', (ledger_name,))
             result = cursor.fetchone()
             
             if result:
                 return result[0]
             else:
                 # 创建新账本
-                cursor = conn.cursor('''
+                cursor.execute('''
                     INSERT INTO ledgers (name, created_time, ledger_type, description)
                     VALUES (?, ?, ?, ?)
                 ''', (ledger_name, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), '个人', ''))
@@ -1,42 +1,191 @@
-import sqlite3
-import threading
-from datetime import datetime
+import json
+from datetime import datetime, date, timedelta
 from contextlib import contextmanager
+from dataclasses import replace
+
+import threading
+
+from connection_pool import ConnectionPool
+from db_writer import DatabaseWriter
+from db_migrations import migrate, default_category_rows
+from money import Money, to_cents, money_row_factory
+from live_aggregates import LiveAggregates
+from change_events import (ChangeBus, ChangeEvent, TransactionValues, change_event,
+                           TRANSACTION_ADDED, TRANSACTION_UPDATED, TRANSACTION_DELETED,
+                           ACCOUNT_CHANGED, TRANSFER_CHANGED, BUDGET_CHANGED, LEDGER_CHANGED,
+                           CATEGORY_CHANGED)
+from query_cache import QueryCache, cached_query
+from analytics_engine import AnalyticsEngine
 
 class DatabaseManager:
-    def __init__(self, db_path="bookkeeping.db"):
+    """数据库管理器
+
+    金额在数据库中以整数分保存；写入方法的金额参数可以是 Money 或以元为单位的数字，
+    读取结果中的金额列统一转换为 Money。
+    区间统计读取由触发器维护的 daily_rollups 日汇总表，耗时与天数而非交易笔数成正比。
+    只读方法的结果由查询缓存按参数保存，任何写入（包括其他进程的写入）之后自动失效；
+    query_cache_entries 为 0 时不使用缓存。
+    每次写入提交后通过 self.changes 发布变更事件（见 change_events 模块）。
+    get_period_snapshot、get_period_totals 和预算进度由实时区间汇总（见 live_aggregates 模块）
+    按变更事件增量维护，不再查询数据库；get_statistics_summary、get_category_statistics、
+    get_account_statistics 和 get_week_trends 等单项统计仍查询 daily_rollups。
+    analytics 为 True 时创建内存列式统计引擎 self.analytics（见 analytics_engine 模块），
+    否则 self.analytics 为 None。图形界面不启用统计引擎：界面的区间统计都由实时区间汇总完成，
+    引擎供脚本和基准测试对整表做大量即席统计时使用。
+    """
+    def __init__(self, db_path="bookkeeping.db", max_readers=4, pragmas=None,
+                 query_cache_entries=256, query_cache_rows=100000, analytics=False):
         self.db_path = db_path
-        self._local = threading.local()
+        self.max_readers = max_readers
+        self._pool = ConnectionPool(db_path, max_readers=max_readers, pragmas=pragmas,
+                                    row_factory=money_row_factory)
+        self._query_cache = QueryCache(self._data_version, query_cache_entries, query_cache_rows)
+        self.changes = ChangeBus()
+        self._aggregates = LiveAggregates(self)
+        # 批量写入期间产生的事件先暂存，提交成功后一起发布，回滚时丢弃
+        self._batch_events = None
+        self._batch_owner = None
+        self._fulltext_available = {}
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.analytics = None
         self.init_database()
+        self.enable_analytics(analytics)
     
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器，支持线程安全"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self._local.connection.row_factory = sqlite3.Row
-        try:
-            yield self._local.connection
-        except Exception:
-            self._local.connection.rollback()
-            raise
+        """获取写连接的上下文管理器，所有线程共享同一个写连接并串行写入"""
+        with self._pool.writer() as conn:
+            yield conn
     
-    def close_connection(self):
-        """关闭当前线程的数据库连接"""
-        if hasattr(self._local, 'connection'):
+    @contextmanager
+    def get_read_connection(self):
+        """获取只读连接的上下文管理器，WAL模式下读操作不会被写入阻塞"""
+        with self._pool.reader() as conn:
+            yield conn
+    
+    @contextmanager
+    def get_snapshot_connection(self):
+        """获取只读连接和对应的写入代数：(连接, 代数)
+
+        期间持有写锁，读到的恰好是代数不超过该值的全部提交，
+        用于构建随后按变更事件（generation 字段）增量更新的内存数据。
+        """
+        with self._pool.pinned_reader() as (conn, generation):
+            yield conn, generation
+    
+    @contextmanager
+    def batch(self):
+        """批量写入上下文：期间调用的各个写方法共用一个事务，结束时只提交一次
+
+        用法:
+            with db_manager.batch():
+                for row in rows:
+                    db_manager.add_transaction(*row)
+
+        单个写方法出错只回滚该次操作；批量内未处理的异常会回滚整个批量。
+        变更事件在批量提交后一次发布。
+        """
+        events = None
+        with self._pool.batch():
+            # 批量期间写锁由当前线程持有，只有当前线程会进入这里
+            outer = self._batch_events is None
+            if outer:
+                self._batch_events = []
+                self._batch_owner = threading.get_ident()
+            mark = len(self._batch_events)
             try:
-                self._local.connection.close()
-            except:
-                pass  # 忽略关闭时的错误
+                yield self
+            except BaseException:
+                del self._batch_events[mark:]
+                raise
             finally:
-                delattr(self._local, 'connection')
+                if outer:
+                    events, self._batch_events, self._batch_owner = self._batch_events, None, None
+        if events:
+            self.changes.publish(self._stamp(events))
+    
+    def _publish(self, *events):
+        """发布已提交写入的变更事件；在当前线程的批量写入中时暂存到批量提交后发布"""
+        if self._batch_owner == threading.get_ident():
+            self._batch_events.extend(events)
+        else:
+            self.changes.publish(self._stamp(events))
+    
+    def external_data_version(self, blocking=True):
+        """其他进程提交后才会改变的数据库版本号；blocking 为 False 且本进程正在写入时返回 None"""
+        return self._pool.external_data_version(blocking)
+    
+    def _stamp(self, events):
+        """填写事件的写入代数：当前线程刚完成的提交之后的代数"""
+        generation = self._pool.committed_generation()
+        return [replace(event, generation=generation) for event in events]
+    
+    def _data_version(self):
+        """数据库版本：本进程的写入代数与其他进程提交引起的 data_version 变化"""
+        return self._pool.write_generation, self._pool.data_version()
+    
+    def clear_query_cache(self):
+        """清空查询缓存和内存中的统计数据，例如用其他工具修改数据库文件之后"""
+        self._query_cache.clear()
+        self._aggregates.invalidate()
+        if self.analytics is not None:
+            self.analytics.invalidate()
+    
+    def enable_analytics(self, enabled=True):
+        """启用或停用内存列式统计引擎，返回当前的引擎（停用时为 None）"""
+        if enabled and self.analytics is None:
+            self.analytics = AnalyticsEngine(self)
+        elif not enabled and self.analytics is not None:
+            self.analytics.close()
+            self.analytics = None
+        return self.analytics
+    
+    def statistics_source(self):
+        """统计查询的数据来源：启用了统计引擎时为引擎，否则为本对象"""
+        return self.analytics if self.analytics is not None else self
+    
+    def interrupt_reads(self, thread_id):
+        """中断指定线程正在执行的只读查询，返回是否找到了该线程的读连接"""
+        return self._pool.interrupt_reader(thread_id)
+    
+    def submit(self, fn, *args, **kwargs):
+        """把写操作交给后台写入线程执行，立即返回 concurrent.futures.Future
+
+        fn 通常是本对象的写方法，例如 db_manager.submit(db_manager.add_transaction, ...)。
+        同时排队的写操作会合并为一次提交，Future 完成时数据已写入数据库。
+        直接调用的写方法不经过写入线程，与之共用同一个写连接并由写锁串行化。
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = DatabaseWriter(self)
+            writer = self._writer
+        return writer.submit(fn, *args, **kwargs)
+    
+    def flush_writes(self, timeout=None):
+        """等待已提交给写入线程的写操作全部完成"""
+        with self._writer_lock:
+            writer = self._writer
+        if writer is not None:
+            writer.flush(timeout)
+    
+    def _stop_writer(self):
+        """写完队列中剩余的写操作后停止写入线程"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+    
+    def close_connection(self):
+        """关闭数据库连接"""
+        self._stop_writer()
+        self._pool.close_all()
     
     def cleanup_all_connections(self):
         """清理所有线程的数据库连接"""
-        # 注意：threading.local无法直接清理所有线程的连接
-        # 这个方法主要用于应用退出时的资源清理
-        if hasattr(self._local, 'connection'):
-            self.close_connection()
+        self._stop_writer()
+        # 连接池登记了所有创建过的连接，应用退出时可以全部关闭
+        self._pool.close_all()
     
     def __del__(self):
         """析构函数，确保连接被清理"""
@@ -45,157 +194,27 @@ class DatabaseManager:
         except:
             pass  # 忽略析构时的错误
     
+    # 关键字达到该长度时使用 trigram 全文索引（以三个字符为单位），更短的关键字使用单字和双字索引
+    FTS_MIN_KEYWORD_LENGTH = 3
+    
     def init_database(self):
+        """初始化数据库结构，只执行尚未应用的版本迁移"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 创建账本表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ledgers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    created_time TEXT NOT NULL,
-                    ledger_type TEXT NOT NULL,
-                    description TEXT
-                )
-            ''')
-            
-            # 创建收支类别表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    parent_category TEXT NOT NULL,
-                    sub_category TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    UNIQUE(parent_category, sub_category)
-                )
-            ''')
-            
-            # 创建账户表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    type TEXT NOT NULL,
-                    balance REAL DEFAULT 0.0,
-                    bank TEXT,
-                    description TEXT
-                )
-            ''')
-            
-            # 创建交易记录表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ledger_id INTEGER NOT NULL,
-                    transaction_date TEXT NOT NULL,
-                    transaction_type TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    subcategory TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    account TEXT,
-                    description TEXT,
-                    is_settled BOOLEAN DEFAULT FALSE,
-                    refund_amount REAL DEFAULT 0.0,
-                    refund_reason TEXT,
-                    created_time TEXT NOT NULL,
-                    FOREIGN KEY (ledger_id) REFERENCES ledgers (id)
-                )
-            ''')
-            
-            # 创建资金流转表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transfers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    transfer_date TEXT NOT NULL,
-                    from_account TEXT NOT NULL,
-                    to_account TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    description TEXT,
-                    created_time TEXT NOT NULL
-                )
-            ''')
-            
-            # 创建预算表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS budgets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ledger_id INTEGER NOT NULL,
-                    category TEXT NOT NULL,
-                    budget_type TEXT NOT NULL,  -- 'monthly' or 'yearly'
-                    amount REAL NOT NULL,
-                    warning_threshold REAL DEFAULT 80.0,  -- 预警阈值百分比
-                    start_date TEXT NOT NULL,  -- 生效开始日期
-                    end_date TEXT,  -- 生效结束日期，为空表示持续有效
-                    is_active BOOLEAN DEFAULT TRUE,  -- 是否启用
-                    created_time TEXT NOT NULL,
-                    updated_time TEXT NOT NULL,
-                    FOREIGN KEY (ledger_id) REFERENCES ledgers (id),
-                    UNIQUE(ledger_id, category, budget_type)
-                )
-            ''')
-            
-            # 创建索引以提高查询性能
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(transaction_date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_ledger ON transactions(ledger_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions(account)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transfers_date ON transfers(transfer_date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_name ON accounts(name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_ledger ON budgets(ledger_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_category ON budgets(category)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_type ON budgets(budget_type)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_active ON budgets(is_active)')
-            
-            # 插入默认类别数据
-            self.insert_default_categories()
-            conn.commit()
+            migrate(conn)
     
     def insert_default_categories(self):
+        """补充插入默认类别（已存在的类别会被忽略）"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # 支出类别
-            expense_categories = [
-                ("餐饮", ["零食", "外卖", "食堂", "堂食", "水果", "饮料", "聚餐"]),
-                ("休闲娱乐", ["电影", "游戏", "体育", "音乐", "旅游", "美妆", "宠物", "按摩", "健身", "会员"]),
-                ("生活缴费", ["水电费", "物业费", "燃气费", "网费", "话费", "房贷", "房租", "取暖费", "车位费"]),
-                ("交通", ["公交", "地铁", "共享单车", "共享电动车", "火车", "高铁", "飞机", "打车"]),
-                ("教育", ["考试费", "培训费", "资料费", "文具"]),
-                ("购物", ["服饰", "果蔬", "数码", "家电", "日用品", "家具"]),
-                ("汽车", ["充电/油", "保养", "维修", "过路费", "停车费"]),
-                ("医疗健康", ["药品", "住院", "体检", "保健品", "门诊", "疫苗接种"]),
-                ("社交人情", ["红包", "礼物", "请客", "捐赠", "团建费"]),
-                ("金融保险", ["保险", "投资", "贷款", "理财"]),
-                ("其他", ["快递费", "党费", "罚款", "借款", "手续费", "维修费", "班费"]),
-                ("儿童", ["母婴", "教育", "服装", "玩具", "医疗", "生活费"])
-            ]
-            
-            # 收入类别
-            income_categories = [
-                ("薪资", ["工作薪资", "副业收入", "奖金补贴"]),
-                ("生活费", ["家庭转账", "亲友资助"]),
-                ("理财", ["股票基金", "存款利息", "借贷回款", "房产租金"]),
-                ("人情往来", ["红包", "礼物"]),
-                ("其他", ["闲置变卖", "商家奖励", "赛事奖金", "奖学金", "版权费"])
-            ]
-            
-            # 批量插入，提高性能
-            all_data = []
-            for parent, subs in expense_categories:
-                for sub in subs:
-                    all_data.append((parent, sub, "支出"))
-            
-            for parent, subs in income_categories:
-                for sub in subs:
-                    all_data.append((parent, sub, "收入"))
-            
+            changes = conn.total_changes
             cursor.executemany('''
                 INSERT OR IGNORE INTO categories (parent_category, sub_category, type)
                 VALUES (?, ?, ?)
-            ''', all_data)
-            
+            ''', default_category_rows())
+            inserted = conn.total_changes != changes
             conn.commit()
+        if inserted:
+            self._publish(ChangeEvent(CATEGORY_CHANGED))
     
     def add_ledger(self, name, ledger_type, description):
         with self.get_connection() as conn:
@@ -211,8 +230,8 @@ class DatabaseManager:
             
             # 自动创建默认账户
             default_accounts = [
-                ("现金", "现金", "个人", 0.0, "现金余额"),
-                ("微信", "电子支付", "腾讯", 0.0, "微信支付")
+                ("现金", "现金", 0, "个人", "现金余额"),
+                ("微信", "电子支付", 0, "腾讯", "微信支付")
             ]
             
             cursor.executemany('''
@@ -221,9 +240,12 @@ class DatabaseManager:
             ''', default_accounts)
             
             conn.commit()
+        self._publish(ChangeEvent(LEDGER_CHANGED, ledger_id),
+                      change_event(ACCOUNT_CHANGED, accounts=[account[0] for account in default_accounts]))
     
+    @cached_query
     def get_ledgers(self):
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM ledgers ORDER BY created_time')
             ledgers = cursor.fetchall()
@@ -235,9 +257,11 @@ class DatabaseManager:
             cursor.execute('DELETE FROM transactions WHERE ledger_id = ?', (ledger_id,))
             cursor.execute('DELETE FROM ledgers WHERE id = ?', (ledger_id,))
             conn.commit()
+        self._publish(ChangeEvent(LEDGER_CHANGED, ledger_id))
     
+    @cached_query
     def get_categories(self, category_type=None):
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             if category_type:
                 cursor.execute('''
@@ -252,38 +276,312 @@ class DatabaseManager:
             categories = cursor.fetchall()
             return categories
     
+    def _get_category_id(self, cursor, transaction_type, category, subcategory):
+        """按类别名称查找类别ID，不存在时自动创建"""
+        cursor.execute('''
+            SELECT id FROM categories WHERE parent_category = ? AND sub_category = ?
+        ''', (category, subcategory or ""))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+        cursor.execute('''
+            INSERT INTO categories (parent_category, sub_category, type) VALUES (?, ?, ?)
+        ''', (category, subcategory or "", transaction_type))
+        return cursor.lastrowid
+    
+    def _get_account_id(self, cursor, account):
+        """按账户名称查找账户ID，不存在时自动创建；未选择账户时返回None"""
+        if not account:
+            return None
+        cursor.execute('SELECT id FROM accounts WHERE name = ?', (account,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+        cursor.execute('''
+            INSERT INTO accounts (name, type, balance) VALUES (?, '其他', 0)
+        ''', (account,))
+        return cursor.lastrowid
+    
+    def _adjust_balance(self, cursor, account_id, cents):
+        """按账户ID调整余额（单位：分），未选择账户时忽略"""
+        if account_id is not None and cents:
+            cursor.execute('UPDATE accounts SET balance = balance + ? WHERE id = ?', (cents, account_id))
+    
+    def _get_stored_transaction(self, cursor, transaction_id):
+        """读取已保存的交易记录，返回 (TransactionValues, 账户名称)，记录不存在时返回 None"""
+        cursor.execute('''
+            SELECT t.ledger_id, t.transaction_date, t.transaction_type, t.category_id,
+                   COALESCE(t.account_id, 0), t.amount AS amount_cents, t.is_settled = 1,
+                   COALESCE(t.refund_amount, 0) AS refund_cents, a.name
+            FROM transactions t
+            LEFT JOIN accounts a ON a.id = t.account_id
+            WHERE t.id = ?
+        ''', (transaction_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return TransactionValues(*row[:8]), row[8]
+    
+    @staticmethod
+    def _transaction_values(ledger_id, transaction_date, transaction_type, category_id, account_id,
+                            amount, is_settled, refund_amount):
+        """把写入的字段转换为变更事件中的记录值，与日汇总表的口径一致"""
+        return TransactionValues(ledger_id, transaction_date, transaction_type, category_id,
+                                 account_id or 0, to_cents(amount), is_settled == 1,
+                                 to_cents(refund_amount))
+    
     def add_transaction(self, ledger_id, transaction_date, transaction_type, category, subcategory, 
-                       amount, account, description, is_settled, refund_amount, refund_reason):
+                       amount, account, description, is_settled, refund_amount, refund_reason,
+                       adjust_balance=False):
+        """添加交易记录
+
+        adjust_balance 为 True 时在同一事务中把金额计入所选账户的余额。
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             created_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            category_id = self._get_category_id(cursor, transaction_type, category, subcategory)
+            account_id = self._get_account_id(cursor, account)
             cursor.execute('''
                 INSERT INTO transactions 
-                (ledger_id, transaction_date, transaction_type, category, subcategory, amount, account, 
+                (ledger_id, transaction_date, transaction_type, category_id, account_id, amount, 
                  description, is_settled, refund_amount, refund_reason, created_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (ledger_id, transaction_date, transaction_type, category, subcategory, amount, account,
-                  description, is_settled, refund_amount, refund_reason, created_time))
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (ledger_id, transaction_date, transaction_type, category_id, account_id, to_cents(amount),
+                  description, is_settled, to_cents(refund_amount), refund_reason, created_time))
+            transaction_id = cursor.lastrowid
+            if adjust_balance:
+                self._adjust_balance(cursor, account_id, to_cents(amount))
             conn.commit()
+        values = self._transaction_values(ledger_id, transaction_date, transaction_type, category_id,
+                                          account_id, amount, is_settled, refund_amount)
+        self._publish(change_event(TRANSACTION_ADDED, ledger_id, [transaction_date], [account],
+                                        transaction_id, after=[values]))
     
-    def get_transactions(self, ledger_id):
+    def add_transactions_bulk(self, transactions):
+        """批量添加交易记录，全部写入在一个事务中完成
+
+        transactions 中每一项的字段顺序与 add_transaction 的参数相同：
+        (ledger_id, transaction_date, transaction_type, category, subcategory,
+         amount, account, description, is_settled, refund_amount, refund_reason)
+        返回写入的记录数。
+        """
+        # 写入后还要再遍历一次生成变更事件，生成器只能遍历一次
+        transactions = list(transactions)
+        created_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # 同一批数据中类别和账户大量重复，名称到ID的解析结果在本次调用内缓存
+            category_ids = {}
+            account_ids = {}
+            rows = []
+            for (ledger_id, transaction_date, transaction_type, category, subcategory,
+                 amount, account, description, is_settled, refund_amount, refund_reason) in transactions:
+                category_key = (category, subcategory or "")
+                if category_key not in category_ids:
+                    category_ids[category_key] = self._get_category_id(cursor, transaction_type, category, subcategory)
+                if account not in account_ids:
+                    account_ids[account] = self._get_account_id(cursor, account)
+                rows.append((ledger_id, transaction_date, transaction_type, category_ids[category_key],
+                             account_ids[account], to_cents(amount), description, is_settled,
+                             to_cents(refund_amount), refund_reason, created_time))
+            
+            cursor.executemany('''
+                INSERT INTO transactions 
+                (ledger_id, transaction_date, transaction_type, category_id, account_id, amount, 
+                 description, is_settled, refund_amount, refund_reason, created_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        
+        # 按账本汇总本次写入涉及的日期、账户和记录值
+        affected = {}
+        for transaction, row in zip(transactions, rows):
+            dates, accounts, values = affected.setdefault(transaction[0], ({}, {}, []))
+            dates[transaction[1]] = None
+            accounts[transaction[6]] = None
+            values.append(self._transaction_values(transaction[0], transaction[1], transaction[2], row[3], row[4],
+                                                   transaction[5], transaction[8], transaction[9]))
+        self._publish(*(change_event(TRANSACTION_ADDED, ledger_id, dates, accounts, after=values)
+                        for ledger_id, (dates, accounts, values) in affected.items()))
+        return len(rows)
+    
+    @cached_query
+    def get_transactions(self, ledger_id):
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT * FROM transactions WHERE ledger_id = ? 
-                ORDER BY transaction_date DESC, created_time DESC
+                SELECT * FROM transaction_details WHERE ledger_id = ? 
+                ORDER BY transaction_date DESC, created_time DESC, id DESC
             ''', (ledger_id,))
             transactions = cursor.fetchall()
         return transactions
     
+    @cached_query
+    def get_transaction(self, transaction_id):
+        """按ID获取一条交易记录（列与 transaction_details 视图一致），不存在时返回 None"""
+        with self.get_read_connection() as conn:
+            return conn.execute(
+                'SELECT * FROM transaction_details WHERE id = ?', (transaction_id,)
+            ).fetchone()
+    
+    @cached_query
+    def get_transactions_page(self, ledger_id, page_size=200, page_token=None):
+        """按页获取账本的交易记录，排序与 get_transactions 相同
+
+        采用键集分页：page_token 为上一页返回的续页标记（首页传 None），
+        查询直接从索引中上一页最后一条记录之后开始，翻页耗时与页码无关。
+        返回 (交易记录列表, 下一页标记)，没有更多记录时下一页标记为 None。
+        """
+        page_size = max(1, int(page_size))
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            if page_token:
+                last_date, last_created, last_id = json.loads(page_token)
+                cursor.execute('''
+                    SELECT * FROM transaction_details 
+                    WHERE ledger_id = ? AND (transaction_date, created_time, id) < (?, ?, ?)
+                    ORDER BY transaction_date DESC, created_time DESC, id DESC
+                    LIMIT ?
+                ''', (ledger_id, last_date, last_created, last_id, page_size + 1))
+            else:
+                cursor.execute('''
+                    SELECT * FROM transaction_details WHERE ledger_id = ? 
+                    ORDER BY transaction_date DESC, created_time DESC, id DESC
+                    LIMIT ?
+                ''', (ledger_id, page_size + 1))
+            transactions = cursor.fetchall()
+        
+        # 多取一条用于判断是否还有下一页
+        if len(transactions) <= page_size:
+            return transactions, None
+        transactions = transactions[:page_size]
+        last = transactions[-1]
+        next_token = json.dumps([last['transaction_date'], last['created_time'], last['id']])
+        return transactions, next_token
+    
+    @cached_query
+    def search_transactions(self, ledger_id, keyword=None, category=None, subcategory=None, account=None,
+                            transaction_type=None, is_settled=None, has_refund=None,
+                            min_amount=None, max_amount=None, start_date=None, end_date=None):
+        """按条件搜索交易记录，未指定的条件不参与筛选
+
+        关键字长度达到 FTS_MIN_KEYWORD_LENGTH 时通过全文索引匹配备注、类别、账户和退款原因，
+        结果按相关度排序；一两个字的关键字（如“餐饮”“微信”）通过单字和双字索引匹配，结果按日期排序。
+        没有对应的索引，或短关键字含有空格、标点等分词时会拆开的字符时退回 LIKE 匹配。
+        返回 (交易记录列表, 高亮片段字典 {交易ID: 片段})。
+        """
+        use_fts = bool(keyword) and len(keyword) >= self.FTS_MIN_KEYWORD_LENGTH and self._has_fulltext_index()
+        use_short_fts = (bool(keyword) and len(keyword) < self.FTS_MIN_KEYWORD_LENGTH and keyword.isalnum()
+                         and self._has_fulltext_index('transactions_short_fts'))
+        
+        conditions = ["d.ledger_id = ?"]
+        params = [ledger_id]
+        
+        if keyword and not use_fts and not use_short_fts:
+            conditions.append("(LOWER(d.description) LIKE ? OR LOWER(d.category) LIKE ? OR LOWER(d.subcategory) LIKE ? "
+                              "OR LOWER(d.account) LIKE ? OR LOWER(d.refund_reason) LIKE ?)")
+            keyword_param = f"%{keyword.lower()}%"
+            params.extend([keyword_param] * 5)
+        
+        if category:
+            conditions.append("d.category = ?")
+            params.append(category)
+        
+        if subcategory:
+            conditions.append("d.subcategory = ?")
+            params.append(subcategory)
+        
+        if account:
+            conditions.append("d.account = ?")
+            params.append(account)
+        
+        if transaction_type:
+            conditions.append("d.transaction_type = ?")
+            params.append(transaction_type)
+        
+        if is_settled is not None:
+            conditions.append("d.is_settled = ?")
+            params.append(is_settled)
+        
+        if has_refund is not None:
+            conditions.append("d.refund_amount > 0" if has_refund else "d.refund_amount = 0")
+        
+        if min_amount is not None:
+            conditions.append("ABS(d.amount) >= ?")
+            params.append(to_cents(min_amount))
+        
+        if max_amount is not None:
+            conditions.append("ABS(d.amount) <= ?")
+            params.append(to_cents(max_amount))
+        
+        if start_date and end_date:
+            conditions.append("d.transaction_date BETWEEN ? AND ?")
+            params.extend([start_date, end_date])
+        
+        where = ' AND '.join(conditions)
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            if use_fts:
+                # 整个关键字作为一个短语匹配，双引号需要转义
+                phrase = '"' + keyword.replace('"', '""') + '"'
+                cursor.execute(f'''
+                    SELECT d.*, snippet(transactions_fts, -1, '【', '】', '…', 12) as snippet
+                    FROM transactions_fts
+                    JOIN transaction_details d ON d.id = transactions_fts.rowid
+                    WHERE transactions_fts MATCH ? AND {where}
+                    ORDER BY bm25(transactions_fts), d.transaction_date DESC, d.created_time DESC, d.id DESC
+                ''', [phrase] + params)
+                rows = cursor.fetchall()
+                transactions = [tuple(row)[:-1] for row in rows]
+                highlights = {row['id']: row['snippet'] for row in rows}
+            elif use_short_fts:
+                # 关键字只含字母和数字，恰好是一个单字或双字词元，不需要转义
+                cursor.execute(f'''
+                    SELECT d.* FROM transactions_short_fts
+                    JOIN transaction_details d ON d.id = transactions_short_fts.rowid
+                    WHERE transactions_short_fts MATCH ? AND {where}
+                    ORDER BY d.transaction_date DESC, d.created_time DESC, d.id DESC
+                ''', [f'"{keyword}"'] + params)
+                transactions = cursor.fetchall()
+                highlights = {}
+            else:
+                cursor.execute(f'''
+                    SELECT d.* FROM transaction_details d
+                    WHERE {where}
+                    ORDER BY d.transaction_date DESC, d.created_time DESC, d.id DESC
+                ''', params)
+                transactions = cursor.fetchall()
+                highlights = {}
+        return transactions, highlights
+    
+    def _has_fulltext_index(self, table='transactions_fts'):
+        """数据库是否建立了指定的全文索引表（SQLite 不支持 FTS5 或 trigram 分词时迁移会跳过）"""
+        if table not in self._fulltext_available:
+            with self.get_read_connection() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+            self._fulltext_available[table] = row is not None
+        return self._fulltext_available[table]
+    
+    @cached_query
+    def count_transactions(self, ledger_id):
+        """获取账本的交易总笔数"""
+        with self.get_read_connection() as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM transactions WHERE ledger_id = ?', (ledger_id,)
+            ).fetchone()[0]
+    
     def add_account(self, name, account_type, balance=0.0, bank=None, description=None):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO accounts (name, type, balance, bank, description)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (name, account_type, balance, bank, description))
+            ''', (name, account_type, to_cents(balance), bank, description))
             conn.commit()
+        self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=(name,)))
     
     def add_account_without_ledger(self, name, account_type, balance=0.0, bank=None, description=None):
         with self.get_connection() as conn:
@@ -291,46 +589,124 @@ class DatabaseManager:
             cursor.execute('''
                 INSERT INTO accounts (name, type, balance, bank, description)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (name, account_type, balance, bank, description))
+            ''', (name, account_type, to_cents(balance), bank, description))
             conn.commit()
+        self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=(name,)))
+    
+    def upsert_account(self, name, account_type, balance=0.0, bank=None, description=None):
+        """添加账户，同名账户已存在时原地更新其类型、余额和说明
+        
+        不使用 INSERT OR REPLACE：替换会删除原行并以新的ID插入，按账户ID引用的交易记录会失去账户。
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO accounts (name, type, balance, bank, description)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    type = excluded.type, balance = excluded.balance,
+                    bank = excluded.bank, description = excluded.description
+            ''', (name, account_type, to_cents(balance), bank, description))
+            conn.commit()
+        self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=(name,)))
     
     def update_account(self, account_id, name, account_type, balance, bank, description):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # 交易记录按账户ID引用，改名无需更新交易；资金流转仍记录账户名称，需同步
+            cursor.execute('SELECT name FROM accounts WHERE id = ?', (account_id,))
+            row = cursor.fetchone()
+            if row and row[0] != name:
+                cursor.execute('UPDATE transfers SET from_account = ? WHERE from_account = ?', (name, row[0]))
+                cursor.execute('UPDATE transfers SET to_account = ? WHERE to_account = ?', (name, row[0]))
             cursor.execute('''
                 UPDATE accounts SET name = ?, type = ?, balance = ?, bank = ?, description = ?
                 WHERE id = ?
-            ''', (name, account_type, balance, bank, description, account_id))
+            ''', (name, account_type, to_cents(balance), bank, description, account_id))
             conn.commit()
+        self._publish(change_event(ACCOUNT_CHANGED, accounts=[row[0] if row else None, name]))
     
     def delete_account(self, account_id):
+        """删除账户；仍有交易记录或转账引用该账户时抛出 ValueError，不做删除
+
+        交易记录按 account_id 关联账户，删除被引用的账户会使这些记录的账户名称为空，
+        账户统计也不再计入它们的金额，需先把这些记录改到其他账户或删除。
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('SELECT name FROM accounts WHERE id = ?', (account_id,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute('SELECT COUNT(*) FROM transactions WHERE account_id = ?', (account_id,))
+                transaction_count = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM transfers WHERE from_account = ? OR to_account = ?',
+                               (row[0], row[0]))
+                transfer_count = cursor.fetchone()[0]
+                if transaction_count or transfer_count:
+                    raise ValueError(f"账户 '{row[0]}' 仍有 {transaction_count} 条交易记录和 "
+                                     f"{transfer_count} 条转账记录，不能删除")
             cursor.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
             conn.commit()
+        if row:
+            self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=(row[0],)))
     
     def update_transaction(self, transaction_id, transaction_date, transaction_type, category, 
-                         subcategory, amount, account, description, is_settled, refund_amount, refund_reason):
+                         subcategory, amount, account, description, is_settled, refund_amount, refund_reason,
+                         adjust_balance=False):
+        """修改交易记录
+
+        adjust_balance 为 True 时在同一事务中调整账户余额：按数据库中保存的原记录
+        从原账户扣回原金额，再把新金额计入新账户（修改账户时两个账户分别调整）。
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            stored = self._get_stored_transaction(cursor, transaction_id)
+            category_id = self._get_category_id(cursor, transaction_type, category, subcategory)
+            account_id = self._get_account_id(cursor, account)
             cursor.execute('''
                 UPDATE transactions SET 
-                    transaction_date = ?, transaction_type = ?, category = ?, subcategory = ?,
-                    amount = ?, account = ?, description = ?, is_settled = ?, 
+                    transaction_date = ?, transaction_type = ?, category_id = ?, account_id = ?,
+                    amount = ?, description = ?, is_settled = ?, 
                     refund_amount = ?, refund_reason = ?
                 WHERE id = ?
-            ''', (transaction_date, transaction_type, category, subcategory, amount, account,
-                  description, is_settled, refund_amount, refund_reason, transaction_id))
+            ''', (transaction_date, transaction_type, category_id, account_id, to_cents(amount),
+                  description, is_settled, to_cents(refund_amount), refund_reason, transaction_id))
+            if stored is not None and adjust_balance:
+                old_values, _account = stored
+                self._adjust_balance(cursor, old_values.account_id or None, -old_values.amount)
+                self._adjust_balance(cursor, account_id, to_cents(amount))
             conn.commit()
+        if stored is not None:
+            old_values, old_account = stored
+            values = self._transaction_values(old_values.ledger_id, transaction_date, transaction_type,
+                                              category_id, account_id, amount, is_settled, refund_amount)
+            self._publish(change_event(TRANSACTION_UPDATED, old_values.ledger_id,
+                                            [old_values.transaction_date, transaction_date],
+                                            [old_account, account], transaction_id,
+                                            before=[old_values], after=[values]))
     
-    def delete_transaction(self, transaction_id):
+    def delete_transaction(self, transaction_id, adjust_balance=False):
+        """删除交易记录
+
+        adjust_balance 为 True 时在同一事务中按数据库中保存的金额从原账户余额中扣回。
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            stored = self._get_stored_transaction(cursor, transaction_id)
             cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+            if stored is not None and adjust_balance:
+                old_values, _account = stored
+                self._adjust_balance(cursor, old_values.account_id or None, -old_values.amount)
             conn.commit()
+        if stored is not None:
+            old_values, old_account = stored
+            self._publish(change_event(TRANSACTION_DELETED, old_values.ledger_id,
+                                            [old_values.transaction_date], [old_account],
+                                            transaction_id, before=[old_values]))
     
+    @cached_query
     def get_accounts(self):
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM accounts ORDER BY name')
             accounts = cursor.fetchall()
@@ -341,17 +717,39 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE accounts SET balance = balance + ? WHERE name = ?
-            ''', (amount_change, account_name))
+            ''', (to_cents(amount_change), account_name))
             conn.commit()
+        self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=(account_name,)))
     
-    def get_account_balance(self, account_name):
+    def update_balances_bulk(self, changes):
+        """批量调整账户余额，changes 为 (账户名称, 变动金额) 的序列
+
+        同一账户的多次变动先合并再写入，全部更新在一个事务中完成。
+        """
+        totals = {}
+        for account_name, amount_change in changes:
+            if account_name:
+                totals[account_name] = totals.get(account_name, 0) + to_cents(amount_change)
+        
         with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE accounts SET balance = balance + ? WHERE name = ?
+            ''', [(cents, name) for name, cents in totals.items()])
+            conn.commit()
+        if totals:
+            self._publish(ChangeEvent(ACCOUNT_CHANGED, accounts=tuple(totals)))
+    
+    @cached_query
+    def get_account_balance(self, account_name):
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT balance FROM accounts WHERE name = ?', (account_name,))
             result = cursor.fetchone()
-        return result[0] if result else 0.0
+        return result[0] if result else Money(0)
     
     def add_transfer(self, transfer_date, from_account, to_account, amount, description):
+        amount = to_cents(amount)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             created_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -361,6 +759,7 @@ class DatabaseManager:
                 INSERT INTO transfers (transfer_date, from_account, to_account, amount, description, created_time)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (transfer_date, from_account, to_account, amount, description, created_time))
+            transfer_id = cursor.lastrowid
             
             # 更新账户余额
             cursor.execute('''
@@ -372,9 +771,12 @@ class DatabaseManager:
             ''', (amount, to_account))
             
             conn.commit()
+        self._publish(change_event(TRANSFER_CHANGED, dates=[transfer_date],
+                                   accounts=[from_account, to_account], record_id=transfer_id))
     
+    @cached_query
     def get_transfers(self):
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM transfers ORDER BY transfer_date DESC, created_time DESC
@@ -385,34 +787,43 @@ class DatabaseManager:
     def update_transfer(self, transfer_id, transfer_date, from_account, to_account, amount, description):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('SELECT transfer_date, from_account, to_account FROM transfers WHERE id = ?', (transfer_id,))
+            old = cursor.fetchone() or (None, None, None)
             cursor.execute('''
                 UPDATE transfers SET 
                     transfer_date = ?, from_account = ?, to_account = ?, 
                     amount = ?, description = ?
                 WHERE id = ?
-            ''', (transfer_date, from_account, to_account, amount, description, transfer_id))
+            ''', (transfer_date, from_account, to_account, to_cents(amount), description, transfer_id))
             conn.commit()
+        self._publish(change_event(TRANSFER_CHANGED, dates=[old[0], transfer_date],
+                                   accounts=[old[1], old[2], from_account, to_account], record_id=transfer_id))
     
     def delete_transfer(self, transfer_id):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('SELECT transfer_date, from_account, to_account FROM transfers WHERE id = ?', (transfer_id,))
+            old = cursor.fetchone()
             cursor.execute('DELETE FROM transfers WHERE id = ?', (transfer_id,))
             conn.commit()
+        if old:
+            self._publish(change_event(TRANSFER_CHANGED, dates=[old[0]], accounts=old[1:], record_id=transfer_id))
     
+    @cached_query
     def get_transactions_by_date_range(self, start_date, end_date, ledger_id=None):
         """获取指定日期范围内的交易记录"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
-                    SELECT * FROM transactions 
+                    SELECT * FROM transaction_details 
                     WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ?
                     ORDER BY transaction_date DESC, created_time DESC
                 ''', (start_date, end_date, ledger_id))
             else:
                 cursor.execute('''
-                    SELECT * FROM transactions 
+                    SELECT * FROM transaction_details 
                     WHERE transaction_date BETWEEN ? AND ?
                     ORDER BY transaction_date DESC, created_time DESC
                 ''', (start_date, end_date))
@@ -420,63 +831,39 @@ class DatabaseManager:
             transactions = cursor.fetchall()
         return transactions
     
+    @cached_query
     def get_statistics_summary(self, start_date, end_date, ledger_id=None):
-        """获取收支汇总统计"""
-        with self.get_connection() as conn:
+        """获取收支汇总统计（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
+            # income/expense 分别是正、负金额的绝对值之和，两者之差即原始金额之和
             if ledger_id:
-                # 获取收入总额和退款
                 cursor.execute('''
                     SELECT 
-                        SUM(CASE WHEN transaction_type = "收入" THEN amount ELSE 0 END) as gross_income,
-                        SUM(CASE WHEN transaction_type = "收入" THEN refund_amount ELSE 0 END) as total_refund
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ?
+                        SUM(CASE WHEN transaction_type = '收入' THEN income - expense ELSE 0 END) as gross_income,
+                        SUM(CASE WHEN transaction_type = '收入' THEN refund_amount ELSE 0 END) as total_refund,
+                        SUM(CASE WHEN transaction_type = '支出' THEN income - expense ELSE 0 END) as gross_expense,
+                        SUM(CASE WHEN transaction_type = '支出' THEN refund_amount ELSE 0 END) as expense_refund
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ?
                 ''', (start_date, end_date, ledger_id))
-                
-                income_result = cursor.fetchone()
-                gross_income = income_result[0] or 0.0
-                total_refund = income_result[1] or 0.0
-                
-                # 获取支出总额和退款报销
-                cursor.execute('''
-                    SELECT 
-                        SUM(CASE WHEN transaction_type = "支出" THEN amount ELSE 0 END) as gross_expense,
-                        SUM(CASE WHEN transaction_type = "支出" THEN refund_amount ELSE 0 END) as expense_refund
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ?
-                ''', (start_date, end_date, ledger_id))
-                
-                expense_result = cursor.fetchone()
-                gross_expense = expense_result[0] or 0.0
-                expense_refund = expense_result[1] or 0.0
             else:
-                # 获取收入总额和退款
-                cursor.execute('''
-                    SELECT 
-                        SUM(CASE WHEN transaction_type = "收入" THEN amount ELSE 0 END) as gross_income,
-                        SUM(CASE WHEN transaction_type = "收入" THEN refund_amount ELSE 0 END) as total_refund
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ?
-                ''', (start_date, end_date))
-                
-                income_result = cursor.fetchone()
-                gross_income = income_result[0] or 0.0
-                total_refund = income_result[1] or 0.0
-                
-                # 获取支出总额和退款报销
                 cursor.execute('''
                     SELECT 
-                        SUM(CASE WHEN transaction_type = "支出" THEN amount ELSE 0 END) as gross_expense,
-                        SUM(CASE WHEN transaction_type = "支出" THEN refund_amount ELSE 0 END) as expense_refund
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ?
+                        SUM(CASE WHEN transaction_type = '收入' THEN income - expense ELSE 0 END) as gross_income,
+                        SUM(CASE WHEN transaction_type = '收入' THEN refund_amount ELSE 0 END) as total_refund,
+                        SUM(CASE WHEN transaction_type = '支出' THEN income - expense ELSE 0 END) as gross_expense,
+                        SUM(CASE WHEN transaction_type = '支出' THEN refund_amount ELSE 0 END) as expense_refund
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ?
                 ''', (start_date, end_date))
-                
-                expense_result = cursor.fetchone()
-                gross_expense = expense_result[0] or 0.0
-                expense_refund = expense_result[1] or 0.0
+            
+            result = cursor.fetchone()
+            gross_income = result[0] or Money(0)
+            total_refund = result[1] or Money(0)
+            gross_expense = result[2] or Money(0)
+            expense_refund = result[3] or Money(0)
         
         # 实际收入 = 收入总额 - 退款总额
         actual_income = gross_income - total_refund
@@ -497,29 +884,41 @@ class DatabaseManager:
             'total_expense': actual_expense  # 保持向后兼容
         }
     
+    @cached_query
     def get_category_statistics(self, start_date, end_date, transaction_type, level="parent", ledger_id=None):
-        """获取类别统计"""
-        with self.get_connection() as conn:
+        """获取类别统计（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if level == "parent":
-                category_field = "category"
+                category_field = "c.parent_category"
             else:
-                category_field = "subcategory"
+                category_field = "c.sub_category"
             
+            # 先按整数类别ID聚合，再关联类别表按名称合并，避免在大表上对字符串分组
             if ledger_id:
                 cursor.execute(f'''
-                    SELECT {category_field}, SUM(ABS(amount)) as amount, COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = ?
+                    SELECT {category_field}, SUM(s.amount) as amount, SUM(s.count) as count
+                    FROM (
+                        SELECT category_id, SUM(income + expense) as amount, SUM(txn_count) as count
+                        FROM daily_rollups 
+                        WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = ?
+                        GROUP BY category_id
+                    ) s
+                    JOIN categories c ON c.id = s.category_id
                     GROUP BY {category_field}
                     ORDER BY amount DESC
                 ''', (start_date, end_date, ledger_id, transaction_type))
             else:
                 cursor.execute(f'''
-                    SELECT {category_field}, SUM(ABS(amount)) as amount, COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND transaction_type = ?
+                    SELECT {category_field}, SUM(s.amount) as amount, SUM(s.count) as count
+                    FROM (
+                        SELECT category_id, SUM(income + expense) as amount, SUM(txn_count) as count
+                        FROM daily_rollups 
+                        WHERE rollup_date BETWEEN ? AND ? AND transaction_type = ?
+                        GROUP BY category_id
+                    ) s
+                    JOIN categories c ON c.id = s.category_id
                     GROUP BY {category_field}
                     ORDER BY amount DESC
                 ''', (start_date, end_date, transaction_type))
@@ -527,67 +926,77 @@ class DatabaseManager:
             results = cursor.fetchall()
         return results
     
+    @cached_query
     def get_account_statistics(self, start_date, end_date, ledger_id=None):
-        """获取账户统计"""
-        with self.get_connection() as conn:
+        """获取账户统计（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
-                    SELECT account, 
-                           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as income,
-                           SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expense,
-                           COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ? AND account IS NOT NULL AND account != ''
-                    GROUP BY account
-                    ORDER BY (income + expense) DESC
+                    SELECT a.name as account, s.income, s.expense, s.count
+                    FROM (
+                        SELECT account_id,
+                               SUM(income) as income,
+                               SUM(expense) as expense,
+                               SUM(txn_count) as count
+                        FROM daily_rollups 
+                        WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ? AND account_id != 0
+                        GROUP BY account_id
+                    ) s
+                    JOIN accounts a ON a.id = s.account_id
+                    ORDER BY (s.income + s.expense) DESC
                 ''', (start_date, end_date, ledger_id))
             else:
                 cursor.execute('''
-                    SELECT account, 
-                           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as income,
-                           SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expense,
-                           COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND account IS NOT NULL AND account != ''
-                    GROUP BY account
-                    ORDER BY (income + expense) DESC
+                    SELECT a.name as account, s.income, s.expense, s.count
+                    FROM (
+                        SELECT account_id,
+                               SUM(income) as income,
+                               SUM(expense) as expense,
+                               SUM(txn_count) as count
+                        FROM daily_rollups 
+                        WHERE rollup_date BETWEEN ? AND ? AND account_id != 0
+                        GROUP BY account_id
+                    ) s
+                    JOIN accounts a ON a.id = s.account_id
+                    ORDER BY (s.income + s.expense) DESC
                 ''', (start_date, end_date))
             
             results = cursor.fetchall()
         return results
     
+    @cached_query
     def get_settlement_statistics(self, start_date, end_date, ledger_id=None):
-        """获取销账状态统计"""
-        with self.get_connection() as conn:
+        """获取销账状态统计（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
                     SELECT 
                         is_settled,
-                        SUM(ABS(amount)) as amount,
-                        COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = '支出'
+                        SUM(income + expense) as amount,
+                        SUM(txn_count) as count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = '支出'
                     GROUP BY is_settled
                 ''', (start_date, end_date, ledger_id))
             else:
                 cursor.execute('''
                     SELECT 
                         is_settled,
-                        SUM(ABS(amount)) as amount,
-                        COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND transaction_type = '支出'
+                        SUM(income + expense) as amount,
+                        SUM(txn_count) as count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND transaction_type = '支出'
                     GROUP BY is_settled
                 ''', (start_date, end_date))
             
             results = cursor.fetchall()
         
-        settled_amount = 0.0
-        unsettled_amount = 0.0
+        settled_amount = Money(0)
+        unsettled_amount = Money(0)
         
         for row in results:
             if row[0] == 1:  # 已销账
@@ -601,22 +1010,23 @@ class DatabaseManager:
             'total_amount': settled_amount + unsettled_amount
         }
     
+    @cached_query
     def get_day_transactions(self, date, ledger_id=None):
         """获取指定日期的所有交易记录"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
                     SELECT created_time, transaction_type, category, subcategory, amount, account, description
-                    FROM transactions 
+                    FROM transaction_details 
                     WHERE transaction_date = ? AND ledger_id = ?
                     ORDER BY created_time
                 ''', (date, ledger_id))
             else:
                 cursor.execute('''
                     SELECT created_time, transaction_type, category, subcategory, amount, account, description
-                    FROM transactions 
+                    FROM transaction_details 
                     WHERE transaction_date = ?
                     ORDER BY created_time
                 ''', (date,))
@@ -624,40 +1034,42 @@ class DatabaseManager:
             transactions = cursor.fetchall()
         return transactions
     
+    @cached_query
     def get_week_trends(self, start_date, end_date, ledger_id=None):
-        """获取一周内每日收支趋势"""
-        with self.get_connection() as conn:
+        """获取一周内每日收支趋势（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
-                    SELECT transaction_date,
-                           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as income,
-                           SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expense,
-                           COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ?
-                    GROUP BY transaction_date
-                    ORDER BY transaction_date
+                    SELECT rollup_date as transaction_date,
+                           SUM(income) as income,
+                           SUM(expense) as expense,
+                           SUM(txn_count) as count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ?
+                    GROUP BY rollup_date
+                    ORDER BY rollup_date
                 ''', (start_date, end_date, ledger_id))
             else:
                 cursor.execute('''
-                    SELECT transaction_date,
-                           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as income,
-                           SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expense,
-                           COUNT(*) as count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ?
-                    GROUP BY transaction_date
-                    ORDER BY transaction_date
+                    SELECT rollup_date as transaction_date,
+                           SUM(income) as income,
+                           SUM(expense) as expense,
+                           SUM(txn_count) as count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ?
+                    GROUP BY rollup_date
+                    ORDER BY rollup_date
                 ''', (start_date, end_date))
             
             results = cursor.fetchall()
         return results
     
+    @cached_query
     def get_peak_consumption_hours(self, date, ledger_id=None):
         """获取指定日期的消费峰值时段"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
@@ -698,30 +1110,31 @@ class DatabaseManager:
             result = cursor.fetchone()
         return result
     
+    @cached_query
     def get_refund_statistics(self, start_date, end_date, ledger_id=None):
-        """获取退款统计"""
-        with self.get_connection() as conn:
+        """获取退款统计（基于日汇总表）"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             if ledger_id:
                 cursor.execute('''
                     SELECT 
                         SUM(refund_amount) as total_refund,
-                        COUNT(CASE WHEN refund_amount > 0 THEN 1 END) as refund_count,
-                        SUM(ABS(amount)) as total_amount,
-                        COUNT(*) as total_count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = '支出'
+                        SUM(refund_count) as refund_count,
+                        SUM(income + expense) as total_amount,
+                        SUM(txn_count) as total_count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND ledger_id = ? AND transaction_type = '支出'
                 ''', (start_date, end_date, ledger_id))
             else:
                 cursor.execute('''
                     SELECT 
                         SUM(refund_amount) as total_refund,
-                        COUNT(CASE WHEN refund_amount > 0 THEN 1 END) as refund_count,
-                        SUM(ABS(amount)) as total_amount,
-                        COUNT(*) as total_count
-                    FROM transactions 
-                    WHERE transaction_date BETWEEN ? AND ? AND transaction_type = '支出'
+                        SUM(refund_count) as refund_count,
+                        SUM(income + expense) as total_amount,
+                        SUM(txn_count) as total_count
+                    FROM daily_rollups 
+                    WHERE rollup_date BETWEEN ? AND ? AND transaction_type = '支出'
                 ''', (start_date, end_date))
             
             result = cursor.fetchone()
@@ -736,35 +1149,77 @@ class DatabaseManager:
             }
         else:
             return {
-                'total_refund': 0.0,
+                'total_refund': Money(0),
                 'refund_count': 0,
-                'total_amount': 0.0,
+                'total_amount': Money(0),
                 'total_count': 0,
                 'refund_ratio': 0.0
             }
     
+    def get_period_snapshot(self, start_date, end_date, ledger_id=None):
+        """获取区间内的全部统计数据，返回 PeriodSnapshot
+
+        代替分别调用 get_statistics_summary、get_category_statistics、get_account_statistics、
+        get_settlement_statistics 和 get_refund_statistics。
+        由实时区间汇总的前缀和相减得到，写入之后无需重新查询数据库。
+        """
+        return self._aggregates.snapshot(start_date, end_date, ledger_id)
+    
+    def get_period_totals(self, start_date, end_date, ledger_id=None, blocking=True):
+        """获取区间汇总（收支、退款、销账金额和笔数），返回只包含汇总字段的 PeriodSnapshot
+
+        拖动自定义日期范围或写入一条记录后都只需几次前缀和查找，可以立即刷新汇总卡片。
+        实时区间汇总首次使用或其他进程修改数据库后需要整体构建；blocking 为 False 时
+        不在当前线程中构建，也不等待其他线程，此时返回 None（界面线程中调用时使用）。
+        """
+        return self._aggregates.totals(start_date, end_date, ledger_id, blocking)
+    
     def add_budget(self, ledger_id, category, budget_type, amount, warning_threshold=80.0, start_date=None, end_date=None):
         """添加预算设置"""
-        if start_date is None:
-            if budget_type == 'monthly':
-                start_date = datetime.now().strftime('%Y-%m-01')
-            else:  # yearly
-                start_date = datetime.now().strftime('%Y-01-01')
+        self.upsert_budgets_bulk([(ledger_id, category, budget_type, amount, warning_threshold, start_date, end_date)])
+    
+    def upsert_budgets_bulk(self, budgets):
+        """批量添加或覆盖预算设置，全部写入在一个事务中完成
+
+        budgets 中每一项的字段顺序与 add_budget 的参数相同，可省略末尾的可选字段：
+        (ledger_id, category, budget_type, amount[, warning_threshold[, start_date[, end_date[, is_active]]]])
+        已存在的预算原地更新，保留其ID和创建时间。
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for budget in budgets:
+            ledger_id, category, budget_type, amount = budget[:4]
+            warning_threshold = budget[4] if len(budget) > 4 else 80.0
+            start_date = budget[5] if len(budget) > 5 else None
+            end_date = budget[6] if len(budget) > 6 else None
+            is_active = budget[7] if len(budget) > 7 else 1
+            if start_date is None:
+                if budget_type == 'monthly':
+                    start_date = datetime.now().strftime('%Y-%m-01')
+                else:  # yearly
+                    start_date = datetime.now().strftime('%Y-01-01')
+            rows.append((ledger_id, category, budget_type, to_cents(amount), warning_threshold,
+                         start_date, end_date, is_active, now, now))
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO budgets 
+            cursor.executemany('''
+                INSERT INTO budgets 
                 (ledger_id, category, budget_type, amount, warning_threshold, start_date, end_date, is_active, created_time, updated_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
-            ''', (ledger_id, category, budget_type, amount, warning_threshold, start_date, end_date, now, now))
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ledger_id, category, budget_type) DO UPDATE SET
+                    amount = excluded.amount, warning_threshold = excluded.warning_threshold,
+                    start_date = excluded.start_date, end_date = excluded.end_date,
+                    is_active = excluded.is_active, updated_time = excluded.updated_time
+            ''', rows)
             conn.commit()
+        ledger_ids = dict.fromkeys(row[0] for row in rows)
+        self._publish(*(ChangeEvent(BUDGET_CHANGED, ledger_id) for ledger_id in ledger_ids))
     
+    @cached_query
     def get_budgets(self, ledger_id):
         """获取账本的所有预算设置"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, category, budget_type, amount, warning_threshold, 
@@ -791,81 +1246,90 @@ class DatabaseManager:
             
             return budgets
     
+    @staticmethod
+    def _budget_period(budget_type, current_date):
+        """计算预算的统计日期范围 [开始, 结束)，月度预算为当月，其余按年度"""
+        year = int(current_date[:4])
+        if budget_type == 'monthly':
+            month = int(current_date[5:7])
+            stat_start = f"{year}-{month:02d}-01"
+            if month == 12:
+                stat_end = f"{year+1}-01-01"
+            else:
+                stat_end = f"{year}-{month+1:02d}-01"
+        else:  # yearly
+            stat_start = f"{year}-01-01"
+            stat_end = f"{year+1}-01-01"
+        return stat_start, stat_end
+    
+    @staticmethod
+    def _make_budget_progress(budget_amount, spent_amount, warning_threshold, start_date, end_date):
+        """由预算金额和实际支出计算进度信息"""
+        progress_percent = (spent_amount / budget_amount * 100) if budget_amount > 0 else 0
+        remaining_amount = budget_amount - spent_amount
+        is_warning = progress_percent >= warning_threshold
+        is_over_budget = progress_percent >= 100
+        
+        return {
+            'budget_amount': budget_amount,
+            'spent_amount': spent_amount,
+            'remaining_amount': remaining_amount,
+            'progress_percent': progress_percent,
+            'warning_threshold': warning_threshold,
+            'is_warning': is_warning,
+            'is_over_budget': is_over_budget,
+            'start_date': start_date,
+            'end_date': end_date
+        }
+    
+    def _budget_spending(self, ledger_id, budget_type, current_date, blocking=True):
+        """预算统计周期内各主类别的支出，返回 {主类别: 金额}；blocking 为 False 且不能立即得到时返回 None"""
+        stat_start, stat_end = self._budget_period(budget_type, current_date)
+        last_day = (date.fromisoformat(stat_end) - timedelta(days=1)).isoformat()
+        snapshot = self._aggregates.snapshot(stat_start, last_day, ledger_id, blocking)
+        if snapshot is None:
+            return None
+        return {name: amount for name, amount, _count in snapshot.category_stats("支出", "parent")}
+    
     def get_budget_progress(self, ledger_id, category, budget_type, current_date=None):
-        """获取预算执行进度"""
+        """获取预算执行进度，实际支出由实时区间汇总得到"""
         if current_date is None:
             current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 获取预算设置
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT amount, warning_threshold, start_date, end_date 
-                FROM budgets 
-                WHERE ledger_id = ? AND category = ? AND budget_type = ? AND is_active = 1
-            ''', (ledger_id, category, budget_type))
-            
-            budget_row = cursor.fetchone()
-            if not budget_row:
-                return None
-            
-            budget_amount, warning_threshold, start_date, end_date = budget_row
-            
-            # 计算统计日期范围
-            if budget_type == 'monthly':
-                year = int(current_date[:4])
-                month = int(current_date[5:7])
-                stat_start = f"{year}-{month:02d}-01"
-                if month == 12:
-                    stat_end = f"{year+1}-01-01"
-                else:
-                    stat_end = f"{year}-{month+1:02d}-01"
-            else:  # yearly
-                year = int(current_date[:4])
-                stat_start = f"{year}-01-01"
-                stat_end = f"{year+1}-01-01"
-            
-            # 获取实际支出
-            cursor.execute('''
-                SELECT COALESCE(SUM(ABS(amount)), 0) as spent
-                FROM transactions 
-                WHERE ledger_id = ? AND category = ? AND transaction_type = '支出'
-                AND transaction_date >= ? AND transaction_date < ?
-            ''', (ledger_id, category, stat_start, stat_end))
-            
-            spent_amount = cursor.fetchone()[0]
-            
-            # 计算进度
-            progress_percent = (spent_amount / budget_amount * 100) if budget_amount > 0 else 0
-            remaining_amount = budget_amount - spent_amount
-            is_warning = progress_percent >= warning_threshold
-            is_over_budget = progress_percent >= 100
-            
-            return {
-                'budget_amount': budget_amount,
-                'spent_amount': spent_amount,
-                'remaining_amount': remaining_amount,
-                'progress_percent': progress_percent,
-                'warning_threshold': warning_threshold,
-                'is_warning': is_warning,
-                'is_over_budget': is_over_budget,
-                'start_date': start_date,
-                'end_date': end_date
-            }
+        for budget in self.get_budgets(ledger_id):
+            if budget['category'] == category and budget['budget_type'] == budget_type:
+                spent_amount = self._budget_spending(ledger_id, budget_type, current_date).get(category, Money(0))
+                return self._make_budget_progress(budget['amount'], spent_amount, budget['warning_threshold'],
+                                                  budget['start_date'], budget['end_date'])
+        return None
     
-    def get_all_budget_progress(self, ledger_id, current_date=None):
-        """获取所有预算的执行进度"""
-        budgets = self.get_budgets(ledger_id)
-        progress_list = []
+    def get_all_budget_progress(self, ledger_id, current_date=None, blocking=True):
+        """获取所有预算的执行进度
+
+        预算设置来自 get_budgets（查询缓存），当月和当年的支出各由一次实时区间汇总得到。
+        blocking 为 False 时与 get_period_totals 相同：实时区间汇总需要构建或正被其他线程使用时
+        返回 None，界面线程中调用时使用，由调用方改在后台线程中计算。
+        """
+        if current_date is None:
+            current_date = datetime.now().strftime('%Y-%m-%d')
         
-        for budget in budgets:
-            progress = self.get_budget_progress(ledger_id, budget['category'], budget['budget_type'], current_date)
-            if progress:
-                progress.update({
-                    'category': budget['category'],
-                    'budget_type': budget['budget_type']
-                })
-                progress_list.append(progress)
+        spending = {}
+        progress_list = []
+        for budget in self.get_budgets(ledger_id):
+            budget_type = budget['budget_type']
+            period = 'monthly' if budget_type == 'monthly' else 'yearly'
+            if period not in spending:
+                spending[period] = self._budget_spending(ledger_id, period, current_date, blocking)
+                if spending[period] is None:
+                    return None
+            spent_amount = spending[period].get(budget['category'], Money(0))
+            progress = self._make_budget_progress(budget['amount'], spent_amount, budget['warning_threshold'],
+                                                  budget['start_date'], budget['end_date'])
+            progress.update({
+                'id': budget['id'],
+                'category': budget['category'],
+                'budget_type': budget_type
+            })
+            progress_list.append(progress)
         
         return progress_list
     
@@ -878,7 +1342,7 @@ class DatabaseManager:
             
             if amount is not None:
                 updates.append('amount = ?')
-                params.append(amount)
+                params.append(to_cents(amount))
             if warning_threshold is not None:
                 updates.append('warning_threshold = ?')
                 params.append(warning_threshold)
@@ -892,7 +1356,12 @@ class DatabaseManager:
                 updates.append('is_active = ?')
                 params.append(is_active)
             
+            ledger_id = None
             if updates:
+                cursor.execute('SELECT ledger_id FROM budgets WHERE id = ?', (budget_id,))
+                row = cursor.fetchone()
+                ledger_id = row[0] if row else None
+                
                 updates.append('updated_time = ?')
                 params.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
                 params.append(budget_id)
@@ -900,23 +1369,34 @@ class DatabaseManager:
                 query = f"UPDATE budgets SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, params)
                 conn.commit()
+        if ledger_id is not None:
+            self._publish(ChangeEvent(BUDGET_CHANGED, ledger_id))
     
     def delete_budget(self, budget_id):
         """删除预算设置"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('SELECT ledger_id FROM budgets WHERE id = ?', (budget_id,))
+            row = cursor.fetchone()
             cursor.execute('DELETE FROM budgets WHERE id = ?', (budget_id,))
             conn.commit()
+        if row:
+            self._publish(ChangeEvent(BUDGET_CHANGED, row[0]))
     
     def copy_budgets(self, from_ledger_id, to_ledger_id, budget_type='monthly'):
         """复制预算设置到其他账本"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO budgets 
+                INSERT INTO budgets 
                 (ledger_id, category, budget_type, amount, warning_threshold, start_date, end_date, is_active, created_time, updated_time)
                 SELECT ?, category, budget_type, amount, warning_threshold, start_date, end_date, is_active, ?, ?
                 FROM budgets 
                 WHERE ledger_id = ? AND budget_type = ? AND is_active = 1
+                ON CONFLICT(ledger_id, category, budget_type) DO UPDATE SET
+                    amount = excluded.amount, warning_threshold = excluded.warning_threshold,
+                    start_date = excluded.start_date, end_date = excluded.end_date,
+                    is_active = excluded.is_active, updated_time = excluded.updated_time
             ''', (to_ledger_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), from_ledger_id, budget_type))
-            conn.commit()
\ No newline at end of file
+            conn.commit()
+        self._publish(ChangeEvent(BUDGET_CHANGED, to_ledger_id))
\ No newline at end of file
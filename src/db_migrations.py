@@ -0,0 +1,692 @@
+"""
+数据库版本迁移模块
+使用 PRAGMA user_version 记录数据库结构版本，启动时只执行尚未应用的迁移。
+新增表、索引或修改字段时，在 MIGRATIONS 末尾追加一个新的编号迁移即可。
+"""
+
+import sqlite3
+
+# 默认支出类别
+DEFAULT_EXPENSE_CATEGORIES = [
+    ("餐饮", ["零食", "外卖", "食堂", "堂食", "水果", "饮料", "聚餐"]),
+    ("休闲娱乐", ["电影", "游戏", "体育", "音乐", "旅游", "美妆", "宠物", "按摩", "健身", "会员"]),
+    ("生活缴费", ["水电费", "物业费", "燃气费", "网费", "话费", "房贷", "房租", "取暖费", "车位费"]),
+    ("交通", ["公交", "地铁", "共享单车", "共享电动车", "火车", "高铁", "飞机", "打车"]),
+    ("教育", ["考试费", "培训费", "资料费", "文具"]),
+    ("购物", ["服饰", "果蔬", "数码", "家电", "日用品", "家具"]),
+    ("汽车", ["充电/油", "保养", "维修", "过路费", "停车费"]),
+    ("医疗健康", ["药品", "住院", "体检", "保健品", "门诊", "疫苗接种"]),
+    ("社交人情", ["红包", "礼物", "请客", "捐赠", "团建费"]),
+    ("金融保险", ["保险", "投资", "贷款", "理财"]),
+    ("其他", ["快递费", "党费", "罚款", "借款", "手续费", "维修费", "班费"]),
+    ("儿童", ["母婴", "教育", "服装", "玩具", "医疗", "生活费"])
+]
+
+# 默认收入类别
+DEFAULT_INCOME_CATEGORIES = [
+    ("薪资", ["工作薪资", "副业收入", "奖金补贴"]),
+    ("生活费", ["家庭转账", "亲友资助"]),
+    ("理财", ["股票基金", "存款利息", "借贷回款", "房产租金"]),
+    ("人情往来", ["红包", "礼物"]),
+    ("其他", ["闲置变卖", "商家奖励", "赛事奖金", "奖学金", "版权费"])
+]
+
+
+def default_category_rows():
+    """生成默认类别的 (parent_category, sub_category, type) 行"""
+    rows = []
+    for parent, subs in DEFAULT_EXPENSE_CATEGORIES:
+        for sub in subs:
+            rows.append((parent, sub, "支出"))
+    for parent, subs in DEFAULT_INCOME_CATEGORIES:
+        for sub in subs:
+            rows.append((parent, sub, "收入"))
+    return rows
+
+
+def _migration_1_initial_schema(cursor):
+    """初始表结构、索引和默认类别"""
+    # 创建账本表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ledgers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            created_time TEXT NOT NULL,
+            ledger_type TEXT NOT NULL,
+            description TEXT
+        )
+    ''')
+
+    # 创建收支类别表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_category TEXT NOT NULL,
+            sub_category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            UNIQUE(parent_category, sub_category)
+        )
+    ''')
+
+    # 创建账户表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            balance REAL DEFAULT 0.0,
+            bank TEXT,
+            description TEXT
+        )
+    ''')
+
+    # 创建交易记录表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ledger_id INTEGER NOT NULL,
+            transaction_date TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            subcategory TEXT NOT NULL,
+            amount REAL NOT NULL,
+            account TEXT,
+            description TEXT,
+            is_settled BOOLEAN DEFAULT FALSE,
+            refund_amount REAL DEFAULT 0.0,
+            refund_reason TEXT,
+            created_time TEXT NOT NULL,
+            FOREIGN KEY (ledger_id) REFERENCES ledgers (id)
+        )
+    ''')
+
+    # 创建资金流转表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transfers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transfer_date TEXT NOT NULL,
+            from_account TEXT NOT NULL,
+            to_account TEXT NOT NULL,
+            amount REAL NOT NULL,
+            description TEXT,
+            created_time TEXT NOT NULL
+        )
+    ''')
+
+    # 创建预算表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ledger_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            budget_type TEXT NOT NULL,  -- 'monthly' or 'yearly'
+            amount REAL NOT NULL,
+            warning_threshold REAL DEFAULT 80.0,  -- 预警阈值百分比
+            start_date TEXT NOT NULL,  -- 生效开始日期
+            end_date TEXT,  -- 生效结束日期，为空表示持续有效
+            is_active BOOLEAN DEFAULT TRUE,  -- 是否启用
+            created_time TEXT NOT NULL,
+            updated_time TEXT NOT NULL,
+            FOREIGN KEY (ledger_id) REFERENCES ledgers (id),
+            UNIQUE(ledger_id, category, budget_type)
+        )
+    ''')
+
+    # 创建索引以提高查询性能
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(transaction_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_ledger ON transactions(ledger_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions(account)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transfers_date ON transfers(transfer_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_name ON accounts(name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_ledger ON budgets(ledger_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_category ON budgets(category)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_type ON budgets(budget_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_active ON budgets(is_active)')
+
+    # 插入默认类别数据
+    cursor.executemany('''
+        INSERT OR IGNORE INTO categories (parent_category, sub_category, type)
+        VALUES (?, ?, ?)
+    ''', default_category_rows())
+
+
+def _migration_2_covering_indexes(cursor):
+    """按统计查询的访问路径建立复合覆盖索引"""
+    # 按账本+日期范围的统计（汇总、类别、账户、销账、退款、每日趋势），查询所需列全部在索引内
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_ledger_date_cover ON transactions(
+            ledger_id, transaction_date, transaction_type, category, subcategory,
+            account, is_settled, amount, refund_amount)
+    ''')
+    # 不区分账本、只按日期范围的统计
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_cover ON transactions(
+            transaction_date, transaction_type, category, subcategory,
+            account, is_settled, amount, refund_amount)
+    ''')
+    # 预算进度：账本、类型、类别等值匹配后按日期取范围
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_budget_cover ON transactions(
+            ledger_id, transaction_type, category, transaction_date, amount)
+    ''')
+
+    # 被复合索引前缀覆盖或选择性过低的单列索引，只会增加写入开销
+    cursor.execute('DROP INDEX IF EXISTS idx_transactions_date')
+    cursor.execute('DROP INDEX IF EXISTS idx_transactions_ledger')
+    cursor.execute('DROP INDEX IF EXISTS idx_transactions_type')
+
+    # 收集统计信息，让查询规划器在多个覆盖索引之间做出正确选择
+    cursor.execute('ANALYZE')
+
+
+def _rebuild_table(cursor, table, create_sql, select_sql, restore_indexes=True):
+    """按SQLite推荐的方式重建表：建新表、复制数据、删旧表、改名并恢复索引
+
+    create_sql 中的表名写作 {table}，select_sql 从旧表查询出新表的全部列。
+    列发生变化时传入 restore_indexes=False，由调用方重新建立索引。
+    """
+    index_sqls = []
+    if restore_indexes:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,))
+        index_sqls = [row[0] for row in cursor.fetchall()]
+
+    new_table = f"{table}_new"
+    cursor.execute(create_sql.format(table=new_table))
+    cursor.execute(f"INSERT INTO {new_table} {select_sql}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for index_sql in index_sqls:
+        cursor.execute(index_sql)
+
+
+def _migration_3_integer_cents(cursor):
+    """金额字段由REAL改为以分为单位的INTEGER"""
+    _rebuild_table(cursor, 'accounts', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            balance INTEGER DEFAULT 0,  -- 单位：分
+            bank TEXT,
+            description TEXT
+        )
+    ''', '''
+        SELECT id, name, type, CAST(ROUND(COALESCE(balance, 0) * 100) AS INTEGER), bank, description
+        FROM accounts
+    ''')
+
+    _rebuild_table(cursor, 'transactions', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ledger_id INTEGER NOT NULL,
+            transaction_date TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            subcategory TEXT NOT NULL,
+            amount INTEGER NOT NULL,  -- 单位：分，支出为负数
+            account TEXT,
+            description TEXT,
+            is_settled BOOLEAN DEFAULT FALSE,
+            refund_amount INTEGER DEFAULT 0,  -- 单位：分
+            refund_reason TEXT,
+            created_time TEXT NOT NULL,
+            FOREIGN KEY (ledger_id) REFERENCES ledgers (id)
+        )
+    ''', '''
+        SELECT id, ledger_id, transaction_date, transaction_type, category, subcategory,
+               CAST(ROUND(amount * 100) AS INTEGER), account, description, is_settled,
+               CAST(ROUND(COALESCE(refund_amount, 0) * 100) AS INTEGER), refund_reason, created_time
+        FROM transactions
+    ''')
+
+    _rebuild_table(cursor, 'transfers', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transfer_date TEXT NOT NULL,
+            from_account TEXT NOT NULL,
+            to_account TEXT NOT NULL,
+            amount INTEGER NOT NULL,  -- 单位：分
+            description TEXT,
+            created_time TEXT NOT NULL
+        )
+    ''', '''
+        SELECT id, transfer_date, from_account, to_account,
+               CAST(ROUND(amount * 100) AS INTEGER), description, created_time
+        FROM transfers
+    ''')
+
+    _rebuild_table(cursor, 'budgets', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ledger_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            budget_type TEXT NOT NULL,  -- 'monthly' or 'yearly'
+            amount INTEGER NOT NULL,  -- 单位：分
+            warning_threshold REAL DEFAULT 80.0,  -- 预警阈值百分比
+            start_date TEXT NOT NULL,  -- 生效开始日期
+            end_date TEXT,  -- 生效结束日期，为空表示持续有效
+            is_active BOOLEAN DEFAULT TRUE,  -- 是否启用
+            created_time TEXT NOT NULL,
+            updated_time TEXT NOT NULL,
+            FOREIGN KEY (ledger_id) REFERENCES ledgers (id),
+            UNIQUE(ledger_id, category, budget_type)
+        )
+    ''', '''
+        SELECT id, ledger_id, category, budget_type, CAST(ROUND(amount * 100) AS INTEGER),
+               warning_threshold, start_date, end_date, is_active, created_time, updated_time
+        FROM budgets
+    ''')
+
+    # 重建后的表没有统计信息，重新收集
+    cursor.execute('ANALYZE')
+
+
+def _migration_4_foreign_keys(cursor):
+    """交易记录的类别和账户改为引用 categories.id / accounts.id"""
+    # 补全交易中出现但类别表里没有的类别（例如导入的自定义类别）
+    cursor.execute('''
+        INSERT OR IGNORE INTO categories (parent_category, sub_category, type)
+        SELECT category, subcategory, MIN(transaction_type)
+        FROM transactions
+        GROUP BY category, subcategory
+    ''')
+    # 补全交易中出现但账户表里没有的账户，保证历史记录不丢失账户名称
+    cursor.execute('''
+        INSERT OR IGNORE INTO accounts (name, type, balance)
+        SELECT DISTINCT account, '其他', 0
+        FROM transactions
+        WHERE account IS NOT NULL AND account != ''
+    ''')
+
+    _rebuild_table(cursor, 'transactions', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ledger_id INTEGER NOT NULL,
+            transaction_date TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            account_id INTEGER,
+            amount INTEGER NOT NULL,  -- 单位：分，支出为负数
+            description TEXT,
+            is_settled BOOLEAN DEFAULT FALSE,
+            refund_amount INTEGER DEFAULT 0,  -- 单位：分
+            refund_reason TEXT,
+            created_time TEXT NOT NULL,
+            FOREIGN KEY (ledger_id) REFERENCES ledgers (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+    ''', '''
+        SELECT t.id, t.ledger_id, t.transaction_date, t.transaction_type,
+               c.id, a.id, t.amount, t.description, t.is_settled,
+               t.refund_amount, t.refund_reason, t.created_time
+        FROM transactions t
+        JOIN categories c ON c.parent_category = t.category AND c.sub_category = t.subcategory
+        LEFT JOIN accounts a ON a.name = t.account
+    ''', restore_indexes=False)
+
+    # 按新的整数列重建索引
+    cursor.execute('''
+        CREATE INDEX idx_transactions_ledger_date_cover ON transactions(
+            ledger_id, transaction_date, transaction_type, category_id,
+            account_id, is_settled, amount, refund_amount)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_transactions_date_cover ON transactions(
+            transaction_date, transaction_type, category_id,
+            account_id, is_settled, amount, refund_amount)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_transactions_budget_cover ON transactions(
+            ledger_id, transaction_type, category_id, transaction_date, amount)
+    ''')
+    cursor.execute('CREATE INDEX idx_transactions_account ON transactions(account_id)')
+
+    # 对外仍以名称呈现交易记录，列与原 transactions 表一致
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS transaction_details AS
+        SELECT t.id, t.ledger_id, t.transaction_date, t.transaction_type,
+               c.parent_category AS category, c.sub_category AS subcategory,
+               t.amount, a.name AS account, t.description, t.is_settled,
+               t.refund_amount, t.refund_reason, t.created_time
+        FROM transactions t
+        JOIN categories c ON c.id = t.category_id
+        LEFT JOIN accounts a ON a.id = t.account_id
+    ''')
+
+    cursor.execute('ANALYZE')
+
+
+# 日汇总表的分组键：账本、日期、收支类型、类别ID（对应大类+小类）、账户ID（0表示未选择账户）、销账状态
+_ROLLUP_KEY = "ledger_id, rollup_date, transaction_type, category_id, account_id, is_settled"
+
+
+def _rollup_values(row):
+    """生成某一行交易（NEW 或 OLD）在日汇总表中的键和度量值表达式"""
+    return (f"{row}.ledger_id, {row}.transaction_date, {row}.transaction_type, {row}.category_id, "
+            f"COALESCE({row}.account_id, 0), CASE WHEN {row}.is_settled = 1 THEN 1 ELSE 0 END, "
+            f"CASE WHEN {row}.amount > 0 THEN {row}.amount ELSE 0 END, "
+            f"CASE WHEN {row}.amount < 0 THEN -{row}.amount ELSE 0 END, "
+            f"COALESCE({row}.refund_amount, 0), 1, "
+            f"CASE WHEN {row}.refund_amount > 0 THEN 1 ELSE 0 END")
+
+
+def _rollup_add_sql(row):
+    return f'''
+        INSERT INTO daily_rollups ({_ROLLUP_KEY}, income, expense, refund_amount, txn_count, refund_count)
+        VALUES ({_rollup_values(row)})
+        ON CONFLICT ({_ROLLUP_KEY}) DO UPDATE SET
+            income = income + excluded.income,
+            expense = expense + excluded.expense,
+            refund_amount = refund_amount + excluded.refund_amount,
+            txn_count = txn_count + excluded.txn_count,
+            refund_count = refund_count + excluded.refund_count;
+    '''
+
+
+def _rollup_remove_sql(row):
+    key_match = (f"ledger_id = {row}.ledger_id AND rollup_date = {row}.transaction_date "
+                 f"AND transaction_type = {row}.transaction_type AND category_id = {row}.category_id "
+                 f"AND account_id = COALESCE({row}.account_id, 0) "
+                 f"AND is_settled = CASE WHEN {row}.is_settled = 1 THEN 1 ELSE 0 END")
+    return f'''
+        UPDATE daily_rollups SET
+            income = income - CASE WHEN {row}.amount > 0 THEN {row}.amount ELSE 0 END,
+            expense = expense - CASE WHEN {row}.amount < 0 THEN -{row}.amount ELSE 0 END,
+            refund_amount = refund_amount - COALESCE({row}.refund_amount, 0),
+            txn_count = txn_count - 1,
+            refund_count = refund_count - CASE WHEN {row}.refund_amount > 0 THEN 1 ELSE 0 END
+        WHERE {key_match};
+        DELETE FROM daily_rollups WHERE {key_match} AND txn_count <= 0;
+    '''
+
+
+def _migration_5_daily_rollups(cursor):
+    """按日汇总表，由触发器随交易记录的增删改自动维护"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            ledger_id INTEGER NOT NULL,
+            rollup_date TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,  -- 0 表示未选择账户
+            is_settled INTEGER NOT NULL,
+            income INTEGER NOT NULL DEFAULT 0,  -- 正数金额之和（分）
+            expense INTEGER NOT NULL DEFAULT 0,  -- 负数金额绝对值之和（分）
+            refund_amount INTEGER NOT NULL DEFAULT 0,  -- 退款之和（分）
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            refund_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({_ROLLUP_KEY})
+        ) WITHOUT ROWID
+    ''')
+    # 不区分账本的日期范围统计
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_rollups_date ON daily_rollups(
+            rollup_date, transaction_type, category_id, account_id, is_settled,
+            income, expense, refund_amount, txn_count, refund_count)
+    ''')
+
+    # 回填已有交易
+    cursor.execute(f'''
+        INSERT INTO daily_rollups ({_ROLLUP_KEY}, income, expense, refund_amount, txn_count, refund_count)
+        SELECT ledger_id, transaction_date, transaction_type, category_id,
+               COALESCE(account_id, 0), CASE WHEN is_settled = 1 THEN 1 ELSE 0 END,
+               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+               SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END),
+               SUM(COALESCE(refund_amount, 0)),
+               COUNT(*),
+               SUM(CASE WHEN refund_amount > 0 THEN 1 ELSE 0 END)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4, 5, 6
+    ''')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            {_rollup_add_sql('NEW')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            {_rollup_remove_sql('OLD')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+        AFTER UPDATE OF ledger_id, transaction_date, transaction_type, category_id, account_id,
+                        is_settled, amount, refund_amount ON transactions
+        BEGIN
+            {_rollup_remove_sql('OLD')}
+            {_rollup_add_sql('NEW')}
+        END
+    ''')
+
+    # 预算进度改由日汇总表计算，专用覆盖索引不再需要
+    cursor.execute('DROP INDEX IF EXISTS idx_transactions_budget_cover')
+    cursor.execute('ANALYZE')
+
+
+def _migration_6_listing_index(cursor):
+    """交易列表分页索引，与列表排序 (日期, 创建时间, ID) 降序一致"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_ledger_listing ON transactions(
+            ledger_id, transaction_date DESC, created_time DESC, id DESC)
+    ''')
+    cursor.execute('ANALYZE')
+
+
+def _fts_row_sql(row):
+    """生成某一行交易（NEW 或 OLD）在全文索引中的各列取值"""
+    return (f"{row}.id, {row}.description, "
+            f"(SELECT parent_category FROM categories WHERE id = {row}.category_id), "
+            f"(SELECT sub_category FROM categories WHERE id = {row}.category_id), "
+            f"(SELECT name FROM accounts WHERE id = {row}.account_id), "
+            f"{row}.refund_reason")
+
+
+def _migration_7_fulltext_search(cursor):
+    """交易记录全文索引（FTS5 trigram 分词，适用于中文），由触发器与交易表保持同步
+
+    SQLite 未编译 FTS5 或版本过低不支持 trigram 时跳过，关键字搜索退回 LIKE 查询。
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                description, category, subcategory, account, refund_reason,
+                tokenize = 'trigram'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+
+    cursor.execute('''
+        INSERT INTO transactions_fts (rowid, description, category, subcategory, account, refund_reason)
+        SELECT id, description, category, subcategory, account, refund_reason FROM transaction_details
+    ''')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category, subcategory, account, refund_reason)
+            VALUES ({_fts_row_sql('NEW')});
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM transactions_fts WHERE rowid = OLD.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF description, category_id, account_id, refund_reason ON transactions
+        BEGIN
+            DELETE FROM transactions_fts WHERE rowid = OLD.id;
+            INSERT INTO transactions_fts (rowid, description, category, subcategory, account, refund_reason)
+            VALUES ({_fts_row_sql('NEW')});
+        END
+    ''')
+
+    # 类别或账户改名时同步更新索引中的名称
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_categories_fts_rename
+        AFTER UPDATE OF parent_category, sub_category ON categories
+        BEGIN
+            UPDATE transactions_fts SET category = NEW.parent_category, subcategory = NEW.sub_category
+            WHERE rowid IN (SELECT id FROM transactions WHERE category_id = NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_accounts_fts_rename
+        AFTER UPDATE OF name ON accounts
+        BEGIN
+            UPDATE transactions_fts SET account = NEW.name
+            WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+        END
+    ''')
+
+
+# 短关键字索引覆盖的文本长度：每条交易记录各字段合计的前若干个字符
+SHORT_KEYWORD_INDEX_CHARS = 4096
+
+
+def _short_grams_sql(where):
+    """生成交易记录的单字和双字词元：(交易ID, 以空格分隔的词元)，where 为筛选 transaction_details 的条件
+
+    触发器中不能使用 WITH 递归生成序号，字符位置来自 fts_positions 表；
+    各字段之间以空格分隔，分词时跨字段的双字会被拆开，不会产生跨字段的词元。
+    """
+    return f'''
+        SELECT s.id, (SELECT group_concat(substr(s.text, p.n, 1) || ' ' || substr(s.text, p.n, 2), ' ')
+                      FROM fts_positions p WHERE p.n <= length(s.text))
+        FROM (SELECT id, coalesce(description, '') || ' ' || coalesce(category, '') || ' ' ||
+                         coalesce(subcategory, '') || ' ' || coalesce(account, '') || ' ' ||
+                         coalesce(refund_reason, '') AS text
+              FROM transaction_details WHERE {where}) s
+    '''
+
+
+def _migration_8_short_keyword_index(cursor):
+    """一两个字的关键字（如“餐饮”“外卖”“微信”）的全文索引
+
+    trigram 分词只能匹配三个字符及以上的关键字。这里另建一个 FTS5 表，
+    把备注、类别、账户和退款原因拆成以空格分隔的单字和双字，由 unicode61 分词逐个索引，
+    一两个字的关键字恰好对应其中一个词元。词元在触发器中由 SQL 生成，其他程序写入时同样保持同步。
+    SQLite 未编译 FTS5 时跳过，短关键字搜索退回 LIKE 查询。
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_short_fts USING fts5(
+                grams, tokenize = 'unicode61'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS fts_positions (n INTEGER PRIMARY KEY)')
+    cursor.executemany('INSERT OR IGNORE INTO fts_positions (n) VALUES (?)',
+                       ((n,) for n in range(1, SHORT_KEYWORD_INDEX_CHARS + 1)))
+
+    cursor.execute(f'INSERT INTO transactions_short_fts (rowid, grams) {_short_grams_sql("1")}')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_short_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_short_fts (rowid, grams) {_short_grams_sql("id = NEW.id")};
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_short_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM transactions_short_fts WHERE rowid = OLD.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_short_fts_update
+        AFTER UPDATE OF description, category_id, account_id, refund_reason ON transactions
+        BEGIN
+            DELETE FROM transactions_short_fts WHERE rowid = OLD.id;
+            INSERT INTO transactions_short_fts (rowid, grams) {_short_grams_sql("id = NEW.id")};
+        END
+    ''')
+
+    # 类别或账户改名时重新生成引用它的交易记录的词元
+    by_category = "id IN (SELECT id FROM transactions WHERE category_id = NEW.id)"
+    by_account = "id IN (SELECT id FROM transactions WHERE account_id = NEW.id)"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_categories_short_fts_rename
+        AFTER UPDATE OF parent_category, sub_category ON categories
+        BEGIN
+            DELETE FROM transactions_short_fts
+            WHERE rowid IN (SELECT id FROM transactions WHERE category_id = NEW.id);
+            INSERT INTO transactions_short_fts (rowid, grams) {_short_grams_sql(by_category)};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_accounts_short_fts_rename
+        AFTER UPDATE OF name ON accounts
+        BEGIN
+            DELETE FROM transactions_short_fts
+            WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+            INSERT INTO transactions_short_fts (rowid, grams) {_short_grams_sql(by_account)};
+        END
+    ''')
+
+
+# 迁移列表：(版本号, 说明, 迁移函数)，版本号必须连续递增
+MIGRATIONS = [
+    (1, '初始表结构与默认类别', _migration_1_initial_schema),
+    (2, '统计查询复合覆盖索引', _migration_2_covering_indexes),
+    (3, '金额改为整数分存储', _migration_3_integer_cents),
+    (4, '交易记录引用类别和账户ID', _migration_4_foreign_keys),
+    (5, '按日汇总表及维护触发器', _migration_5_daily_rollups),
+    (6, '交易列表分页索引', _migration_6_listing_index),
+    (7, '交易记录全文索引', _migration_7_fulltext_search),
+    (8, '短关键字全文索引', _migration_8_short_keyword_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """读取数据库当前的结构版本"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """将数据库升级到最新版本，返回升级后的版本号
+
+    每个迁移在独立的事务中执行并同时写入 user_version，
+    迁移失败时回滚，数据库保持在上一个版本。
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for number, description, apply_migration in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            apply_migration(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = number
+
+    return version
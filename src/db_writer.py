@@ -0,0 +1,121 @@
+"""
+数据库写入线程模块
+由一个专用线程执行排队的写操作：调用方提交后立即得到 Future，不会等待磁盘写入。
+写入线程把已经排队以及 linger 时间内到达的写操作合并到同一个事务中统一提交（组提交），
+例如异步接口（async_database_manager）并发提交的大量写操作；
+间隔较长的写操作（如用户在对话框中逐条录入）仍然各自提交。
+
+写入线程并不独占写连接：它和 DatabaseManager 的同步写方法共用连接池中唯一的写连接，
+每批写操作在批量事务期间持有写锁，批量之间其他线程的同步写入照常进行。
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """单写线程：按提交顺序执行写操作，并把一批写操作合并为一次提交
+
+    每个写操作在批量事务内的保存点中执行，出错只回滚该操作并把异常交给对应的 Future；
+    Future 在所在批量提交成功后才完成，完成即表示数据已写入数据库。
+    """
+
+    def __init__(self, db_manager, max_batch=500, linger=0.002):
+        self.db_manager = db_manager
+        self.max_batch = max(1, int(max_batch))
+        self.linger = linger  # 收到第一个写操作后继续等待后续写操作的时间（秒）
+        self._queue = queue.Queue()
+        self._closed = False
+        # 检查是否已关闭与入队在同一把锁内完成，关闭之后不会再有写操作排在停止标记之后
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="DatabaseWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """提交写操作 fn(*args, **kwargs)，返回 concurrent.futures.Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("写入线程已关闭")
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def flush(self, timeout=None):
+        """等待此前提交的所有写操作完成"""
+        self.submit(lambda: None).result(timeout)
+
+    def close(self, timeout=None):
+        """执行完队列中剩余的写操作后停止写入线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+
+            # 收集已经排队以及 linger 时间内到达的写操作
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._execute(batch)
+            if stop:
+                return
+
+    def _execute(self, batch):
+        """在一个事务中执行一批写操作，提交后再完成各个 Future"""
+        results = []
+        try:
+            with self.db_manager.batch():
+                for future, fn, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        results.append(None)  # 已取消
+                        continue
+                    try:
+                        # 整个写操作是一个嵌套批量（保存点）：失败时回滚其写入并丢弃其变更事件，
+                        # 不影响同批的其他操作
+                        with self.db_manager.batch():
+                            results.append((True, fn(*args, **kwargs)))
+                    except Exception as e:
+                        results.append((False, e))
+        except Exception as e:
+            # 批量提交失败，本批写操作全部未生效
+            for future, _fn, _args, _kwargs in batch:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        for (future, _fn, _args, _kwargs), result in zip(batch, results):
+            if result is None:
+                continue
+            succeeded, value = result
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
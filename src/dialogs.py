@@ -3,6 +3,7 @@
 """
 from ui_base_components import BaseTransactionDialog, BaseEditDialog
 from theme_manager import theme_manager
+from money import Money
 from PyQt6.QtWidgets import QVBoxLayout
 
 class AddIncomeDialog(BaseTransactionDialog):
@@ -40,11 +41,11 @@ class AddIncomeDialog(BaseTransactionDialog):
             'transaction_type': self.transaction_type,
             'category': self.selected_category or "",
             'subcategory': self.selected_subcategory or "",
-            'amount': self.amount_spin.value(),
+            'amount': Money.from_yuan(self.amount_spin.value()),
             'account': self.account_combo.currentText(),
             'description': self.description_edit.text(),
             'is_settled': False,
-            'refund_amount': 0.0,
+            'refund_amount': Money(0),
             'refund_reason': ""
         }
 
@@ -85,11 +86,11 @@ class EditIncomeDialog(BaseEditDialog):
             'transaction_type': self.transaction_type,
             'category': self.selected_category or "",
             'subcategory': self.selected_subcategory or "",
-            'amount': self.amount_spin.value(),
+            'amount': Money.from_yuan(self.amount_spin.value()),
             'account': self.account_combo.currentText(),
             'description': self.description_edit.text(),
             'is_settled': False,
-            'refund_amount': 0.0,
+            'refund_amount': Money(0),
             'refund_reason': ""
         }
 
@@ -129,11 +130,11 @@ class AddExpenseDialog(BaseTransactionDialog):
             'transaction_type': self.transaction_type,
             'category': self.selected_category or "",
             'subcategory': self.selected_subcategory or "",
-            'amount': -self.amount_spin.value(),  # 支出为负数
+            'amount': -Money.from_yuan(self.amount_spin.value()),  # 支出为负数
             'account': self.account_combo.currentText(),
             'description': self.description_edit.text(),
             'is_settled': self.settled_check.isChecked(),
-            'refund_amount': self.refund_amount_spin.value(),
+            'refund_amount': Money.from_yuan(self.refund_amount_spin.value()),
             'refund_reason': self.refund_reason_edit.text()
         }
 
@@ -174,10 +175,10 @@ class EditExpenseDialog(BaseEditDialog):
             'transaction_type': self.transaction_type,
             'category': self.selected_category or "",
             'subcategory': self.selected_subcategory or "",
-            'amount': -self.amount_spin.value(),  # 支出为负数
+            'amount': -Money.from_yuan(self.amount_spin.value()),  # 支出为负数
             'account': self.account_combo.currentText(),
             'description': self.description_edit.text(),
             'is_settled': self.settled_check.isChecked(),
-            'refund_amount': self.refund_amount_spin.value(),
+            'refund_amount': Money.from_yuan(self.refund_amount_spin.value()),
             'refund_reason': self.refund_reason_edit.text()
         }
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+树状数组（Fenwick 树）模块
+按键保存稀疏的多列整数：每个键一棵树状数组，只包含该键有数据的位置（例如某个类别有记录的日期），
+单点增减和前缀求和都只访问 O(log n) 行，全部键的区间合计以向量化方式一次求出。
+占用的内存与有数据的 (键, 位置) 数量成正比，与位置的取值范围和键的数量无关。
+"""
+
+import numpy as np
+
+
+# (键序号, 位置) 编码为一个整数：键序号 * _STRIDE + 位置，按编码排序即先按键、再按位置排序
+_STRIDE = 1 << 32
+# 增量表的最小容量；超过已构建数据量的 1/8 时合并重建，每次新增的均摊代价为 O(log n)
+_MIN_PENDING = 64
+
+
+def _lowbit(positions):
+    return positions & -positions
+
+
+class KeyedFenwickTree:
+    """按键分段的稀疏树状数组
+
+    键为从 0 开始的整数序号，位置为非负整数；每个 (键, 位置) 保存 width 列 int64 数值（金额为整数分）。
+    已构建的 (键, 位置) 按编码排序保存，键 k 的树占 tree 的 [offsets[k], offsets[k + 1]) 行，
+    段内第 i 行（i 从 1 开始）保存该键第 [i - lowbit(i), i) 个位置的合计。
+    构建之后才出现的 (键, 位置) 先记入增量表，增量表达到一定大小时与已有数据合并重建。
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._codes = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._tree = np.zeros((0, width), dtype=np.int64)
+        self._pending = {}          # (键序号, 位置) -> 数值
+        self._pending_arrays = None
+
+    @classmethod
+    def from_entries(cls, width, keys, positions, values):
+        """由逐条的 (键序号, 位置, 数值) 构建，同一 (键, 位置) 的多条数值相加"""
+        tree = cls(width)
+        tree._build(np.asarray(keys, dtype=np.int64), np.asarray(positions, dtype=np.int64),
+                    np.asarray(values, dtype=np.int64).reshape(-1, width))
+        return tree
+
+    def __len__(self):
+        """保存的 (键, 位置) 数量"""
+        return len(self._codes) + len(self._pending)
+
+    def _build(self, keys, positions, values):
+        codes = keys * _STRIDE + positions
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        if len(codes):
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            values = np.add.reduceat(values[order], starts, axis=0)
+            codes = codes[starts]
+        key_count = int(codes[-1] // _STRIDE) + 1 if len(codes) else 0
+        offsets = np.searchsorted(codes, np.arange(key_count + 1, dtype=np.int64) * _STRIDE)
+
+        # 段内前缀和之差等于全局前缀和之差，整棵树由一次 cumsum 得到
+        cumulative = np.zeros((len(codes) + 1, self.width), dtype=np.int64)
+        np.cumsum(values, axis=0, out=cumulative[1:])
+        rows = np.arange(len(codes), dtype=np.int64)
+        local = rows - offsets[codes // _STRIDE] + 1
+        self._tree = cumulative[rows + 1] - cumulative[rows + 1 - _lowbit(local)]
+        self._codes = codes
+        self._offsets = offsets
+        self._pending = {}
+        self._pending_arrays = None
+
+    def add(self, key, position, delta):
+        """给 (key, position) 加上 delta（长度为 width 的数组）"""
+        code = key * _STRIDE + position
+        row = int(np.searchsorted(self._codes, code))
+        if row < len(self._codes) and self._codes[row] == code:
+            start = int(self._offsets[key])
+            size = int(self._offsets[key + 1]) - start
+            i = row - start + 1
+            while i <= size:
+                self._tree[start + i - 1] += delta
+                i += i & -i
+            return
+        pending = self._pending.get((key, position))
+        self._pending[(key, position)] = delta if pending is None else pending + delta
+        self._pending_arrays = None
+        if len(self._pending) > max(_MIN_PENDING, len(self._codes) >> 3):
+            self._compact()
+
+    def _prefix(self, starts, counts):
+        """各段前 counts 个位置的合计，starts 为各段的起始行"""
+        totals = np.zeros((len(counts), self.width), dtype=np.int64)
+        remaining = counts.copy()
+        active = np.flatnonzero(remaining)
+        while len(active):
+            index = remaining[active]
+            totals[active] += self._tree[starts[active] + index - 1]
+            remaining[active] = index - _lowbit(index)
+            active = active[remaining[active] > 0]
+        return totals
+
+    def _values(self):
+        """已构建部分逐个 (键, 位置) 的数值"""
+        rows = np.arange(len(self._codes), dtype=np.int64)
+        starts = self._offsets[self._codes // _STRIDE]
+        local = rows - starts + 1
+        return self._prefix(starts, local) - self._prefix(starts, local - 1)
+
+    def _compact(self):
+        """把增量表并入已构建的树"""
+        keys, positions, values = self._pending_entries()
+        self._build(np.concatenate([self._codes // _STRIDE, keys]),
+                    np.concatenate([self._codes % _STRIDE, positions]),
+                    np.concatenate([self._values(), values]))
+
+    def _pending_entries(self):
+        if self._pending_arrays is None:
+            if self._pending:
+                (keys, positions), values = zip(*self._pending.keys()), list(self._pending.values())
+            else:
+                keys = positions = values = ()
+            self._pending_arrays = (np.array(keys, dtype=np.int64), np.array(positions, dtype=np.int64),
+                                    np.array(values, dtype=np.int64).reshape(-1, self.width))
+        return self._pending_arrays
+
+    def range_sums(self, start, stop, keys):
+        """指定各键（键序号数组，不能重复）在位置区间 [start, stop) 的合计，返回形状为 (len(keys), width) 的数组"""
+        keys = np.asarray(keys, dtype=np.int64)
+        totals = np.zeros((len(keys), self.width), dtype=np.int64)
+        if stop <= start or not len(keys):
+            return totals
+        rows = np.flatnonzero(keys < len(self._offsets) - 1)
+        if len(rows):
+            starts = np.tile(self._offsets[keys[rows]], 2)
+            bases = keys[rows] * _STRIDE
+            # 区间两端的前缀和在一次遍历中求出
+            counts = np.searchsorted(self._codes, np.concatenate([bases + stop, bases + start])) - starts
+            prefixes = self._prefix(starts, counts)
+            totals[rows] = prefixes[:len(rows)] - prefixes[len(rows):]
+        if self._pending:
+            pending_keys, positions, values = self._pending_entries()
+            lookup = np.full(max(int(keys.max()), int(pending_keys.max())) + 1, -1, dtype=np.int64)
+            lookup[keys] = np.arange(len(keys))
+            targets = lookup[pending_keys]
+            inside = (positions >= start) & (positions < stop) & (targets >= 0)
+            np.add.at(totals, targets[inside], values[inside])
+        return totals
@@ -12,18 +12,10 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout
                             QFrame, QButtonGroup, QRadioButton, QColorDialog)
 from PyQt6.QtCore import Qt, QDateTime, QDate, QPropertyAnimation, QEasingCurve, pyqtProperty
 from PyQt6.QtGui import QFont, QIcon, QPalette, QColor
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-import matplotlib
 
 from theme_manager import theme_manager, number_to_chinese
 from database_manager import DatabaseManager
 from ui_base_components import StyleHelper, MessageHelper, BaseDialog
-from chart_utils import ChartUtils
-
-matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
 
 # 对话框类已移至 dialogs.py 模块
 
@@ -34,7 +26,7 @@ class SystemSettingsDialog(BaseDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("系统设置")
-        self.setFixedSize(500, 400)
+        self.setFixedSize(500, 440)
         self.setup_ui()
     
     def setup_ui(self):
@@ -186,6 +178,30 @@ class SystemSettingsDialog(BaseDialog):
         stats_settings_layout.addWidget(self.auto_restore_stats_view_check)
         stats_settings_layout.addWidget(self.last_stats_view_label)
         
+        # 图表绘制方式
+        self.matplotlib_charts_check = QCheckBox("使用 matplotlib 绘制统计图表（重启程序后生效）")
+        self.matplotlib_charts_check.setStyleSheet(f"""
+            QCheckBox {{
+                color: {theme_manager.get_color('primary_text')};
+                background-color: transparent;
+                font-size: 14px;
+            }}
+        """)
+        self.matplotlib_charts_check.setChecked(config_manager.get_chart_renderer() == "matplotlib")
+        stats_settings_layout.addWidget(self.matplotlib_charts_check)
+        
+        # 图表磁盘缓存
+        self.chart_disk_cache_check = QCheckBox("缓存 matplotlib 统计图表到磁盘（重新打开程序后图表显示更快）")
+        self.chart_disk_cache_check.setStyleSheet(f"""
+            QCheckBox {{
+                color: {theme_manager.get_color('primary_text')};
+                background-color: transparent;
+                font-size: 14px;
+            }}
+        """)
+        self.chart_disk_cache_check.setChecked(config_manager.get_use_chart_disk_cache())
+        stats_settings_layout.addWidget(self.chart_disk_cache_check)
+        
         # 统计设置说明
         stats_info = QLabel("启用此功能后，程序启动时统计分析页面会自动恢复到上次使用的视图类型。")
         stats_info.setWordWrap(True)
@@ -263,6 +279,10 @@ class SystemSettingsDialog(BaseDialog):
         # 保存自动恢复统计视图设置
         config_manager.set_auto_restore_stats_view(self.auto_restore_stats_view_check.isChecked())
         
+        # 保存图表绘制方式和缓存设置
+        config_manager.set_chart_renderer("matplotlib" if self.matplotlib_charts_check.isChecked() else "native")
+        config_manager.set_use_chart_disk_cache(self.chart_disk_cache_check.isChecked())
+        
         # 通知父窗口（如果需要）
         if hasattr(self.parent(), 'on_settings_changed'):
             self.parent().on_settings_changed()
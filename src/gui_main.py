@@ -1,29 +1,30 @@
+import os
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                             QWidget, QPushButton, QLabel, QLineEdit, QComboBox, 
-                            QTableWidget, QTableWidgetItem, QTabWidget, QDialog,
+                            QTableWidget, QTableWidgetItem, QTableView, QAbstractItemView,
+                            QTabWidget, QDialog,
                             QFormLayout, QTextEdit, QDateTimeEdit, QCheckBox,
                             QDoubleSpinBox, QMessageBox, QSplitter, QGroupBox,
                             QTreeWidget, QTreeWidgetItem, QHeaderView, QSpinBox,
                             QCalendarWidget, QDateEdit, QScrollArea, QGridLayout,
                             QFrame, QButtonGroup, QRadioButton)
-from PyQt6.QtCore import Qt, QDateTime, QDate, QPropertyAnimation, QEasingCurve, pyqtProperty
+from PyQt6.QtCore import Qt, QDateTime, QDate, QPropertyAnimation, QEasingCurve, pyqtProperty, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QPalette, QColor
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-import matplotlib
 
 from theme_manager import theme_manager, number_to_chinese
 from database_manager import DatabaseManager
+from money import Money
 from gui_components import (SystemSettingsDialog, ThemeSelectionDialog, CategoryButton, 
                            AddLedgerDialog)
 from dialogs import EditIncomeDialog, AddIncomeDialog, EditExpenseDialog, AddExpenseDialog
-from ui_base_components import StyleHelper, MessageHelper, BaseAccountDialog, BaseTransferDialog, BaseBudgetDialog
-from chart_utils import ChartUtils
-
-matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
+from ui_base_components import (StyleHelper, MessageHelper, BaseAccountDialog, BaseTransferDialog, BaseBudgetDialog,
+                                DataChangeNotifier, config_manager)
+from change_events import ACCOUNT_CHANGED, TRANSFER_CHANGED, BUDGET_CHANGED, LEDGER_CHANGED
+from chart_specs import PieChart, TrendChart, limit_data_display, theme_colors
+from native_charts import DonutChartWidget, TrendChartWidget
+from statistics_loader import StatisticsLoader
+from transaction_table_model import TransactionTableModel
 
 
 class EditAccountDialog(BaseAccountDialog):
@@ -48,7 +49,7 @@ class EditAccountDialog(BaseAccountDialog):
             self.name_edit.setText(name)
             self.type_combo.setCurrentText(account_type)
             self.bank_edit.setText(bank or "")
-            self.balance_spin.setValue(balance)
+            self.balance_spin.setValue(float(balance))
             self.description_edit.setPlainText(description or "")
     
     def get_data(self):
@@ -103,7 +104,7 @@ class EditTransferDialog(BaseTransferDialog):
         transfer_id, transfer_date, from_account, to_account, amount, description, created_time = self.transfer_data
         
         self.date_edit.setDate(QDate.fromString(transfer_date, "yyyy-MM-dd"))
-        self.amount_spin.setValue(amount)
+        self.amount_spin.setValue(float(amount))
         self.description_edit.setText(description or "")
         
         # 设置账户选择
@@ -136,6 +137,9 @@ class BudgetManagementDialog(QDialog):
         self.setWindowTitle("预算管理")
         self.setModal(True)
         self.setFixedSize(900, 700)
+        # 不能立即得到的预算进度在后台线程中计算，完成后重新加载表格
+        self._loader = StatisticsLoader(db_manager, self)
+        self._loader.loaded.connect(self.load_budgets)
         self.setup_ui()
         self.load_budgets()
         self.load_categories()
@@ -208,16 +212,24 @@ class BudgetManagementDialog(QDialog):
             if category[2] == '支出':  # type == '支出'
                 self.expense_categories.append(category[0])
     
-    def load_budgets(self):
-        """加载预算数据"""
+    def load_budgets(self, progress_list=None):
+        """加载预算数据，progress_list 为后台线程中计算好的预算进度"""
         budgets = self.db_manager.get_budgets(self.ledger_id)
         self.budget_table.setRowCount(len(budgets))
         
+        # 一次查询取得全部预算进度；实时区间汇总需要构建或正被其他线程使用时不在界面线程中等待，
+        # 先按未使用显示，后台计算完成后再次加载
+        if progress_list is None:
+            progress_list = self.db_manager.get_all_budget_progress(self.ledger_id, blocking=False)
+        if progress_list is None:
+            self._loader.request(self.db_manager.get_all_budget_progress, self.ledger_id)
+            progress_list = []
+        else:
+            self._loader.cancel()
+        progress_map = {(p['category'], p['budget_type']): p for p in progress_list}
+        
         for row, budget in enumerate(budgets):
-            # 获取预算进度
-            progress = self.db_manager.get_budget_progress(
-                self.ledger_id, budget['category'], budget['budget_type']
-            )
+            progress = progress_map.get((budget['category'], budget['budget_type']))
             
             # 类别
             self.budget_table.setItem(row, 0, QTableWidgetItem(budget['category']))
@@ -404,7 +416,7 @@ class EditBudgetDialog(BaseBudgetDialog):
         self.category_combo.setCurrentText(self.budget_data['category'])
         budget_type_text = "月度预算" if self.budget_data['budget_type'] == 'monthly' else "年度预算"
         self.budget_type_combo.setCurrentText(budget_type_text)
-        self.amount_spin.setValue(self.budget_data['amount'])
+        self.amount_spin.setValue(float(self.budget_data['amount']))
         self.threshold_spin.setValue(self.budget_data['warning_threshold'])
         
         if self.budget_data['start_date']:
@@ -465,7 +477,7 @@ class EditBudgetDialog(BaseBudgetDialog):
                     self.to_account_combo.setCurrentIndex(i)
                     break
             
-            self.amount_spin.setValue(amount)
+            self.amount_spin.setValue(float(amount))
             self.description_edit.setText(description or "")
     
     def get_data(self):
@@ -478,7 +490,7 @@ class EditBudgetDialog(BaseBudgetDialog):
             'transfer_date': self.date_edit.date().toString("yyyy-MM-dd"),
             'from_account': from_account,
             'to_account': to_account,
-            'amount': self.amount_spin.value(),
+            'amount': Money.from_yuan(self.amount_spin.value()),
             'description': self.description_edit.text()
         }
 
@@ -552,6 +564,13 @@ class AssetManagementWidget(QWidget):
         
         self.setLayout(layout)
     
+    def on_data_changed(self, events):
+        """数据变更后只重新加载受影响的账户列表和转账列表"""
+        if any(event.accounts or event.kind == ACCOUNT_CHANGED for event in events):
+            self.load_accounts()
+        if any(event.kind == TRANSFER_CHANGED for event in events):
+            self.load_transfers()
+    
     def load_accounts(self):
         accounts = self.db_manager.get_accounts()
         self.account_table.setRowCount(len(accounts))
@@ -585,11 +604,6 @@ class AssetManagementWidget(QWidget):
                     data['name'], data['type'], data['balance'], 
                     data['bank'], data['description']
                 )
-                self.load_accounts()
-                # 刷新统计页面（使用防抖）
-                parent = self.parent()
-                if parent and hasattr(parent, 'schedule_statistics_update'):
-                    parent.schedule_statistics_update(200)
                 MessageHelper.show_info(self, "成功", "账户添加成功！")
     
     def edit_account(self):
@@ -619,11 +633,6 @@ class AssetManagementWidget(QWidget):
                     data['id'], data['name'], data['type'], data['balance'],
                     data['bank'], data['description']
                 )
-                self.load_accounts()
-                # 刷新统计页面（使用防抖）
-                parent = self.parent()
-                if parent and hasattr(parent, 'schedule_statistics_update'):
-                    parent.schedule_statistics_update(200)
                 MessageHelper.show_info(self, "成功", "账户修改成功！")
     
     def delete_account(self):
@@ -646,12 +655,11 @@ class AssetManagementWidget(QWidget):
         
         if MessageHelper.ask_confirmation(self, "确认删除", 
                                    f"确定要删除账户 '{account_name}' 吗？删除后将无法恢复！"):
-            self.db_manager.delete_account(account_data[0])
-            self.load_accounts()
-            # 刷新统计页面（使用防抖）
-            parent = self.parent()
-            if parent and hasattr(parent, 'schedule_statistics_update'):
-                parent.schedule_statistics_update(200)
+            try:
+                self.db_manager.delete_account(account_data[0])
+            except ValueError as e:
+                MessageHelper.show_warning(self, "无法删除", str(e))
+                return
             MessageHelper.show_info(self, "成功", "账户删除成功！")
     
     def add_transfer(self):
@@ -673,12 +681,6 @@ class AssetManagementWidget(QWidget):
                     data['transfer_date'], data['from_account'], 
                     data['to_account'], data['amount'], data['description']
                 )
-                self.load_accounts()
-                self.load_transfers()
-                # 刷新统计页面（使用防抖）
-                parent = self.parent()
-                if parent and hasattr(parent, 'schedule_statistics_update'):
-                    parent.schedule_statistics_update(200)
                 MessageHelper.show_info(self, "成功", "转账记录添加成功！")
     
     def edit_transfer(self):
@@ -735,12 +737,6 @@ class AssetManagementWidget(QWidget):
                     data['id'], data['transfer_date'], data['from_account'], 
                     data['to_account'], data['amount'], data['description']
                 )
-                self.load_accounts()
-                self.load_transfers()
-                # 刷新统计页面（使用防抖）
-                parent = self.parent()
-                if parent and hasattr(parent, 'schedule_statistics_update'):
-                    parent.schedule_statistics_update(200)
                 MessageHelper.show_info(self, "成功", "转账记录修改成功！")
     
     def delete_transfer(self):
@@ -775,12 +771,6 @@ class AssetManagementWidget(QWidget):
             self.db_manager.update_account_balance(to_account, -amount)
             
             self.db_manager.delete_transfer(transfer_data[0])
-            self.load_accounts()
-            self.load_transfers()
-            # 刷新统计页面（使用防抖）
-            parent = self.parent()
-            if parent and hasattr(parent, 'schedule_statistics_update'):
-                parent.schedule_statistics_update(200)
             MessageHelper.show_info(self, "成功", "转账记录删除成功！")
 
 
@@ -794,31 +784,51 @@ class StatisticsWidget(QWidget):
         self.category_level = "parent"  # parent, subcategory
         self.current_ledger_id = None
         
-        # 性能优化：添加缓存机制
-        self._cache = {
-            'last_date_range': None,
-            'last_ledger_id': None,
-            'cached_data': None,
-            'cache_timestamp': 0
-        }
         self._update_pending = False  # 防止重复更新
         self._batch_update_timer = None  # 批量更新定时器
+        # 统计查询在后台线程中执行，连续切换时只采用最后一次请求的结果
+        self._loader = StatisticsLoader(db_manager, self)
+        self._loader.loaded.connect(self._on_statistics_loaded)
+        # 统计图表默认用 QPainter 原生绘制；设置为 matplotlib 时在工作线程（多核时为工作进程）中绘制，
+        # 界面线程只显示绘制好的位图，相同内容和尺寸的图表直接使用缓存的位图
+        self._chart_renderer = None
+        self._chart_cache = None
+        if config_manager.get_chart_renderer() == 'matplotlib':
+            from chart_rendering import ChartImageCache, ChartRenderer
+            self._chart_renderer = ChartRenderer()
+            self._chart_cache = ChartImageCache()
+            self.set_chart_disk_cache(config_manager.get_use_chart_disk_cache())
         
         self.setup_ui()
         self.load_last_view()
-        self.update_statistics()
         
-        # 确保初始化时显示正确的视图专属内容
+        # 确保初始化时显示正确的视图专属内容（随统计结果一起加载）
         self.switch_view_content()
-        if self.current_view == "day":
-            self.update_day_view()
-        elif self.current_view == "week":
-            self.update_week_view()
+        self.update_statistics()
     
     def set_current_ledger(self, ledger_id):
         """设置当前账本ID"""
         self.current_ledger_id = ledger_id
     
+    def on_data_changed(self, events):
+        """数据变更后只在当前统计区间或预算受影响时刷新
+        
+        汇总卡片由实时区间汇总立即更新，图表等完整统计防抖后刷新。
+        """
+        start_date, end_date = self.get_date_range()
+        if any(event.kind == LEDGER_CHANGED or (event.is_transaction and event.affects_dates(start_date, end_date))
+               for event in events):
+            self._update_summary_cards_now(start_date, end_date)
+            self.schedule_update(200)
+            return
+        
+        # 预算统计按本月、本年计算，与当前显示的区间无关
+        year = QDate.currentDate().toString("yyyy")
+        if any(event.kind == BUDGET_CHANGED or
+               (event.is_transaction and event.affects_dates(f"{year}-01-01", f"{year}-12-31"))
+               for event in events):
+            self.update_budget_statistics(start_date, end_date)
+    
     def setup_ui(self):
         layout = QVBoxLayout()
         
@@ -993,24 +1003,21 @@ class StatisticsWidget(QWidget):
         
         # 收入结构饼图
         self.income_structure_group = QGroupBox("收入结构")
-        self.income_figure = Figure(figsize=(4, 3))
-        self.income_canvas = FigureCanvas(self.income_figure)
+        self.income_canvas = self._create_chart_view(DonutChartWidget, figsize=(4, 3))
         income_structure_layout = QVBoxLayout()
         income_structure_layout.addWidget(self.income_canvas)
         self.income_structure_group.setLayout(income_structure_layout)
         
         # 支出结构饼图
         self.expense_structure_group = QGroupBox("支出结构")
-        self.expense_figure = Figure(figsize=(4, 3))
-        self.expense_canvas = FigureCanvas(self.expense_figure)
+        self.expense_canvas = self._create_chart_view(DonutChartWidget, figsize=(4, 3))
         expense_structure_layout = QVBoxLayout()
         expense_structure_layout.addWidget(self.expense_canvas)
         self.expense_structure_group.setLayout(expense_structure_layout)
         
         # 账户分布饼图
         self.account_distribution_group = QGroupBox("账户分布")
-        self.account_figure = Figure(figsize=(4, 3))
-        self.account_canvas = FigureCanvas(self.account_figure)
+        self.account_canvas = self._create_chart_view(DonutChartWidget, figsize=(4, 3))
         account_distribution_layout = QVBoxLayout()
         account_distribution_layout.addWidget(self.account_canvas)
         self.account_distribution_group.setLayout(account_distribution_layout)
@@ -1076,8 +1083,7 @@ class StatisticsWidget(QWidget):
         week_chart_label.setFont(QFont("Arial", 11, QFont.Weight.Bold))
         week_view_layout.addWidget(week_chart_label)
         
-        self.week_figure = Figure(figsize=(10, 6))
-        self.week_canvas = FigureCanvas(self.week_figure)
+        self.week_canvas = self._create_chart_view(TrendChartWidget, figsize=(10, 6))
         week_view_layout.addWidget(self.week_canvas)
         
         # 单日明细查看按钮区域
@@ -1226,10 +1232,6 @@ class StatisticsWidget(QWidget):
         
         self.update_date_display()
         
-        # 清除缓存，因为视图改变了
-        self._cache['last_date_range'] = None
-        self._cache['cached_data'] = None
-        
         # 使用延迟更新避免频繁调用
         self.schedule_update(200)
         
@@ -1326,13 +1328,8 @@ class StatisticsWidget(QWidget):
             self.current_date = self.current_date.addYears(-1)
         
         self.update_date_display()
+        # 视图专属内容随统计结果一起在后台加载
         self.update_statistics()
-        
-        # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
-        if self.current_view == "day":
-            self.update_day_view()
-        elif self.current_view == "week":
-            self.update_week_view()
     
     def set_current_ledger(self, ledger_id):
         """设置当前账本ID"""
@@ -1356,13 +1353,8 @@ class StatisticsWidget(QWidget):
             self.current_date = self.current_date.addYears(1)
         
         self.update_date_display()
+        # 视图专属内容随统计结果一起在后台加载
         self.update_statistics()
-        
-        # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
-        if self.current_view == "day":
-            self.update_day_view()
-        elif self.current_view == "week":
-            self.update_week_view()
     
     def set_current_ledger(self, ledger_id):
         """设置当前账本ID"""
@@ -1383,7 +1375,7 @@ class StatisticsWidget(QWidget):
         if start_date > end_date:
             self.end_date_edit.setDate(start_date)
         
-        self.update_statistics()
+        self.update_custom_range()
         
         # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
         if self.current_view == "day":
@@ -1395,6 +1387,22 @@ class StatisticsWidget(QWidget):
         """设置当前账本ID"""
         self.current_ledger_id = ledger_id
     
+    def update_custom_range(self):
+        """自定义时间范围改变：汇总卡片由实时区间汇总立即更新，图表等完整统计防抖后刷新"""
+        start_date, end_date = self.get_date_range()
+        self._update_summary_cards_now(start_date, end_date)
+        self.schedule_update(200)
+    
+    def _update_summary_cards_now(self, start_date, end_date):
+        """在界面线程中立即刷新汇总卡片
+        
+        只使用已经构建好的实时区间汇总；需要构建或正在被后台查询使用时不等待，
+        汇总卡片随防抖后的后台统计刷新一起更新。
+        """
+        totals = self.db_manager.get_period_totals(start_date, end_date, blocking=False)
+        if totals is not None:
+            self._update_summary_cards(totals)
+    
     def set_quick_range(self, days):
         """设置快捷时间范围"""
         end_date = QDate.currentDate()
@@ -1402,7 +1410,7 @@ class StatisticsWidget(QWidget):
         
         self.start_date_edit.setDate(start_date)
         self.end_date_edit.setDate(end_date)
-        self.update_statistics()
+        self.update_custom_range()
         
             # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
         if self.current_view == "day":
@@ -1418,12 +1426,6 @@ class StatisticsWidget(QWidget):
         """切换中文大写显示"""
         self.show_chinese_amount = checked
         self.update_statistics()
-        
-            # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
-        if self.current_view == "day":
-            self.update_day_view()
-        elif self.current_view == "week":
-            self.update_week_view()
     
     def set_current_ledger(self, ledger_id):
         """设置当前账本ID"""
@@ -1433,12 +1435,6 @@ class StatisticsWidget(QWidget):
         """类别统计层级改变"""
         self.category_level = "subcategory" if "子类别" in text else "parent"
         self.update_statistics()
-        
-        # 更新视图专属内容（虽然自定义视图没有专属内容，但保持一致性）
-        if self.current_view == "day":
-            self.update_day_view()
-        elif self.current_view == "week":
-            self.update_week_view()
     
     def set_current_ledger(self, ledger_id):
         """设置当前账本ID"""
@@ -1560,27 +1556,45 @@ class StatisticsWidget(QWidget):
     
     def create_pie_chart(self, figure, data, labels, title, colors=None):
         """创建圆环图"""
+        from chart_utils import ChartUtils
         ChartUtils.create_pie_chart(figure, data, labels, title, colors)
     
-    def _is_cache_valid(self, start_date, end_date):
-        """检查缓存是否有效"""
-        import time
-        current_time = time.time()
-        
-        # 缓存5秒内有效，避免频繁刷新
-        if (self._cache['last_date_range'] == (start_date, end_date) and
-            self._cache['last_ledger_id'] == self.current_ledger_id and
-            current_time - self._cache['cache_timestamp'] < 5):
-            return True
-        return False
-    
-    def _update_cache(self, start_date, end_date, data):
-        """更新缓存"""
-        import time
-        self._cache['last_date_range'] = (start_date, end_date)
-        self._cache['last_ledger_id'] = self.current_ledger_id
-        self._cache['cached_data'] = data
-        self._cache['cache_timestamp'] = time.time()
+    def _create_chart_view(self, native_class, figsize):
+        """创建图表控件：原生控件或显示 matplotlib 渲染结果的 ChartView，右键菜单可导出图表"""
+        if self._chart_renderer is None:
+            view = native_class(figsize=figsize)
+        else:
+            from chart_rendering import ChartView
+            view = ChartView(self._chart_renderer, figsize=figsize, cache=self._chart_cache)
+        view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        view.customContextMenuRequested.connect(lambda pos, view=view: self._show_chart_menu(view, pos))
+        return view
+    
+    def _show_chart_menu(self, view, pos):
+        if view.spec is None:
+            return
+        from PyQt6.QtWidgets import QMenu
+        menu = QMenu(self)
+        export_action = menu.addAction("导出图表...")
+        if menu.exec(view.mapToGlobal(pos)) == export_action:
+            self.export_chart(view.spec)
+    
+    def export_chart(self, spec):
+        """用 matplotlib 把图表导出为 PNG、SVG 或 PDF 文件"""
+        from PyQt6.QtWidgets import QFileDialog
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出图表", f"{spec.title}.png",
+            "PNG图片 (*.png);;SVG矢量图 (*.svg);;PDF文件 (*.pdf)"
+        )
+        if not file_path:
+            return
+        try:
+            from chart_rendering import export_chart
+            export_chart(spec, file_path)
+        except Exception as e:
+            MessageHelper.show_error(self, "错误", f"导出图表失败：{str(e)}")
+            return
+        MessageHelper.show_info(self, "成功", f"图表已导出到 {file_path}")
     
     def schedule_update(self, delay=300):
         """延迟执行更新，避免频繁调用（默认300ms）"""
@@ -1605,153 +1619,173 @@ class StatisticsWidget(QWidget):
                 self._batch_update_timer = None
     
     def update_statistics(self):
-        """更新统计数据"""
-        start_date, end_date = self.get_date_range()
-        
-        # 检查缓存是否有效
-        if self._is_cache_valid(start_date, end_date):
-            # 使用缓存数据更新UI
-            cached_data = self._cache['cached_data']
-            if cached_data:
-                self._update_ui_from_cache(cached_data)
-                return
+        """更新统计数据
         
+        查询在后台线程中执行，结果返回后由 _on_statistics_loaded 更新界面；
+        新的请求会作废并中断尚未完成的旧请求，连续切换时间段时界面线程不等待查询。
+        """
+        start_date, end_date = self.get_date_range()
+        sort_by_time = self.day_sort_combo.currentText() == "按时间排序"
+        self._loader.request(self._load_statistics_data, start_date, end_date, self.current_view,
+                             self.current_ledger_id, self._budget_ledger_id(), sort_by_time)
+    
+    def _load_statistics_data(self, start_date, end_date, view, ledger_id, budget_ledger_id, sort_by_time):
+        """在后台线程中查询一次刷新所需的全部数据，只访问数据库，不操作界面控件
+        
+        各步骤之间检查请求是否已被新的请求取代，过期时不再执行后续查询。
+        """
+        # 批量获取所有统计数据；重复查询同一区间时由数据库管理器的查询缓存直接返回
+        data = {'snapshot': self._get_all_statistics_data(start_date, end_date)}
+        self._loader.check_current()
+        data['budget_progress'] = self._load_budget_progress(budget_ledger_id)
+        self._loader.check_current()
+        if view == "day" and ledger_id:
+            data['day'] = self._load_day_view_data(start_date, ledger_id, sort_by_time)
+        elif view == "week" and ledger_id:
+            data['week'] = self._load_week_view_data(start_date, end_date, ledger_id)
+        return data
+    
+    def _on_statistics_loaded(self, data):
+        """后台查询完成后在界面线程中更新统计页面"""
         # 禁用UI更新以提高性能
         self.setUpdatesEnabled(False)
         
         try:
-            # 批量获取所有统计数据以减少数据库连接
-            all_data = self._get_all_statistics_data(start_date, end_date)
-            
-            # 缓存数据
-            self._update_cache(start_date, end_date, all_data)
-            
-            # 使用数据更新UI
-            self._update_ui_from_data(all_data)
-            
+            self._update_ui_from_data(data['snapshot'])
+            self._update_budget_ui(data['budget_progress'])
         finally:
             # 重新启用UI更新
             self.setUpdatesEnabled(True)
             self.update()
         
         # 更新视图专属内容
-        self.update_view_specific_content()
+        if 'day' in data:
+            self._update_day_view_ui(data['day'])
+        elif 'week' in data:
+            self._update_week_view_ui(data['week'])
+    
+    def stop_loading(self):
+        """作废并等待后台统计查询结束，应用退出、关闭数据库连接之前调用"""
+        self._loader.cancel()
+        self._loader.wait_for_done()
+        if self._chart_renderer is not None:
+            self._chart_renderer.shutdown()
+            self._chart_cache.close()
+    
+    def set_chart_disk_cache(self, enabled):
+        """启用或关闭图表磁盘缓存（只用于 matplotlib 图表），缓存目录位于数据库文件旁"""
+        if self._chart_cache is None:
+            return
+        disk_dir = None
+        if enabled and self.db_manager.db_path != ':memory:':
+            disk_dir = os.path.join(os.path.dirname(os.path.abspath(self.db_manager.db_path)), 'chart_cache')
+        self._chart_cache.set_disk_dir(disk_dir)
     
     def _get_all_statistics_data(self, start_date, end_date):
-        """批量获取所有统计数据，减少数据库连接次数"""
-        # 获取收支汇总
-        summary = self.db_manager.get_statistics_summary(start_date, end_date)
-        
-        # 批量获取统计数据以减少数据库连接
-        income_stats = self.db_manager.get_category_statistics(start_date, end_date, "收入", self.category_level)
-        expense_stats = self.db_manager.get_category_statistics(start_date, end_date, "支出", self.category_level)
-        account_stats = self.db_manager.get_account_statistics(start_date, end_date)
-        settlement_stats = self.db_manager.get_settlement_statistics(start_date, end_date)
-        refund_stats = self.db_manager.get_refund_statistics(start_date, end_date)
-        
-        return {
-            'summary': summary,
-            'income_stats': income_stats,
-            'expense_stats': expense_stats,
-            'account_stats': account_stats,
-            'settlement_stats': settlement_stats,
-            'refund_stats': refund_stats
-        }
+        """获取区间统计快照（包含汇总、类别、账户、销账和退款统计），由实时区间汇总的前缀和得到"""
+        return self.db_manager.get_period_snapshot(start_date, end_date)
     
-    def _update_ui_from_cache(self, cached_data):
-        """从缓存数据更新UI"""
-        self._update_ui_from_data(cached_data)
+    def _update_ui_from_data(self, snapshot):
+        """从统计快照更新UI"""
+        income_stats = snapshot.category_stats("收入", self.category_level)
+        expense_stats = snapshot.category_stats("支出", self.category_level)
+        account_stats = snapshot.accounts
         
-        # 更新视图专属内容
-        self.update_view_specific_content()
-    
-    def _update_ui_from_data(self, data):
-        """从数据更新UI"""
-        summary = data['summary']
-        income_stats = data['income_stats']
-        expense_stats = data['expense_stats']
-        account_stats = data['account_stats']
-        settlement_stats = data['settlement_stats']
-        refund_stats = data['refund_stats']
-        
-        # 更新卡片显示
-        self.income_card_amount.setText(f"¥{summary['total_income']:.2f}")
-        self.expense_card_amount.setText(f"¥{summary['total_expense']:.2f}")
-        self.net_card_amount.setText(f"¥{summary['net_income']:.2f}")
-        
-        if self.show_chinese_amount:
-            self.income_card_chinese.setText(number_to_chinese(summary['total_income']))
-            self.expense_card_chinese.setText(number_to_chinese(summary['total_expense']))
-            self.net_card_chinese.setText(number_to_chinese(abs(summary['net_income'])))
-        else:
-            self.income_card_chinese.setText("")
-            self.expense_card_chinese.setText("")
-            self.net_card_chinese.setText("")
+        self._update_summary_cards(snapshot)
+        theme = theme_colors()
         
         # 更新收入结构饼图
-        if income_stats and summary['total_income'] > 0:
+        if income_stats and snapshot.actual_income > 0:
             income_labels = [item[0] for item in income_stats]
             income_data = [item[1] for item in income_stats]
             # 使用工具方法限制显示数量
-            income_labels, income_data = ChartUtils.limit_data_display(income_labels, income_data, 8)
-            self.create_pie_chart(self.income_figure, income_data, income_labels, "收入结构")
+            income_labels, income_data = limit_data_display(income_labels, income_data, 8)
+            self.income_canvas.set_chart(PieChart("收入结构", income_data, income_labels, theme))
         else:
-            self.create_pie_chart(self.income_figure, [], [], "收入结构")
+            self.income_canvas.set_chart(PieChart("收入结构", [], [], theme))
         
         # 更新支出结构饼图
-        if expense_stats and summary['total_expense'] > 0:
+        if expense_stats and snapshot.actual_expense > 0:
             expense_labels = [item[0] for item in expense_stats]
             expense_data = [item[1] for item in expense_stats]
             # 使用工具方法限制显示数量
-            expense_labels, expense_data = ChartUtils.limit_data_display(expense_labels, expense_data, 8)
-            self.create_pie_chart(self.expense_figure, expense_data, expense_labels, "支出结构")
+            expense_labels, expense_data = limit_data_display(expense_labels, expense_data, 8)
+            self.expense_canvas.set_chart(PieChart("支出结构", expense_data, expense_labels, theme))
         else:
-            self.create_pie_chart(self.expense_figure, [], [], "支出结构")
+            self.expense_canvas.set_chart(PieChart("支出结构", [], [], theme))
         
         # 更新账户分布饼图
         if account_stats:
             account_labels = [item[0] for item in account_stats]
             account_data = [item[1] + item[2] for item in account_stats]  # 收入+支出
             # 使用工具方法限制显示数量
-            account_labels, account_data = ChartUtils.limit_data_display(account_labels, account_data, 6)
-            self.create_pie_chart(self.account_figure, account_data, account_labels, "账户分布")
+            account_labels, account_data = limit_data_display(account_labels, account_data, 6)
+            self.account_canvas.set_chart(PieChart("账户分布", account_data, account_labels, theme))
         else:
-            self.create_pie_chart(self.account_figure, [], [], "账户分布")
+            self.account_canvas.set_chart(PieChart("账户分布", [], [], theme))
+    
+    def _update_summary_cards(self, snapshot):
+        """更新收支卡片、销账和退款统计，只用到快照中的汇总字段"""
+        # 更新卡片显示
+        self.income_card_amount.setText(f"¥{snapshot.actual_income:.2f}")
+        self.expense_card_amount.setText(f"¥{snapshot.actual_expense:.2f}")
+        self.net_card_amount.setText(f"¥{snapshot.net_income:.2f}")
         
-        # 使用工具方法安全刷新画布
-        ChartUtils.safe_draw_canvas(self.income_canvas)
-        ChartUtils.safe_draw_canvas(self.expense_canvas)
-        ChartUtils.safe_draw_canvas(self.account_canvas)
+        if self.show_chinese_amount:
+            self.income_card_chinese.setText(number_to_chinese(snapshot.actual_income))
+            self.expense_card_chinese.setText(number_to_chinese(snapshot.actual_expense))
+            self.net_card_chinese.setText(number_to_chinese(abs(snapshot.net_income)))
+        else:
+            self.income_card_chinese.setText("")
+            self.expense_card_chinese.setText("")
+            self.net_card_chinese.setText("")
         
         # 更新销账状态统计
-        self.settled_amount_label.setText(f"¥{settlement_stats['settled_amount']:.2f}")
-        self.unsettled_amount_label.setText(f"¥{settlement_stats['unsettled_amount']:.2f}")
+        self.settled_amount_label.setText(f"¥{snapshot.settled_amount:.2f}")
+        self.unsettled_amount_label.setText(f"¥{snapshot.unsettled_amount:.2f}")
         
-        if settlement_stats['total_amount'] > 0:
-            settled_ratio = (settlement_stats['settled_amount'] / settlement_stats['total_amount'] * 100)
-            self.settled_ratio_label.setText(f"{settled_ratio:.1f}%")
+        if snapshot.settled_total > 0:
+            self.settled_ratio_label.setText(f"{snapshot.settled_ratio:.1f}%")
         else:
             self.settled_ratio_label.setText("0%")
         
         # 更新退款统计
-        self.refund_amount_label.setText(f"¥{refund_stats['total_refund']:.2f}")
-        self.refund_count_label.setText(str(refund_stats['refund_count']))
-        self.refund_ratio_label.setText(f"{refund_stats['refund_ratio']:.1f}%")
-        
-        # 更新预算统计
-        start_date, end_date = self.get_date_range()
-        self.update_budget_statistics(start_date, end_date)
+        self.refund_amount_label.setText(f"¥{snapshot.expense_refund:.2f}")
+        self.refund_count_label.setText(str(snapshot.refund_count))
+        self.refund_ratio_label.setText(f"{snapshot.refund_ratio:.1f}%")
     
     def update_budget_statistics(self, start_date, end_date):
-        """更新预算统计"""
-        # 获取当前账本ID（需要从父窗口获取）
+        """更新预算统计
+        
+        只使用已经构建好的实时区间汇总；不能立即得到时不在界面线程中等待，
+        改由后台统计刷新一起计算预算进度。
+        """
+        ledger_id = self._budget_ledger_id()
+        if not ledger_id:
+            self._update_budget_ui(None)
+            return
+        progress_list = self.db_manager.get_all_budget_progress(ledger_id, blocking=False)
+        if progress_list is None:
+            self.schedule_update(0)
+        else:
+            self._update_budget_ui(progress_list)
+    
+    def _budget_ledger_id(self):
+        """预算统计使用的账本ID（需要从父窗口获取），没有选择账本时为 None"""
         parent = self.parent()
         if parent and hasattr(parent, 'current_ledger_id') and parent.current_ledger_id:
-            ledger_id = parent.current_ledger_id
-            
-            # 获取所有预算进度
-            progress_list = self.db_manager.get_all_budget_progress(ledger_id)
-            
+            return parent.current_ledger_id
+        return None
+    
+    def _load_budget_progress(self, ledger_id):
+        """获取所有预算进度，没有选择账本时为 None"""
+        if not ledger_id:
+            return None
+        return self.db_manager.get_all_budget_progress(ledger_id)
+    
+    def _update_budget_ui(self, progress_list):
+        """由预算进度列表更新预算统计，progress_list 为 None 时显示默认值"""
+        if progress_list is not None:
             # 计算总计数据
             total_budget = sum(p['budget_amount'] for p in progress_list)
             total_used = sum(p['spent_amount'] for p in progress_list)
@@ -1781,67 +1815,53 @@ class StatisticsWidget(QWidget):
         """更新日视图内容"""
         if not self.current_ledger_id:
             return
-        current_date_str = self.current_date.toString("yyyy-MM-dd")
-        
-        # 检查缓存键
-        cache_key = f"day_view_{current_date_str}_{self.current_ledger_id}_{self.day_sort_combo.currentText()}"
-        current_time = __import__('time').time()
-        
-        # 检查缓存是否有效（3秒内）
-        if (hasattr(self, '_day_view_cache') and 
-            cache_key in self._day_view_cache and 
-            current_time - self._day_view_cache[cache_key]['timestamp'] < 3):
-            cached_data = self._day_view_cache[cache_key]['data']
-            self._update_day_view_ui(cached_data)
-            return
+        sort_by_time = self.day_sort_combo.currentText() == "按时间排序"
+        data = self._load_day_view_data(self.current_date.toString("yyyy-MM-dd"), self.current_ledger_id, sort_by_time)
+        self._update_day_view_ui(data)
+    
+    def _load_day_view_data(self, current_date_str, ledger_id, sort_by_time):
+        """查询日视图数据，可在后台线程中调用"""
+        transactions = self.db_manager.get_day_transactions(current_date_str, ledger_id)
+        
+        # 根据排序方式重新组织数据
+        if not sort_by_time:
+            # 按金额排序
+            transactions_sorted = sorted(transactions, key=lambda x: abs(x[4]), reverse=True)
+        else:
+            transactions_sorted = transactions
+        
+        # 获取消费峰值时段
+        peak_result = self.db_manager.get_peak_consumption_hours(current_date_str)
+        
+        return {
+            'transactions': transactions_sorted,
+            'peak_result': peak_result
+        }
+    
+    def _update_day_view_ui(self, data):
+        """更新日视图UI"""
+        transactions_sorted = data['transactions']
+        peak_result = data['peak_result']
         
         # 禁用UI更新以提高性能
         self.day_transaction_table.setUpdatesEnabled(False)
         try:
-            transactions = self.db_manager.get_day_transactions(current_date_str, self.current_ledger_id)
-            
-            # 更新表格数据
-            self.day_transaction_table.setRowCount(len(transactions))
-            
-            sort_by_time = self.day_sort_combo.currentText() == "按时间排序"
-            
-            # 根据排序方式重新组织数据
-            if not sort_by_time:
-                # 按金额排序
-                transactions_sorted = sorted(transactions, key=lambda x: abs(x[4]), reverse=True)
-            else:
-                transactions_sorted = transactions
-            
-            # 获取消费峰值时段
-            peak_result = self.db_manager.get_peak_consumption_hours(current_date_str)
-            
-            # 准备数据
-            data = {
-                'transactions': transactions_sorted,
-                'peak_result': peak_result
-            }
-            
-            # 缓存数据
-            if not hasattr(self, '_day_view_cache'):
-                self._day_view_cache = {}
-            self._day_view_cache[cache_key] = {
-                'data': data,
-                'timestamp': current_time
-            }
-            
-            # 更新UI
-            self._update_day_view_ui(data)
-            
+            self._fill_day_transaction_table(transactions_sorted)
         finally:
             # 重新启用UI更新
             self.day_transaction_table.setUpdatesEnabled(True)
             self.day_transaction_table.update()
-    
-    def _update_day_view_ui(self, data):
-        """更新日视图UI"""
-        transactions_sorted = data['transactions']
-        peak_result = data['peak_result']
         
+        # 获取消费峰值时段
+        if peak_result:
+            time_period, total_amount, count = peak_result
+            self.peak_time_label.setText(f"🔥 消费峰值时段：{time_period} 消费 ¥{total_amount:.2f}（{count}笔）")
+        else:
+            self.peak_time_label.setText("📊 当日暂无消费记录")
+    
+    def _fill_day_transaction_table(self, transactions_sorted):
+        """把当日记录填入日视图表格"""
+        self.day_transaction_table.setRowCount(len(transactions_sorted))
         for row, trans in enumerate(transactions_sorted):
             (created_time, transaction_type, category, subcategory, amount, account, description) = trans
             # 只显示时间部分
@@ -1852,13 +1872,6 @@ class StatisticsWidget(QWidget):
             self.day_transaction_table.setItem(row, 3, QTableWidgetItem(f"¥{abs(amount):.2f}"))
             self.day_transaction_table.setItem(row, 4, QTableWidgetItem(account or ""))
             self.day_transaction_table.setItem(row, 5, QTableWidgetItem(description or ""))
-        
-        # 获取消费峰值时段
-        if peak_result:
-            time_period, total_amount, count = peak_result
-            self.peak_time_label.setText(f"🔥 消费峰值时段：{time_period} 消费 ¥{total_amount:.2f}（{count}笔）")
-        else:
-            self.peak_time_label.setText("📊 当日暂无消费记录")
     
     def update_week_view(self):
         """更新周视图内容"""
@@ -1866,84 +1879,34 @@ class StatisticsWidget(QWidget):
             return
         start_date, end_date = self.get_date_range()
         
-        # 检查缓存键
-        cache_key = f"week_view_{start_date}_{end_date}_{self.current_ledger_id}"
-        current_time = __import__('time').time()
-        
-        # 检查缓存是否有效（5秒内，因为周数据变化较少）
-        if (hasattr(self, '_week_view_cache') and 
-            cache_key in self._week_view_cache and 
-            current_time - self._week_view_cache[cache_key]['timestamp'] < 5):
-            cached_data = self._week_view_cache[cache_key]['data']
-            self._update_week_view_ui(cached_data)
-            return
-        
-        week_trends = self.db_manager.get_week_trends(start_date, end_date, self.current_ledger_id)
+        # 更新UI
+        self._update_week_view_ui(self._load_week_view_data(start_date, end_date, self.current_ledger_id))
+    
+    def _load_week_view_data(self, start_date, end_date, ledger_id):
+        """查询周视图数据，可在后台线程中调用"""
+        week_trends = self.db_manager.get_week_trends(start_date, end_date, ledger_id)
         
-        # 准备数据
-        data = {
+        return {
             'week_trends': week_trends,
             'start_date': start_date,
             'end_date': end_date
         }
-        
-        # 缓存数据
-        if not hasattr(self, '_week_view_cache'):
-            self._week_view_cache = {}
-        self._week_view_cache[cache_key] = {
-            'data': data,
-            'timestamp': current_time
-        }
-        
-        # 更新UI
-        self._update_week_view_ui(data)
     
     def _update_week_view_ui(self, data):
         """更新周视图UI"""
         week_trends = data['week_trends']
         
-        if not week_trends:
-            # 显示空图表
-            self.week_figure.clear()
-            ax = self.week_figure.add_subplot(111)
-            ax.text(0.5, 0.5, '本周暂无数据', ha='center', va='center', fontsize=12)
-            ax.set_title("本周每日收支趋势")
-            ChartUtils.safe_draw_canvas(self.week_canvas)
-            return
-        
         # 准备数据
         dates = [item[0][5:] for item in week_trends]  # 只取MM-DD部分
         incomes = [item[1] for item in week_trends]
         expenses = [item[2] for item in week_trends]
-        net_incomes = [income - expense for income, expense in zip(incomes, expenses)]
-        
-        # 创建折线图
-        self.week_figure.clear()
-        ax = self.week_figure.add_subplot(111)
-        
-        # 绘制收入和支出折线
-        ax.plot(dates, incomes, marker='o', label='收入', color='#4CAF50', linewidth=2)
-        ax.plot(dates, expenses, marker='s', label='支出', color='#F44336', linewidth=2)
-        ax.plot(dates, net_incomes, marker='^', label='净收支', color='#2196F3', linewidth=2, linestyle='--')
-        
-        # 设置图表样式
-        ax.set_title('本周每日收支趋势', fontsize=14, fontweight='bold')
-        ax.set_xlabel('日期', fontsize=12)
-        ax.set_ylabel('金额 (¥)', fontsize=12)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        # 格式化Y轴显示
-        from matplotlib.ticker import FuncFormatter
-        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'¥{x:.0f}'))
-        
-        # 旋转X轴标签
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+        net_incomes = [item[1] - item[2] for item in week_trends]
         
-        # 调整布局
-        self.week_figure.tight_layout()
-        
-        ChartUtils.safe_draw_canvas(self.week_canvas)
+        # 折线图在后台绘制，没有数据时显示空图表
+        self.week_canvas.set_chart(TrendChart('本周每日收支趋势', dates, incomes, expenses, net_incomes,
+                                              '本周暂无数据', theme_colors()))
+        if not week_trends:
+            return
         
         # 更新日期选择下拉框
         self.week_day_combo.clear()
@@ -2101,6 +2064,9 @@ class BudgetManagementWidget(QWidget):
         super().__init__()
         self.db_manager = db_manager
         self.current_ledger_id = None
+        # 不能立即得到的预算进度在后台线程中计算，完成后更新界面
+        self._loader = StatisticsLoader(db_manager, self)
+        self._loader.loaded.connect(self._update_progress_ui)
         self.setup_ui()
     
     def setup_ui(self):
@@ -2235,14 +2201,28 @@ class BudgetManagementWidget(QWidget):
         card.setLayout(layout)
         return card
     
+    def on_data_changed(self, events):
+        """当前账本的预算或本年交易记录变化时刷新预算进度"""
+        if not self.current_ledger_id:
+            return
+        year = QDate.currentDate().toString("yyyy")
+        if any(event.affects_ledger(self.current_ledger_id) and
+               (event.kind == BUDGET_CHANGED or
+                (event.is_transaction and event.affects_dates(f"{year}-01-01", f"{year}-12-31")))
+               for event in events):
+            self.refresh_budgets()
+    
     def set_current_ledger(self, ledger_id):
         """设置当前账本"""
         self.current_ledger_id = ledger_id
         if ledger_id:
             self.info_label.hide()
             self.budget_content.show()
+            # 不再显示上一个账本的预算进度，新账本的进度需要后台计算时先显示默认值
+            self._update_progress_ui([])
             self.refresh_budgets()
         else:
+            self._loader.cancel()
             self.info_label.show()
             self.budget_content.hide()
     
@@ -2266,7 +2246,6 @@ class BudgetManagementWidget(QWidget):
                 self.current_ledger_id, data['category'], data['budget_type'],
                 data['amount'], data['warning_threshold'], data['start_date'], data['end_date']
             )
-            self.refresh_budgets()
             MessageHelper.show_info(self, "成功", "预算添加成功！")
     
     def manage_budgets(self):
@@ -2277,16 +2256,23 @@ class BudgetManagementWidget(QWidget):
         
         dialog = BudgetManagementDialog(self.db_manager, self.current_ledger_id, self)
         dialog.exec()
-        self.refresh_budgets()
     
     def refresh_budgets(self):
         """刷新预算数据"""
         if not self.current_ledger_id:
             return
         
-        # 获取所有预算进度
-        progress_list = self.db_manager.get_all_budget_progress(self.current_ledger_id)
-        
+        # 获取所有预算进度；实时区间汇总需要构建或正被其他线程使用时不在界面线程中等待，
+        # 改在后台线程中计算，之前发出的后台请求随之作废
+        progress_list = self.db_manager.get_all_budget_progress(self.current_ledger_id, blocking=False)
+        if progress_list is None:
+            self._loader.request(self.db_manager.get_all_budget_progress, self.current_ledger_id)
+            return
+        self._loader.cancel()
+        self._update_progress_ui(progress_list)
+    
+    def _update_progress_ui(self, progress_list):
+        """由预算进度列表更新概览卡片、进度表格和警告信息"""
         # 更新概览卡片
         total_budget = sum(p['budget_amount'] for p in progress_list)
         total_used = sum(p['spent_amount'] for p in progress_list)
@@ -2393,13 +2379,24 @@ class BudgetManagementWidget(QWidget):
 
 
 class MainWindow(QMainWindow):
+    # 后台写入完成信号：(Future, 完成后的回调)，从写入线程发出，在界面线程中处理
+    write_finished = pyqtSignal(object, object)
+    
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
         self.current_ledger_id = None
         self.ledgers = {}
         self._stats_update_timer = None  # 统计更新防抖定时器
+        self.write_finished.connect(self._on_write_finished)
         self.setup_ui()
+        
+        # 写入提交后按变更事件只刷新受影响的表格行、统计区间和列表
+        self.change_notifier = DataChangeNotifier(self.db_manager, self)
+        self.change_notifier.changed.connect(self.transaction_model.apply_changes)
+        self.change_notifier.changed.connect(self.asset_widget.on_data_changed)
+        self.change_notifier.changed.connect(self.statistics_widget.on_data_changed)
+        self.change_notifier.changed.connect(self.budget_widget.on_data_changed)
         self.load_ledgers()
         self.apply_theme()
         
@@ -2577,8 +2574,7 @@ class MainWindow(QMainWindow):
     
     def on_settings_changed(self):
         """设置变更后的处理"""
-        # 可以在这里添加设置变更后的处理逻辑
-        pass
+        self.statistics_widget.set_chart_disk_cache(config_manager.get_use_chart_disk_cache())
     
     def create_ledger_panel(self):
         widget = QWidget()
@@ -2920,12 +2916,11 @@ class MainWindow(QMainWindow):
         search_group.setLayout(search_layout)
         transaction_layout.addWidget(search_group)
         
-        # 交易记录表格
-        self.transaction_table = QTableWidget()
-        self.transaction_table.setColumnCount(11)
-        self.transaction_table.setHorizontalHeaderLabels([
-            "日期", "类型", "主类别", "子类别", "金额", "账户", "备注", "销账", "退款金额", "退款原因", "创建时间"
-        ])
+        # 交易记录表格：模型按页加载数据，滚动到底部时自动加载下一页
+        self.transaction_model = TransactionTableModel(self.db_manager, parent=self)
+        self.transaction_table = QTableView()
+        self.transaction_table.setModel(self.transaction_model)
+        self.transaction_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.transaction_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         transaction_layout.addWidget(self.transaction_table)
         
@@ -2988,33 +2983,14 @@ class MainWindow(QMainWindow):
             # 保存当前账本信息
             self.save_current_ledger()
     
-    def load_transactions(self, filtered_transactions=None):
+    def load_transactions(self, filtered_transactions=None, highlights=None):
         if not self.current_ledger_id:
             return
         
         if filtered_transactions is not None:
-            transactions = filtered_transactions
+            self.transaction_model.set_rows(filtered_transactions, highlights)
         else:
-            transactions = self.db_manager.get_transactions(self.current_ledger_id)
-            
-        self.transaction_table.setRowCount(len(transactions))
-        
-        for row, transaction in enumerate(transactions):
-            (trans_id, ledger_id, transaction_date, transaction_type, category, subcategory, 
-             amount, account, description, is_settled, refund_amount, 
-             refund_reason, created_time) = transaction
-            
-            self.transaction_table.setItem(row, 0, QTableWidgetItem(transaction_date))
-            self.transaction_table.setItem(row, 1, QTableWidgetItem(transaction_type))
-            self.transaction_table.setItem(row, 2, QTableWidgetItem(category))
-            self.transaction_table.setItem(row, 3, QTableWidgetItem(subcategory))
-            self.transaction_table.setItem(row, 4, QTableWidgetItem(f"¥{abs(amount):.2f}"))
-            self.transaction_table.setItem(row, 5, QTableWidgetItem(account or ""))
-            self.transaction_table.setItem(row, 6, QTableWidgetItem(description or ""))
-            self.transaction_table.setItem(row, 7, QTableWidgetItem("是" if is_settled else "否"))
-            self.transaction_table.setItem(row, 8, QTableWidgetItem(f"¥{refund_amount:.2f}" if refund_amount > 0 else ""))
-            self.transaction_table.setItem(row, 9, QTableWidgetItem(refund_reason or ""))
-            self.transaction_table.setItem(row, 10, QTableWidgetItem(created_time))
+            self.transaction_model.set_ledger(self.current_ledger_id)
     
     def initialize_search_controls(self):
         """初始化搜索控件的选项"""
@@ -3077,74 +3053,28 @@ class MainWindow(QMainWindow):
             self.load_transactions()
             return
         
-        # 构建SQL查询以提高性能
-        conditions = []
-        params = []
-        
-        conditions.append("ledger_id = ?")
-        params.append(self.current_ledger_id)
-        
-        if keyword:
-            conditions.append("(LOWER(description) LIKE ? OR LOWER(category) LIKE ? OR LOWER(subcategory) LIKE ? OR LOWER(account) LIKE ? OR LOWER(refund_reason) LIKE ?)")
-            keyword_param = f"%{keyword}%"
-            params.extend([keyword_param, keyword_param, keyword_param, keyword_param, keyword_param])
-        
-        if category:
-            conditions.append("category = ?")
-            params.append(category)
-        
-        if subcategory:
-            conditions.append("subcategory = ?")
-            params.append(subcategory)
-        
-        if account:
-            conditions.append("account = ?")
-            params.append(account)
-        
-        if transaction_type:
-            conditions.append("transaction_type = ?")
-            params.append(transaction_type)
-        
-        if settled_status:
-            is_settled = settled_status == "已销账"
-            conditions.append("is_settled = ?")
-            params.append(is_settled)
-        
-        if refund_status:
-            if refund_status == "有退款":
-                conditions.append("refund_amount > 0")
-            else:
-                conditions.append("refund_amount = 0")
-        
-        if min_amount > 0:
-            conditions.append("ABS(amount) >= ?")
-            params.append(min_amount)
-        
-        if max_amount < 999999.99:
-            conditions.append("ABS(amount) <= ?")
-            params.append(max_amount)
-        
-        # 时间范围
-        conditions.append("transaction_date BETWEEN ? AND ?")
-        params.extend([start_date, end_date])
-        
-        # 执行查询
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            query = f"""
-                SELECT * FROM transactions 
-                WHERE {' AND '.join(conditions)}
-                ORDER BY transaction_date DESC, created_time DESC
-            """
-            cursor.execute(query, params)
-            filtered_transactions = cursor.fetchall()
+        # 关键字优先走全文索引，其余条件在同一查询中筛选
+        filtered_transactions, highlights = self.db_manager.search_transactions(
+            self.current_ledger_id,
+            keyword=keyword or None,
+            category=category or None,
+            subcategory=subcategory or None,
+            account=account or None,
+            transaction_type=transaction_type or None,
+            is_settled=(settled_status == "已销账") if settled_status else None,
+            has_refund=(refund_status == "有退款") if refund_status else None,
+            min_amount=min_amount if min_amount > 0 else None,
+            max_amount=max_amount if max_amount < 999999.99 else None,
+            start_date=start_date,
+            end_date=end_date
+        )
         
         # 显示筛选结果
-        self.load_transactions(filtered_transactions)
+        self.load_transactions(filtered_transactions, highlights)
         
         # 显示搜索结果数量
         result_count = len(filtered_transactions)
-        total_count = len(self.db_manager.get_transactions(self.current_ledger_id))
+        total_count = self.db_manager.count_transactions(self.current_ledger_id)
         MessageHelper.show_info(self, "搜索结果", f"找到 {result_count} 条记录，共 {total_count} 条记录")
     
     def toggle_advanced_search(self):
@@ -3313,9 +3243,31 @@ class MainWindow(QMainWindow):
             if self.current_ledger_id == ledger_id:
                 self.current_ledger_id = None
                 self.current_ledger_label.setText("请选择账本")
-                self.transaction_table.setRowCount(0)
+                self.transaction_model.clear()
             MessageHelper.show_info(self, "成功", "账本删除成功！")
     
+    def submit_write(self, on_success, fn, *args, **kwargs):
+        """把写操作交给后台写入线程，界面不等待磁盘写入；写入完成后在界面线程中调用 on_success"""
+        future = self.db_manager.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self.write_finished.emit(f, on_success))
+        return future
+    
+    def _on_write_finished(self, future, on_success):
+        """后台写入完成后的处理"""
+        try:
+            future.result()
+        except Exception as e:
+            MessageHelper.show_error(self, "错误", f"保存失败：{e}")
+            self.load_transactions()
+            return
+        if on_success:
+            on_success()
+    
+    def _show_write_message(self, message=None):
+        """写入完成后的提示；表格、统计和账户列表由数据变更通知各自刷新"""
+        if message:
+            MessageHelper.show_info(self, "成功", message)
+    
     def add_income(self):
         if not self.current_ledger_id:
             MessageHelper.show_warning(self, "警告", "请先选择账本！")
@@ -3326,25 +3278,22 @@ class MainWindow(QMainWindow):
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 data = dialog.get_data()
                 if data['category'] and data['subcategory'] and data['amount'] > 0:
-                    self.db_manager.add_transaction(
+                    # 交易记录和账户余额在同一事务中由后台写入线程写入，界面不等待提交；
+                    # 连续添加时只在最后一条写入完成后提示成功
+                    message = None if dialog.is_add_more else "收入记录添加成功！"
+                    self.submit_write(
+                        lambda message=message: self._show_write_message(message),
+                        self.db_manager.add_transaction,
                         self.current_ledger_id, data['transaction_date'], data['transaction_type'],
                         data['category'], data['subcategory'], data['amount'], data['account'], data['description'],
-                        data['is_settled'], data['refund_amount'], data['refund_reason']
+                        data['is_settled'], data['refund_amount'], data['refund_reason'],
+                        adjust_balance=True
                     )
-                    self.load_transactions()
-                    
-                    # 更新账户余额
-                    if data['account']:
-                        self.db_manager.update_account_balance(data['account'], data['amount'])
                     
                     if dialog.is_add_more:
                         # 继续添加下一条记录
                         continue
                     else:
-                        MessageHelper.show_info(self, "成功", "收入记录添加成功！")
-                        # 刷新资产管理页面的账户信息
-                        if hasattr(self, 'asset_widget'):
-                            self.asset_widget.load_accounts()
                         break
                 else:
                     MessageHelper.show_warning(self, "警告", "请填写必要的收入信息！")
@@ -3362,25 +3311,22 @@ class MainWindow(QMainWindow):
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 data = dialog.get_data()
                 if data['category'] and data['subcategory'] and data['amount'] < 0:
-                    self.db_manager.add_transaction(
+                    # 交易记录和账户余额在同一事务中由后台写入线程写入，界面不等待提交；
+                    # 连续添加时只在最后一条写入完成后提示成功
+                    message = None if dialog.is_add_more else "支出记录添加成功！"
+                    self.submit_write(
+                        lambda message=message: self._show_write_message(message),
+                        self.db_manager.add_transaction,
                         self.current_ledger_id, data['transaction_date'], data['transaction_type'],
                         data['category'], data['subcategory'], data['amount'], data['account'], data['description'],
-                        data['is_settled'], data['refund_amount'], data['refund_reason']
+                        data['is_settled'], data['refund_amount'], data['refund_reason'],
+                        adjust_balance=True
                     )
-                    self.load_transactions()
-                    
-                    # 更新账户余额（支出为负数）
-                    if data['account']:
-                        self.db_manager.update_account_balance(data['account'], data['amount'])
                     
                     if dialog.is_add_more:
                         # 继续添加下一条记录
                         continue
                     else:
-                        MessageHelper.show_info(self, "成功", "支出记录添加成功！")
-                        # 刷新资产管理页面的账户信息
-                        if hasattr(self, 'asset_widget'):
-                            self.asset_widget.load_accounts()
                         break
                 else:
                     MessageHelper.show_warning(self, "警告", "请填写必要的支出信息！")
@@ -3393,18 +3339,17 @@ class MainWindow(QMainWindow):
             MessageHelper.show_warning(self, "警告", "请先选择账本！")
             return
         
-        current_row = self.transaction_table.currentRow()
+        current_row = self.transaction_table.currentIndex().row()
         if current_row < 0:
             MessageHelper.show_warning(self, "警告", "请先选择要编辑的交易记录！")
             return
         
-        # 获取选中的交易记录数据
-        transactions = self.db_manager.get_transactions(self.current_ledger_id)
-        if current_row >= len(transactions):
+        # 获取选中的交易记录数据（直接取表格中显示的记录，搜索结果中同样适用）
+        transaction_data = self.transaction_model.transaction_at(current_row)
+        if transaction_data is None:
             MessageHelper.show_warning(self, "警告", "找不到选中的交易记录！")
             return
         
-        transaction_data = transactions[current_row]
         transaction_type = transaction_data[3]
         
         if transaction_type == "收入":
@@ -3418,52 +3363,37 @@ class MainWindow(QMainWindow):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             if data['category'] and data['subcategory']:
-                # 计算余额变化
-                old_amount = transaction_data[6]
-                new_amount = data['amount']
-                balance_change = new_amount - old_amount
-                
-                self.db_manager.update_transaction(
+                # 余额变化由数据库管理器根据已保存的原记录计算，与修改在同一事务中完成
+                self.submit_write(
+                    lambda: self._show_write_message("交易记录修改成功！"),
+                    self.db_manager.update_transaction,
                     data['id'], data['transaction_date'], data['transaction_type'],
                     data['category'], data['subcategory'], data['amount'], data['account'], data['description'],
-                    data['is_settled'], data['refund_amount'], data['refund_reason']
+                    data['is_settled'], data['refund_amount'], data['refund_reason'],
+                    adjust_balance=True
                 )
-                self.load_transactions()
-                
-                # 更新账户余额
-                if data['account']:
-                    self.db_manager.update_account_balance(data['account'], balance_change)
-                
-                MessageHelper.show_info(self, "成功", "交易记录修改成功！")
-                # 刷新相关页面
-                if hasattr(self, 'asset_widget'):
-                    self.asset_widget.load_accounts()
-                if hasattr(self, 'statistics_widget'):
-                    self.statistics_widget.update_statistics()
     
     def delete_transaction(self):
         if not self.current_ledger_id:
             MessageHelper.show_warning(self, "警告", "请先选择账本！")
             return
         
-        current_row = self.transaction_table.currentRow()
+        current_row = self.transaction_table.currentIndex().row()
         if current_row < 0:
             MessageHelper.show_warning(self, "警告", "请先选择要删除的交易记录！")
             return
         
-        # 获取选中的交易记录数据
-        transactions = self.db_manager.get_transactions(self.current_ledger_id)
-        if current_row >= len(transactions):
+        # 获取选中的交易记录数据（直接取表格中显示的记录，搜索结果中同样适用）
+        transaction_data = self.transaction_model.transaction_at(current_row)
+        if transaction_data is None:
             MessageHelper.show_warning(self, "警告", "找不到选中的交易记录！")
             return
         
-        transaction_data = transactions[current_row]
         transaction_date = transaction_data[2]
         transaction_type = transaction_data[3]
         category = transaction_data[4]
         subcategory = transaction_data[5]
         amount = transaction_data[6]
-        account = transaction_data[7]
         
         if MessageHelper.ask_confirmation(self, "确认删除", 
                                    f"确定要删除这条交易记录吗？\n"
@@ -3472,16 +3402,9 @@ class MainWindow(QMainWindow):
                                    f"类别: {category} - {subcategory}\n"
                                    f"金额: ¥{abs(amount):.2f}\n"
                                    f"删除后将无法恢复！"):
-            self.db_manager.delete_transaction(transaction_data[0])
-            self.load_transactions()
-            
-            # 更新账户余额（删除记录需要反向操作）
-            if account:
-                self.db_manager.update_account_balance(account, -amount)
-            
-            MessageHelper.show_info(self, "成功", "交易记录删除成功！")
-            # 刷新相关页面
-            if hasattr(self, 'asset_widget'):
-                self.asset_widget.load_accounts()
-            if hasattr(self, 'statistics_widget'):
-                self.statistics_widget.update_statistics()
\ No newline at end of file
+            # 删除记录并在同一事务中从账户余额中扣回
+            self.submit_write(
+                lambda: self._show_write_message("交易记录删除成功！"),
+                self.db_manager.delete_transaction,
+                transaction_data[0], adjust_balance=True
+            )
\ No newline at end of file
@@ -0,0 +1,323 @@
+"""
+实时区间汇总模块
+按日序号为每个 (账本, 收支类型, 类别) 和每个 (账本, 账户) 维护树状数组，每个键只包含有记录的日期，
+内存与日汇总表的行数成正比；写入提交后直接用变更事件中的记录值做 O(log n) 的单点更新，不再读取数据库；
+汇总卡片、类别饼图、账户分布和预算进度所需的任意日期区间合计都由两次前缀和相减得到。
+
+其他进程的提交由写连接上的 data_version 发现，随后整体重新构建；
+本进程内绕过 DatabaseManager 写方法的修改不会发布变更事件，之后需调用 invalidate()。
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+
+from money import Money
+from period_snapshot import PeriodSnapshot
+from fenwick_tree import KeyedFenwickTree
+from change_events import ACCOUNT_CHANGED, CATEGORY_CHANGED, LEDGER_CHANGED
+
+
+# 类别键 (账本, 收支类型, 类别ID) 的各列：收入、支出（均为非负的分）、退款、笔数、退款笔数、已销账金额
+CATEGORY_METRICS = ('income', 'expense', 'refund', 'count', 'refund_count', 'settled')
+# 账户键 (账本, 账户ID) 的各列
+ACCOUNT_METRICS = ('income', 'expense', 'count')
+
+# 别名不在 MONEY_COLUMNS 中，金额保持整数分
+_SELECT_ROLLUPS = '''
+    SELECT ledger_id, rollup_date, transaction_type, category_id, account_id, is_settled,
+           income AS income_cents, expense AS expense_cents, refund_amount AS refund_cents,
+           txn_count, refund_count
+    FROM daily_rollups
+'''
+
+
+def _ordinal(date_str):
+    return date.fromisoformat(date_str).toordinal()
+
+
+def _split(values):
+    """把一条记录拆分为类别列和账户列的数值"""
+    amount = values.amount
+    income = amount if amount > 0 else 0
+    expense = -amount if amount < 0 else 0
+    refund = values.refund_amount or 0
+    settled = income + expense if values.is_settled == 1 else 0
+    return ((income, expense, refund, 1, 1 if refund > 0 else 0, settled),
+            (income, expense, 1))
+
+
+class _KeyedTree:
+    """以元组为键的树状数组：键的第一项为账本ID，键映射为整数序号，新键按需追加"""
+
+    def __init__(self, width):
+        self.metrics = width
+        self.keys = {}
+        self.key_list = []
+        self.ledger_keys = {}   # 账本ID -> 该账本各键的序号
+        self.tree = KeyedFenwickTree(width)
+
+    def index(self, key):
+        """键的序号，新键追加到末尾"""
+        index = self.keys.get(key)
+        if index is None:
+            index = self.keys[key] = len(self.key_list)
+            self.key_list.append(key)
+            self.ledger_keys.setdefault(key[0], []).append(index)
+        return index
+
+    def add(self, key, day, delta):
+        self.tree.add(self.index(key), day, delta)
+
+    def range_sum(self, start, stop, ledger_id=None):
+        """区间合计：返回 (键列表, 形状为 (键数, width) 的数组)，ledger_id 不为空时只计算该账本的键"""
+        if ledger_id:
+            indexes = self.ledger_keys.get(ledger_id, [])
+            keys = [self.key_list[index] for index in indexes]
+        else:
+            indexes = range(len(self.key_list))
+            keys = self.key_list
+        return keys, self.tree.range_sums(start, stop, indexes)
+
+
+class LiveAggregates:
+    """实时区间汇总
+
+    首次查询时由 daily_rollups 构建树状数组（在写锁内读取，同时记下写入代数），
+    之后只处理代数大于构建时代数的变更事件；账本变化或事件缺少记录值时下一次查询整体重新构建。
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        # 变更事件使用单独的锁暂存，写入线程发布事件时不必等待正在进行的查询
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._tracking = False   # 已构建或正在构建时才需要暂存事件
+        self._state_valid = False
+        self._names_stale = False
+        self._category_names = {}   # 类别ID -> (主类别, 子类别)
+        self._account_names = {}    # 账户ID -> 账户名称
+        self._unsubscribe = db_manager.changes.subscribe(self._on_changes)
+
+    def close(self):
+        """停止接收变更事件并释放树状数组"""
+        self._unsubscribe()
+        self.invalidate()
+
+    def invalidate(self):
+        """丢弃全部汇总数据，下一次查询时重新构建"""
+        with self._lock:
+            with self._pending_lock:
+                self._tracking = False
+                self._pending = []
+            self._state_valid = False
+            self._categories = self._accounts = None
+
+    def _on_changes(self, events):
+        """变更事件在写入线程中到达，只暂存，查询时再处理"""
+        with self._pending_lock:
+            if self._tracking:
+                self._pending.extend(events)
+
+    # ---- 构建与增量更新
+
+    def _sync(self, build=True):
+        """保证树状数组反映全部已发布的写入；调用方需持有锁
+
+        build 为 False 时不重新构建（构建期间持有写锁，可能需要数秒），需要构建时返回 False。
+        """
+        if self._state_valid:
+            # 本进程正在写入时跳过检查，下一次查询再发现其他进程的提交
+            version = self.db_manager.external_data_version(blocking=False)
+            if version is not None and version != self._external_version:
+                self._state_valid = False
+        if not self._state_valid:
+            if not build:
+                return False
+            self._build()
+        with self._pending_lock:
+            events, self._pending = self._pending, []
+        for event in events:
+            if event.generation is not None and event.generation <= self._generation:
+                continue  # 构建时已经读到
+            if not self._apply(event):
+                # _apply 在修改树状数组之前判断是否需要重新构建，之后的事件由构建读到
+                self._state_valid = False
+                return self._sync(build)
+        if self._names_stale:
+            with self.db_manager.get_read_connection() as conn:
+                self._refresh_names(conn.cursor())
+        return True
+
+    def _apply(self, event):
+        """按一个变更事件更新树状数组，需要重新构建时返回 False"""
+        if event.kind == LEDGER_CHANGED:
+            return False
+        if event.kind in (ACCOUNT_CHANGED, CATEGORY_CHANGED):
+            self._names_stale = True
+            return True
+        if not event.is_transaction:
+            return True
+        if not event.before and not event.after:
+            return False
+        for values in event.before:
+            self._add(values, -1)
+        for values in event.after:
+            self._add(values, 1)
+        return True
+
+    def _add(self, values, sign):
+        day = _ordinal(values.transaction_date)
+        category_values, account_values = _split(values)
+        self._categories.add((values.ledger_id, values.transaction_type, values.category_id), day,
+                             np.array(category_values, dtype=np.int64) * sign)
+        if values.account_id:
+            self._accounts.add((values.ledger_id, values.account_id), day,
+                               np.array(account_values, dtype=np.int64) * sign)
+        if (values.category_id not in self._category_names or
+                (values.account_id and values.account_id not in self._account_names)):
+            self._names_stale = True
+
+    def _build(self):
+        """由日汇总表整体构建；在写锁内读取，读到的恰好是构建时写入代数之前的全部提交"""
+        with self._pending_lock:
+            self._tracking = True
+            self._pending = []
+        with self.db_manager.get_snapshot_connection() as (conn, generation):
+            # 先取版本号再读取，期间其他进程的提交最多引起一次多余的重新构建
+            self._external_version = self.db_manager.external_data_version()
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(_SELECT_ROLLUPS)
+            rows = cursor.fetchall()
+            self._refresh_names(cursor)
+
+        self._generation = generation
+
+        categories = _KeyedTree(len(CATEGORY_METRICS))
+        accounts = _KeyedTree(len(ACCOUNT_METRICS))
+        category_keys, category_days, category_values = [], [], []
+        account_keys, account_days, account_values = [], [], []
+        for (ledger_id, rollup_date, transaction_type, category_id, account_id, is_settled,
+             income, expense, refund, count, refund_count) in rows:
+            day = _ordinal(rollup_date)
+            category_keys.append(categories.index((ledger_id, transaction_type, category_id)))
+            category_days.append(day)
+            category_values.append((income, expense, refund, count, refund_count,
+                                    income + expense if is_settled == 1 else 0))
+            if account_id:
+                account_keys.append(accounts.index((ledger_id, account_id)))
+                account_days.append(day)
+                account_values.append((income, expense, count))
+
+        # 同一键同一天的多行（不同账户或销账状态）在构建时合并
+        for keyed, keys, days, values in ((categories, category_keys, category_days, category_values),
+                                          (accounts, account_keys, account_days, account_values)):
+            keyed.tree = KeyedFenwickTree.from_entries(keyed.metrics, keys, days, values)
+        self._categories = categories
+        self._accounts = accounts
+        self._state_valid = True
+
+    def _refresh_names(self, cursor):
+        cursor.execute('SELECT id, parent_category, sub_category FROM categories')
+        self._category_names = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        cursor.execute('SELECT id, name FROM accounts')
+        self._account_names = {row[0]: row[1] for row in cursor.fetchall()}
+        self._names_stale = False
+
+    # ---- 查询
+
+    def _range(self, start_date, end_date):
+        return _ordinal(start_date), _ordinal(end_date) + 1
+
+    def _category_sums(self, start_date, end_date, ledger_id):
+        """区间内各类别键的合计，跳过已删除的类别和区间内没有记录的键"""
+        keys, sums = self._categories.range_sum(*self._range(start_date, end_date), ledger_id)
+        for (_ledger, transaction_type, category_id), row in zip(keys, sums.tolist()):
+            if row[3] == 0 or category_id not in self._category_names:
+                continue
+            yield transaction_type, category_id, row
+
+    @staticmethod
+    def _add_totals(snapshot, totals):
+        """把分类型的合计 {收支类型: [各列合计]} 写入快照的汇总字段"""
+        income, expense, refund, _count, _refund_count, _settled = totals.get("收入", [0] * 6)
+        snapshot.gross_income = Money(income - expense)
+        snapshot.total_refund = Money(refund)
+        income, expense, refund, count, refund_count, settled = totals.get("支出", [0] * 6)
+        snapshot.gross_expense = Money(income - expense)
+        snapshot.expense_refund = Money(refund)
+        snapshot.expense_amount = Money(income + expense)
+        snapshot.expense_count = count
+        snapshot.refund_count = refund_count
+        snapshot.settled_amount = Money(settled)
+        snapshot.unsettled_amount = Money(income + expense - settled)
+
+    def totals(self, start_date, end_date, ledger_id=None, blocking=True):
+        """区间 [start_date, end_date] 的汇总，返回只包含汇总字段的 PeriodSnapshot（类别和账户统计为空）
+
+        blocking 为 False 时不等待其他线程的查询或构建，也不在本线程中构建：
+        这两种情况下返回 None，用于界面线程中的即时刷新。
+        """
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            if not self._sync(build=blocking):
+                return None
+            totals = {}
+            for transaction_type, _category_id, row in self._category_sums(start_date, end_date, ledger_id):
+                total = totals.setdefault(transaction_type, [0] * len(CATEGORY_METRICS))
+                for i, value in enumerate(row):
+                    total[i] += value
+        finally:
+            self._lock.release()
+        snapshot = PeriodSnapshot(start_date, end_date, ledger_id)
+        self._add_totals(snapshot, totals)
+        return snapshot
+
+    def snapshot(self, start_date, end_date, ledger_id=None, blocking=True):
+        """区间 [start_date, end_date] 的完整统计快照，与 DatabaseManager.get_period_snapshot 的结果一致
+
+        blocking 为 False 时与 totals 相同：需要等待其他线程或需要构建时返回 None。
+        """
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            if not self._sync(build=blocking):
+                return None
+            totals = {}
+            category_totals = {}
+            for transaction_type, category_id, row in self._category_sums(start_date, end_date, ledger_id):
+                total = totals.setdefault(transaction_type, [0] * len(CATEGORY_METRICS))
+                for i, value in enumerate(row):
+                    total[i] += value
+                amount, count = row[0] + row[1], row[3]
+                for level, name in zip(("parent", "sub"), self._category_names[category_id]):
+                    level_totals = category_totals.setdefault((transaction_type, level), {})
+                    total_amount, total_count = level_totals.get(name, (0, 0))
+                    level_totals[name] = (total_amount + amount, total_count + count)
+
+            account_totals = {}
+            keys, sums = self._accounts.range_sum(*self._range(start_date, end_date), ledger_id)
+            for (_ledger, account_id), (income, expense, count) in zip(keys, sums.tolist()):
+                name = self._account_names.get(account_id)
+                if count == 0 or name is None:
+                    continue
+                acc_income, acc_expense, acc_count = account_totals.get(name, (0, 0, 0))
+                account_totals[name] = (acc_income + income, acc_expense + expense, acc_count + count)
+        finally:
+            self._lock.release()
+
+        snapshot = PeriodSnapshot(start_date, end_date, ledger_id)
+        self._add_totals(snapshot, totals)
+        for key, level_totals in category_totals.items():
+            snapshot.categories[key] = sorted(
+                ((name, Money(amount), count) for name, (amount, count) in level_totals.items()),
+                key=lambda item: item[1], reverse=True)
+        snapshot.accounts = sorted(
+            ((name, Money(income), Money(expense), count)
+             for name, (income, expense, count) in account_totals.items()),
+            key=lambda item: item[1] + item[2], reverse=True)
+        return snapshot
@@ -36,13 +36,18 @@ def main():
     
     # 清理资源
     try:
+        # 等待后台统计查询结束
+        if hasattr(window, 'statistics_widget'):
+            window.statistics_widget.stop_loading()
+        
         # 清理数据库连接
         if hasattr(window, 'db_manager'):
             window.db_manager.cleanup_all_connections()
         
-        # 清理matplotlib图形对象
-        import matplotlib.pyplot as plt
-        plt.close('all')
+        # 清理matplotlib图形对象（默认的原生图表不会加载 matplotlib）
+        if 'matplotlib.pyplot' in sys.modules:
+            import matplotlib.pyplot as plt
+            plt.close('all')
         
         # 清理主题管理器缓存
         if hasattr(theme_manager, '_cached_style'):
@@ -0,0 +1,182 @@
+"""
+金额类型模块
+数据库中的金额统一以整数“分”保存，程序内部使用 Money 表示金额，
+聚合计算全部是精确的整数运算，只在显示或导出时转换为“元”。
+"""
+
+import sqlite3
+from decimal import Decimal, ROUND_HALF_UP
+
+
+_CENT = Decimal('0.01')
+
+# 以整数分保存金额的列名（包括统计查询中的别名），读取时自动转换为 Money
+MONEY_COLUMNS = frozenset({
+    'amount', 'refund_amount', 'balance',
+    'income', 'expense', 'gross_income', 'gross_expense',
+    'total_refund', 'expense_refund', 'total_amount', 'spent',
+})
+
+
+class Money:
+    """金额，内部以整数分保存
+
+    支持与 Money 或普通数字（按“元”解释）进行加减和比较，
+    格式化方式与 Decimal 相同，例如 f"¥{money:,.2f}"。
+    与普通数字比较时按精确数值比较（与 Decimal 相同），因此 Money(1250) == 12.5，
+    且相等的金额和数字哈希值相同，可以混用作字典键。金额创建后不可修改。
+    """
+    
+    __slots__ = ('_cents',)
+    
+    def __init__(self, cents=0):
+        self._cents = int(cents)
+    
+    @property
+    def cents(self):
+        """整数分"""
+        return self._cents
+
+    @classmethod
+    def from_yuan(cls, value):
+        """由“元”为单位的数值创建金额，按四舍五入保留到分"""
+        if isinstance(value, Money):
+            return value
+        if value is None or value == '':
+            return cls(0)
+        yuan = Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+        return cls(int(yuan * 100))
+
+    @property
+    def yuan(self):
+        """以“元”为单位的精确十进制数值"""
+        return Decimal(self.cents).scaleb(-2)
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __format__(self, format_spec):
+        return format(self.yuan, format_spec or '.2f')
+
+    def __str__(self):
+        return format(self.yuan, '.2f')
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __hash__(self):
+        # 与数值相等的 int、float、Decimal 哈希一致
+        return hash(self.yuan)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    def __add__(self, other):
+        other_cents = _cents_of(other)
+        if other_cents is None:
+            return NotImplemented
+        return Money(self.cents + other_cents)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other_cents = _cents_of(other)
+        if other_cents is None:
+            return NotImplemented
+        return Money(self.cents - other_cents)
+
+    def __rsub__(self, other):
+        other_cents = _cents_of(other)
+        if other_cents is None:
+            return NotImplemented
+        return Money(other_cents - self.cents)
+
+    def __mul__(self, factor):
+        if isinstance(factor, Money) or not isinstance(factor, (int, float, Decimal)):
+            return NotImplemented
+        cents = (Decimal(self.cents) * Decimal(str(factor))).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return Money(int(cents))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """除法用于计算比例，结果为 float"""
+        if isinstance(other, Money):
+            return self.cents / other.cents
+        if isinstance(other, (int, float, Decimal)):
+            return float(self) / float(other)
+        return NotImplemented
+
+    def _compare(self, other, op):
+        if isinstance(other, Money):
+            return op(self.cents, other.cents)
+        if isinstance(other, bool) or not isinstance(other, (int, float, Decimal)):
+            return NotImplemented
+        return op(self.yuan, other)
+
+    def __eq__(self, other):
+        return self._compare(other, lambda a, b: a == b)
+
+    def __lt__(self, other):
+        return self._compare(other, lambda a, b: a < b)
+
+    def __le__(self, other):
+        return self._compare(other, lambda a, b: a <= b)
+
+    def __gt__(self, other):
+        return self._compare(other, lambda a, b: a > b)
+
+    def __ge__(self, other):
+        return self._compare(other, lambda a, b: a >= b)
+
+
+def _cents_of(value):
+    """把 Money 或以“元”为单位的数字换算成分，无法换算时返回 None"""
+    if isinstance(value, Money):
+        return value.cents
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        return None
+    return Money.from_yuan(value).cents
+
+
+def to_cents(value):
+    """把写入数据库的金额参数（Money、数字或空值）统一换算为整数分"""
+    return Money.from_yuan(value).cents
+
+
+def money_row_factory(cursor, row):
+    """行工厂：把金额列中的整数分转换为 Money，其余与 sqlite3.Row 相同"""
+    indexes = _money_column_indexes(tuple(column[0] for column in cursor.description))
+    if indexes:
+        row = list(row)
+        for index in indexes:
+            if type(row[index]) is int:
+                row[index] = Money(row[index])
+        row = tuple(row)
+    return sqlite3.Row(cursor, row)
+
+
+_index_cache = {}
+
+
+def _money_column_indexes(columns):
+    indexes = _index_cache.get(columns)
+    if indexes is None:
+        indexes = tuple(i for i, name in enumerate(columns) if name in MONEY_COLUMNS)
+        if len(_index_cache) > 256:
+            _index_cache.clear()
+        _index_cache[columns] = indexes
+    return indexes
+
+
+# 允许直接把 Money 作为SQL参数传入
+sqlite3.register_adapter(Money, lambda money: money.cents)
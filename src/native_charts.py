@@ -0,0 +1,320 @@
+"""
+原生图表控件模块
+用 QPainter 直接绘制统计页面的圆环图和每日收支折线图，不依赖 matplotlib：
+启动时无需导入 matplotlib，重绘只是几十个矢量图元，没有布局计算和光栅化开销。
+接受与 matplotlib 渲染相同的图表描述（chart_specs.PieChart / TrendChart），颜色取自其中的主题颜色。
+"""
+
+import math
+
+from PyQt6.QtCore import QPointF, QRectF, QSize, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QPainter, QPainterPath, QPen, QPolygonF
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+
+from chart_specs import TREND_SERIES
+
+
+def _font(pixel_size, bold=False):
+    font = QFont()
+    font.setPixelSize(pixel_size)
+    font.setBold(bold)
+    return font
+
+
+def _nice_ticks(low, high, count=6, min_step=1):
+    """覆盖 [low, high] 的整刻度，刻度间隔取 1、2、2.5、5 乘以 10 的幂，且不小于 min_step（金额刻度为整元）"""
+    if high <= low:
+        low, high = low - 1, high + 1
+    raw_step = max((high - low) / count, min_step)
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    for multiple in (1, 2, 2.5, 5, 10):
+        step = multiple * magnitude
+        if step >= raw_step:
+            break
+    first = math.floor(low / step) * step
+    last = math.ceil(high / step) * step
+    return [first + i * step for i in range(round((last - first) / step) + 1)]
+
+
+class _NativeChart(QWidget):
+    """原生图表控件基类，接口与 chart_rendering.ChartView 相同"""
+
+    TITLE_SIZE = 16
+    TEXT_SIZE = 12
+
+    def __init__(self, figsize=(4, 3), parent=None):
+        super().__init__(parent)
+        self.figsize = figsize
+        self._spec = None
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    @property
+    def spec(self):
+        """当前显示的图表描述"""
+        return self._spec
+
+    @property
+    def pending(self):
+        """直接在 paintEvent 中绘制，没有未完成的后台绘制"""
+        return False
+
+    def set_chart(self, spec):
+        """显示新的图表描述"""
+        self._spec = spec
+        self.update()
+
+    def sizeHint(self):
+        return QSize(int(self.figsize[0] * 100), int(self.figsize[1] * 100))
+
+    def minimumSizeHint(self):
+        return QSize(10, 10)
+
+    def _draw_title(self, painter, text_color):
+        """在顶部居中绘制标题，返回标题下方的纵坐标"""
+        painter.setFont(_font(self.TITLE_SIZE, bold=True))
+        painter.setPen(QColor(text_color))
+        height = QFontMetricsF(painter.font()).height()
+        painter.drawText(QRectF(0, 8, self.width(), height), Qt.AlignmentFlag.AlignCenter, self._spec.title)
+        return 8 + height + 8
+
+    def _draw_centered(self, painter, text, text_color, pixel_size=15):
+        painter.setFont(_font(pixel_size))
+        painter.setPen(QColor(text_color))
+        painter.drawText(QRectF(self.rect()), Qt.AlignmentFlag.AlignCenter, text)
+
+    def paintEvent(self, event):
+        if self._spec is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.fillRect(self.rect(), QColor(self._spec.theme[1]))
+        self._paint_chart(painter)
+        painter.end()
+
+    def _paint_chart(self, painter):
+        raise NotImplementedError
+
+
+class DonutChartWidget(_NativeChart):
+    """原生圆环图：扇区颜色依次取主题图表颜色，显示类别名称和百分比"""
+
+    HOLE_RATIO = 0.4        # 中心圆半径 / 外半径，与 matplotlib 版本一致
+    LABEL_DISTANCE = 1.1    # 类别名称到圆心的距离 / 外半径
+    PCT_DISTANCE = 0.7      # 百分比位于圆环中间
+    MIN_PCT_FRACTION = 0.04  # 太小的扇区不显示百分比，避免文字重叠
+
+    @staticmethod
+    def slice_colors(count, theme_colors):
+        """扇区颜色：依次使用主题图表颜色，超出时循环并逐轮调亮"""
+        colors = []
+        for i in range(count):
+            color = QColor(theme_colors[i % len(theme_colors)]) if theme_colors else QColor.fromHsv(i * 37 % 360, 160, 220)
+            if theme_colors and i >= len(theme_colors):
+                color = color.lighter(100 + 25 * (i // len(theme_colors)))
+            colors.append(color)
+        return colors
+
+    def _paint_chart(self, painter):
+        spec = self._spec
+        theme_colors, theme_bg, theme_text, theme_border = spec.theme
+        top = self._draw_title(painter, theme_text)
+        total = sum(spec.values)
+        if not spec.values or total <= 0:
+            self._draw_centered(painter, '暂无数据', theme_text)
+            return
+
+        # 留出两侧类别名称的宽度后确定外半径
+        label_font = _font(self.TEXT_SIZE)
+        metrics = QFontMetricsF(label_font)
+        label_width = max(metrics.horizontalAdvance(label) for label in spec.labels)
+        area = QRectF(0, top, self.width(), self.height() - top)
+        radius = min(area.width() / 2 - label_width - 12, area.height() / 2 - metrics.height()) / self.LABEL_DISTANCE
+        radius = max(radius, 10.0)
+        center = area.center()
+        outer = QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius)
+        hole = radius * self.HOLE_RATIO
+        inner = QRectF(center.x() - hole, center.y() - hole, 2 * hole, 2 * hole)
+
+        colors = [QColor(color) for color in spec.colors] if spec.colors else \
+            self.slice_colors(len(spec.values), theme_colors)
+        # 扇区：从 12 点方向开始逆时针排列
+        painter.setPen(QPen(QColor(theme_bg), 2))
+        start = 90.0
+        angles = []
+        for value, color in zip(spec.values, colors):
+            span = 360.0 * value / total
+            path = QPainterPath()
+            path.arcMoveTo(outer, start)
+            path.arcTo(outer, start, span)
+            path.arcTo(inner, start + span, -span)
+            path.closeSubpath()
+            painter.setBrush(color)
+            painter.drawPath(path)
+            angles.append((start + span / 2, value / total))
+            start += span
+
+        # 中心圆
+        painter.setPen(QPen(QColor(theme_border), 2))
+        painter.setBrush(QColor(theme_bg))
+        painter.drawEllipse(inner)
+
+        # 类别名称和百分比
+        painter.setFont(label_font)
+        painter.setPen(QColor(theme_text))
+        text_height = metrics.height()
+        for label, (angle, fraction) in zip(spec.labels, angles):
+            x, y = math.cos(math.radians(angle)), -math.sin(math.radians(angle))
+            anchor = QPointF(center.x() + self.LABEL_DISTANCE * radius * x, center.y() + self.LABEL_DISTANCE * radius * y)
+            width = metrics.horizontalAdvance(label) + 2
+            left = anchor.x() if x > 0 else anchor.x() - width
+            painter.drawText(QRectF(left, anchor.y() - text_height / 2, width, text_height),
+                             Qt.AlignmentFlag.AlignCenter, label)
+            if fraction >= self.MIN_PCT_FRACTION:
+                pct = QPointF(center.x() + self.PCT_DISTANCE * radius * x, center.y() + self.PCT_DISTANCE * radius * y)
+                painter.drawText(QRectF(pct.x() - 30, pct.y() - text_height / 2, 60, text_height),
+                                 Qt.AlignmentFlag.AlignCenter, '%1.1f%%' % (100 * fraction))
+
+
+class TrendChartWidget(_NativeChart):
+    """原生每日收支折线图：收入、支出、净收支三条折线，带网格、图例和金额刻度"""
+
+    TICK_SIZE = 11
+    MARKER_SIZE = 7
+
+    def _draw_marker(self, painter, marker, point):
+        half = self.MARKER_SIZE / 2
+        if marker == 's':
+            painter.drawRect(QRectF(point.x() - half, point.y() - half, self.MARKER_SIZE, self.MARKER_SIZE))
+        elif marker == '^':
+            painter.drawPolygon(QPolygonF([QPointF(point.x(), point.y() - half - 1),
+                                           QPointF(point.x() - half - 1, point.y() + half),
+                                           QPointF(point.x() + half + 1, point.y() + half)]))
+        else:
+            painter.drawEllipse(point, half, half)
+
+    def _paint_chart(self, painter):
+        spec = self._spec
+        _theme_colors, theme_bg, theme_text, theme_border = spec.theme
+        top = self._draw_title(painter, theme_text)
+        if not spec.dates:
+            painter.setPen(QPen(QColor(theme_border), 1))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRect(QRectF(16, top, self.width() - 32, self.height() - top - 16))
+            self._draw_centered(painter, spec.empty_text, theme_text, 14)
+            return
+
+        series = (spec.incomes, spec.expenses, spec.net_incomes)
+        values = [value for values in series for value in values]
+        low, high = min(values), max(values)
+        margin = (high - low) * 0.05 or 1
+        ticks = _nice_ticks(low - margin, high + margin)
+        y_min, y_max = ticks[0], ticks[-1]
+        count = len(spec.dates)
+        x_margin = 0.05 * (count - 1) if count > 1 else 0.5
+        x_min, x_max = -x_margin, count - 1 + x_margin
+
+        # 根据刻度文字计算绘图区域
+        tick_font = _font(self.TICK_SIZE)
+        tick_metrics = QFontMetricsF(tick_font)
+        label_font = _font(self.TEXT_SIZE)
+        label_height = QFontMetricsF(label_font).height()
+        tick_labels = [f'¥{tick:.0f}' for tick in ticks]
+        left = 12 + label_height + 6 + max(tick_metrics.horizontalAdvance(text) for text in tick_labels) + 6
+        date_width = max(tick_metrics.horizontalAdvance(date) for date in spec.dates)
+        plot_width = self.width() - left - 16
+        rotate = date_width * count > plot_width * 0.8
+        date_height = (date_width + tick_metrics.height()) * math.sqrt(0.5) if rotate else tick_metrics.height()
+        bottom = 6 + date_height + 6 + label_height + 8
+        plot = QRectF(left, top, max(plot_width, 10), max(self.height() - top - bottom, 10))
+
+        def map_x(x):
+            return plot.left() + (x - x_min) / (x_max - x_min) * plot.width()
+
+        def map_y(y):
+            return plot.bottom() - (y - y_min) / (y_max - y_min) * plot.height()
+
+        # 网格和刻度
+        grid_color = QColor(theme_text)
+        grid_color.setAlphaF(0.15)
+        painter.setFont(tick_font)
+        for tick, text in zip(ticks, tick_labels):
+            y = map_y(tick)
+            painter.setPen(QPen(grid_color, 1))
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(QColor(theme_text))
+            painter.drawText(QRectF(0, y - tick_metrics.height() / 2, left - 6, tick_metrics.height()),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, text)
+        for i, date in enumerate(spec.dates):
+            x = map_x(i)
+            painter.setPen(QPen(grid_color, 1))
+            painter.drawLine(QPointF(x, plot.top()), QPointF(x, plot.bottom()))
+            painter.setPen(QColor(theme_text))
+            if rotate:
+                # 与 matplotlib 版本相同，日期旋转 45 度，文字末端对齐刻度
+                painter.save()
+                painter.translate(x, plot.bottom() + 6)
+                painter.rotate(-45)
+                width = tick_metrics.horizontalAdvance(date)
+                painter.drawText(QRectF(-width, 0, width, tick_metrics.height()),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTop, date)
+                painter.restore()
+            else:
+                painter.drawText(QRectF(x - date_width, plot.bottom() + 6, 2 * date_width, tick_metrics.height()),
+                                 Qt.AlignmentFlag.AlignCenter, date)
+        painter.setPen(QPen(QColor(theme_border), 1))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRect(plot)
+
+        # 坐标轴标题
+        painter.setFont(label_font)
+        painter.setPen(QColor(theme_text))
+        painter.drawText(QRectF(plot.left(), self.height() - 8 - label_height, plot.width(), label_height),
+                         Qt.AlignmentFlag.AlignCenter, '日期')
+        painter.save()
+        painter.translate(12, plot.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-plot.height() / 2, 0, plot.height(), label_height),
+                         Qt.AlignmentFlag.AlignCenter, '金额 (¥)')
+        painter.restore()
+
+        # 折线和数据点
+        painter.save()
+        painter.setClipRect(plot)
+        for (label, color, marker, style), values in zip(TREND_SERIES, series):
+            points = [QPointF(map_x(i), map_y(value)) for i, value in enumerate(values)]
+            pen = QPen(QColor(color), 2)
+            if style == '--':
+                pen.setStyle(Qt.PenStyle.DashLine)
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawPolyline(QPolygonF(points))
+            painter.setPen(QPen(QColor(color), 1))
+            painter.setBrush(QColor(color))
+            for point in points:
+                self._draw_marker(painter, marker, point)
+        painter.restore()
+
+        # 图例（右上角）
+        legend_metrics = QFontMetricsF(label_font)
+        row_height = legend_metrics.height() + 4
+        legend_width = 36 + max(legend_metrics.horizontalAdvance(item[0]) for item in TREND_SERIES) + 10
+        legend = QRectF(plot.right() - legend_width - 8, plot.top() + 8, legend_width, row_height * len(TREND_SERIES) + 8)
+        legend_bg = QColor(theme_bg)
+        legend_bg.setAlphaF(0.8)
+        painter.setPen(QPen(QColor(theme_border), 1))
+        painter.setBrush(legend_bg)
+        painter.drawRoundedRect(legend, 3, 3)
+        for row, (label, color, marker, style) in enumerate(TREND_SERIES):
+            y = legend.top() + 4 + row * row_height + row_height / 2
+            pen = QPen(QColor(color), 2)
+            if style == '--':
+                pen.setStyle(Qt.PenStyle.DashLine)
+            painter.setPen(pen)
+            painter.drawLine(QPointF(legend.left() + 6, y), QPointF(legend.left() + 30, y))
+            painter.setPen(QPen(QColor(color), 1))
+            painter.setBrush(QColor(color))
+            self._draw_marker(painter, marker, QPointF(legend.left() + 18, y))
+            painter.setPen(QColor(theme_text))
+            painter.drawText(QRectF(legend.left() + 36, y - row_height / 2, legend_width - 36, row_height),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, label)
@@ -0,0 +1,121 @@
+"""
+区间统计快照模块
+一次查询取得某个日期区间内的全部统计数据（收支汇总、类别、账户、销账、退款），
+由 PeriodSnapshot 在内存中完成分组汇总，避免统计页面每次刷新都多次扫描同一区间。
+"""
+
+from dataclasses import dataclass, field
+
+from money import Money
+
+
+@dataclass
+class PeriodSnapshot:
+    """某个日期区间的统计快照
+
+    类别统计同时保存主类别和子类别两种层级，切换统计层级时无需重新查询。
+    类别列表的元素为 (名称, 金额, 笔数)，账户列表的元素为 (账户, 收入, 支出, 笔数)，
+    与 get_category_statistics / get_account_statistics 的返回格式一致，均按金额降序排列。
+    """
+
+    start_date: str
+    end_date: str
+    ledger_id: int = None
+
+    gross_income: Money = field(default_factory=Money)    # 收入总额
+    total_refund: Money = field(default_factory=Money)    # 收入退款
+    gross_expense: Money = field(default_factory=Money)   # 支出总额（原始金额之和，为负数）
+    expense_refund: Money = field(default_factory=Money)  # 支出退款报销
+
+    settled_amount: Money = field(default_factory=Money)    # 已销账支出
+    unsettled_amount: Money = field(default_factory=Money)  # 未销账支出
+
+    expense_amount: Money = field(default_factory=Money)  # 支出金额绝对值之和
+    expense_count: int = 0
+    refund_count: int = 0
+
+    categories: dict = field(default_factory=dict)  # {(收支类型, 层级): [(名称, 金额, 笔数), ...]}
+    accounts: list = field(default_factory=list)
+
+    @property
+    def actual_income(self):
+        """实际收入 = 收入总额 - 退款总额"""
+        return self.gross_income - self.total_refund
+
+    @property
+    def actual_expense(self):
+        """实际支出 = 支出总额 - 退款报销总额"""
+        return self.gross_expense - self.expense_refund
+
+    @property
+    def net_income(self):
+        """净收入 = 实际收入 - 实际支出"""
+        return self.actual_income - self.actual_expense
+
+    @property
+    def settled_total(self):
+        return self.settled_amount + self.unsettled_amount
+
+    @property
+    def settled_ratio(self):
+        """已销账金额占比（百分比）"""
+        total = self.settled_total
+        return self.settled_amount / total * 100 if total > 0 else 0.0
+
+    @property
+    def refund_ratio(self):
+        """支出退款占比（百分比）"""
+        if not self.expense_refund or self.expense_amount <= 0:
+            return 0.0
+        return self.expense_refund / self.expense_amount * 100
+
+    def category_stats(self, transaction_type, level="parent"):
+        """指定收支类型和层级的类别统计，level 为 parent 以外的值时按子类别统计"""
+        key = (transaction_type, "parent" if level == "parent" else "sub")
+        return self.categories.get(key, [])
+
+    @classmethod
+    def from_rows(cls, start_date, end_date, ledger_id, rows):
+        """由按 (收支类型, 类别, 账户, 销账状态) 分组的汇总行构建快照
+
+        每行依次为: 收支类型, 主类别, 子类别, 账户名称(可为空), 是否销账,
+        收入, 支出, 退款, 笔数, 退款笔数，其中收入和支出均为非负的 Money。
+        """
+        snapshot = cls(start_date, end_date, ledger_id)
+        category_totals = {}
+        account_totals = {}
+
+        for (transaction_type, parent_category, sub_category, account, is_settled,
+             income, expense, refund, count, refund_count) in rows:
+            amount = income + expense
+            if transaction_type == "收入":
+                snapshot.gross_income += income - expense
+                snapshot.total_refund += refund
+            elif transaction_type == "支出":
+                snapshot.gross_expense += income - expense
+                snapshot.expense_refund += refund
+                snapshot.expense_amount += amount
+                snapshot.expense_count += count
+                snapshot.refund_count += refund_count
+                if is_settled == 1:
+                    snapshot.settled_amount += amount
+                else:
+                    snapshot.unsettled_amount += amount
+
+            for level, name in (("parent", parent_category), ("sub", sub_category)):
+                totals = category_totals.setdefault((transaction_type, level), {})
+                total_amount, total_count = totals.get(name, (Money(0), 0))
+                totals[name] = (total_amount + amount, total_count + count)
+
+            if account is not None:
+                acc_income, acc_expense, acc_count = account_totals.get(account, (Money(0), Money(0), 0))
+                account_totals[account] = (acc_income + income, acc_expense + expense, acc_count + count)
+
+        for key, totals in category_totals.items():
+            snapshot.categories[key] = sorted(
+                ((name, amount, count) for name, (amount, count) in totals.items()),
+                key=lambda item: item[1], reverse=True)
+        snapshot.accounts = sorted(
+            ((name, income, expense, count) for name, (income, expense, count) in account_totals.items()),
+            key=lambda item: item[1] + item[2], reverse=True)
+        return snapshot
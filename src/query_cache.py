@@ -0,0 +1,126 @@
+"""
+查询结果缓存模块
+按“方法名 + 参数”缓存 DatabaseManager 只读方法的返回值。
+缓存与数据库版本绑定：本进程每次写入都会增加写入代数，其他进程的提交通过
+PRAGMA data_version 感知；版本变化后全部缓存立即失效，命中的结果总是与数据库一致。
+缓存按最近最少使用（LRU）淘汰，同时限制条目数和结果总行数。
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+
+def _result_size(value):
+    """估算结果占用的行数，用于限制缓存总量"""
+    if isinstance(value, (list, dict)):
+        return max(1, len(value))
+    if isinstance(value, tuple):
+        return max(1, sum(_result_size(item) for item in value if isinstance(item, (list, dict, tuple))))
+    return 1
+
+
+class QueryCache:
+    """带数据库版本校验的 LRU 查询缓存
+
+    version_fn 返回当前数据库版本（可比较是否相等的任意值），每次查找时调用；
+    版本与缓存中记录的不同时清空全部条目。写入缓存时携带查询开始前取得的版本，
+    查询期间数据库发生变化的结果不会被缓存。
+    """
+
+    def __init__(self, version_fn, max_entries=256, max_rows=100000):
+        self.version_fn = version_fn
+        self.max_entries = max(0, int(max_entries))
+        self.max_rows = max(1, int(max_rows))
+        self._entries = OrderedDict()  # key -> (结果, 行数)
+        self._rows = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def lookup(self, key):
+        """查找缓存，返回 (是否命中, 结果, 当前版本)"""
+        with self._lock:
+            version = self._sync_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None, version
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0], version
+
+    def store(self, key, value, version):
+        """缓存查询结果；version 为查询前 lookup 返回的版本，版本已变化时丢弃结果"""
+        size = _result_size(value)
+        if size > self.max_rows:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._rows -= old[1]
+            self._entries[key] = (value, size)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                _key, (_value, old_size) = self._entries.popitem(last=False)
+                self._rows -= old_size
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self._version = None
+
+    def _sync_version(self):
+        """取得当前数据库版本，版本变化时清空缓存；调用方需持有锁"""
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._rows = 0
+            self._version = version
+        return version
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def cached_query(method):
+    """把 DatabaseManager 的只读方法接入 self._query_cache
+
+    参数先按方法签名补全默认值再作为缓存键，位置参数和关键字参数写法不同的调用共用同一条缓存；
+    参数不可哈希时直接查询。缓存的结果为共享对象，调用方不应修改。
+    """
+    signature = inspect.signature(method)
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self._query_cache
+        if not cache.enabled:
+            return method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (name,) + tuple(bound.arguments.values())[1:]
+        try:
+            hit, value, version = cache.lookup(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        if hit:
+            return value
+
+        value = method(self, *args, **kwargs)
+        cache.store(key, value, version)
+        return value
+
+    return wrapper
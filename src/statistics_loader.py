@@ -0,0 +1,142 @@
+"""
+后台统计加载模块
+统计页面的查询在 QThreadPool 的工作线程中执行，结果以信号送回界面线程。
+每次请求带有递增的代数，发出新请求时旧请求的结果直接丢弃，
+正在执行的 SQLite 查询通过 Connection.interrupt() 中断，连续切换时间段不会排队执行多次完整刷新。
+中断只能打断正在执行的查询，由多个查询组成的请求在各步骤之间调用 check_current() 及时退出。
+"""
+
+import sqlite3
+import threading
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class StaleRequest(Exception):
+    """请求已被更新的请求取代，由 StatisticsLoader.check_current() 在工作线程中抛出"""
+
+
+class _LoadTask(QRunnable):
+    """一次在线程池中执行的统计请求，记录执行线程以便过期时中断查询"""
+
+    def __init__(self, loader, generation, fn, args):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.thread_id = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        try:
+            # 排队期间已有更新的请求，不再执行
+            if self.loader.is_current(self.generation):
+                self._execute()
+        finally:
+            self.loader._finish(self)
+
+    def _execute(self):
+        with self.lock:
+            self.thread_id = threading.get_ident()
+        self.loader._local.generation = self.generation
+        try:
+            result = self.fn(*self.args)
+        except StaleRequest:
+            return
+        except Exception as e:
+            # 过期请求被中断时的 "interrupted" 错误不必输出
+            if not (isinstance(e, sqlite3.OperationalError) and not self.loader.is_current(self.generation)):
+                traceback.print_exc()
+            self.loader.done.emit(self.generation, False, str(e))
+            return
+        finally:
+            self.loader._local.generation = None
+            with self.lock:
+                self.thread_id = None
+        self.loader.done.emit(self.generation, True, result)
+
+
+class StatisticsLoader(QObject):
+    """后台统计加载器
+
+    request(fn, *args) 在工作线程中执行 fn(*args)，完成后在界面线程中发出 loaded(result)，
+    出错时发出 failed(错误信息)；只有最近一次请求的结果会发出。
+    fn 中只能访问数据库，不能操作界面控件；由多步查询组成时在步骤之间调用 check_current()。
+    """
+
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    done = pyqtSignal(int, bool, object)  # 工作线程发出 (代数, 是否成功, 结果)，在界面线程中过滤过期结果
+
+    def __init__(self, db_manager, parent=None, max_threads=2):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._generation = 0
+        self._running = []  # 已提交且尚未结束的请求，包括已过期但仍在执行的请求
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, min(max_threads, db_manager.max_readers)))
+        self.done.connect(self._on_done)
+
+    @property
+    def generation(self):
+        """最近一次请求的代数"""
+        return self._generation
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def check_current(self):
+        """在请求函数中调用：当前工作线程执行的请求已过期时抛出 StaleRequest，结束该请求"""
+        generation = getattr(self._local, 'generation', None)
+        if generation is not None and not self.is_current(generation):
+            raise StaleRequest()
+
+    def request(self, fn, *args):
+        """发出新的统计请求并返回其代数，之前未完成的请求随之作废"""
+        with self._lock:
+            self._generation += 1
+            self._interrupt_running()
+            task = _LoadTask(self, self._generation, fn, args)
+            self._running.append(task)
+        self._pool.start(task)
+        return task.generation
+
+    def cancel(self):
+        """作废全部未完成的请求"""
+        with self._lock:
+            self._generation += 1
+            self._interrupt_running()
+
+    def _interrupt_running(self):
+        """中断过期请求正在执行的查询；调用方需持有 _lock
+
+        过期请求在结束前一直保留在 _running 中：中断时恰好处于两次查询之间的请求，
+        在下一次新请求时仍会再次被中断。
+        """
+        for task in self._running:
+            if task.generation == self._generation:
+                continue
+            with task.lock:
+                if task.thread_id is not None:
+                    self.db_manager.interrupt_reads(task.thread_id)
+
+    def _finish(self, task):
+        """请求在工作线程中结束（包括未执行和过期退出）"""
+        with self._lock:
+            self._running.remove(task)
+
+    def _on_done(self, generation, succeeded, result):
+        if not self.is_current(generation):
+            return
+        if succeeded:
+            self.loaded.emit(result)
+        else:
+            self.failed.emit(result)
+
+    def wait_for_done(self, msecs=-1):
+        """等待线程池中的请求全部结束（结果仍需事件循环送达），用于退出前和脚本中"""
+        return self._pool.waitForDone(msecs)
@@ -1,9 +1,9 @@
 import json
 import os
-import matplotlib
-import matplotlib.pyplot as plt
+import sys
 from PyQt6.QtWidgets import QWidget
 from PyQt6.QtCore import Qt
+from money import to_cents
 
 
 class ThemeManager:
@@ -377,7 +377,14 @@ class ThemeManager:
         self.update_matplotlib_colors()
     
     def update_matplotlib_colors(self):
-        """更新matplotlib图表颜色"""
+        """更新matplotlib图表颜色
+
+        统计图表默认不使用 matplotlib，尚未加载时不在这里导入；加载图表工具模块时会按当前主题设置。
+        """
+        if 'matplotlib.pyplot' not in sys.modules:
+            return
+        import matplotlib
+        import matplotlib.pyplot as plt
         colors = self.get_current_theme()["colors"]
         
         # 设置图表样式
@@ -420,7 +427,7 @@ theme_manager = ThemeManager()
 
 
 def number_to_chinese(num):
-    """将数字转换为中文大写"""
+    """将金额（Money 或以元为单位的数字）转换为中文大写"""
     if num == 0:
         return "零元整"
     
@@ -428,13 +435,8 @@ def number_to_chinese(num):
     units = ['', '拾', '佰', '仟']
     big_units = ['', '万', '亿']
     
-    # 处理小数部分
-    integer_part = int(num)
-    decimal_part = round((num - integer_part) * 100)
-    
-    if decimal_part >= 100:
-        integer_part += decimal_part // 100
-        decimal_part = decimal_part % 100
+    # 按分拆分整数和小数部分，避免浮点误差
+    integer_part, decimal_part = divmod(to_cents(num), 100)
     
     result = ""
     
@@ -0,0 +1,212 @@
+"""
+交易记录表格模型
+为主界面的交易记录 QTableView 提供数据：按页从数据库加载交易记录，
+视图滚动到底部时再加载下一页；单元格文本只在 data() 中为可见行生成。
+显示关键字搜索结果时，鼠标悬停可查看命中的高亮片段。
+数据变更后根据变更事件只更新受影响的行，不重新加载整个表格。
+"""
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from change_events import TRANSACTION_ADDED, TRANSACTION_DELETED
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """按需分页加载的交易记录模型
+
+    数据行与 transaction_details 视图的列顺序一致：
+    (id, ledger_id, transaction_date, transaction_type, category, subcategory,
+     amount, account, description, is_settled, refund_amount, refund_reason, created_time)
+    """
+
+    HEADERS = ["日期", "类型", "主类别", "子类别", "金额", "账户", "备注", "销账", "退款金额", "退款原因", "创建时间"]
+
+    def __init__(self, db_manager, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self._rows = []
+        self._highlights = {}
+        self._ledger_id = None
+        self._next_token = None
+        self._has_more = False
+        self._paged = False  # 是否为分页加载的账本记录（而不是搜索结果）
+
+    def set_ledger(self, ledger_id):
+        """切换到指定账本，重新从第一页开始加载"""
+        self.beginResetModel()
+        self._rows = []
+        self._highlights = {}
+        self._ledger_id = ledger_id
+        self._next_token = None
+        self._has_more = ledger_id is not None
+        self._paged = ledger_id is not None
+        self.endResetModel()
+        if self._has_more:
+            self.fetchMore(QModelIndex())
+
+    def set_rows(self, rows, highlights=None):
+        """直接显示给定的交易记录（如搜索结果），不再分页加载
+
+        highlights 为 {交易ID: 高亮片段}，作为该行的悬停提示显示。
+        """
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._highlights = highlights or {}
+        self._next_token = None
+        self._has_more = False
+        self._paged = False
+        self.endResetModel()
+
+    def clear(self):
+        """清空表格"""
+        self.beginResetModel()
+        self._rows = []
+        self._highlights = {}
+        self._ledger_id = None
+        self._next_token = None
+        self._has_more = False
+        self._paged = False
+        self.endResetModel()
+
+    def apply_changes(self, events):
+        """根据变更事件更新已加载的行
+
+        修改和删除的记录原地更新或移除；账本记录中新增的记录插入到排序位置，
+        位于尚未加载的页中时留待滚动加载。显示搜索结果时不插入新增记录。
+        批量写入的事件不带记录ID，此时重新加载账本记录。
+        """
+        events = [event for event in events
+                  if event.is_transaction and self._ledger_id is not None and event.affects_ledger(self._ledger_id)]
+        if self._paged and any(event.record_id is None for event in events):
+            self.set_ledger(self._ledger_id)
+            return
+
+        for event in events:
+            if event.record_id is None:
+                continue
+            if event.kind == TRANSACTION_DELETED:
+                self._remove_transaction(event.record_id)
+                continue
+            row = self.db_manager.get_transaction(event.record_id)
+            if row is None:
+                self._remove_transaction(event.record_id)
+            elif self._paged:
+                self._remove_transaction(event.record_id)
+                self._insert_transaction(row)
+            elif event.kind != TRANSACTION_ADDED:
+                self._replace_transaction(row)
+
+    def _find_row(self, transaction_id):
+        for row, transaction in enumerate(self._rows):
+            if transaction[0] == transaction_id:
+                return row
+        return None
+
+    @staticmethod
+    def _sort_key(transaction):
+        # 与 get_transactions_page 的排序一致：日期、创建时间、ID 均为降序
+        return transaction[2], transaction[12], transaction[0]
+
+    def _remove_transaction(self, transaction_id):
+        row = self._find_row(transaction_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    def _insert_transaction(self, transaction):
+        key = self._sort_key(transaction)
+        row = next((i for i, existing in enumerate(self._rows) if self._sort_key(existing) < key), len(self._rows))
+        if row == len(self._rows) and self._has_more:
+            return  # 属于尚未加载的页
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, transaction)
+        self.endInsertRows()
+
+    def _replace_transaction(self, transaction):
+        row = self._find_row(transaction[0])
+        if row is None:
+            return
+        self._rows[row] = transaction
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def transaction_at(self, row):
+        """获取指定行的交易记录，行号无效时返回 None"""
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._highlights.get(self._rows[index.row()][0])
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        (trans_id, ledger_id, transaction_date, transaction_type, category, subcategory,
+         amount, account, description, is_settled, refund_amount,
+         refund_reason, created_time) = self._rows[index.row()]
+
+        column = index.column()
+        if column == 0:
+            return transaction_date
+        if column == 1:
+            return transaction_type
+        if column == 2:
+            return category
+        if column == 3:
+            return subcategory
+        if column == 4:
+            return f"¥{abs(amount):.2f}"
+        if column == 5:
+            return account or ""
+        if column == 6:
+            return description or ""
+        if column == 7:
+            return "是" if is_settled else "否"
+        if column == 8:
+            return f"¥{refund_amount:.2f}" if refund_amount > 0 else ""
+        if column == 9:
+            return refund_reason or ""
+        if column == 10:
+            return created_time
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        """加载下一页交易记录"""
+        if parent.isValid() or not self._has_more:
+            return
+
+        rows, self._next_token = self.db_manager.get_transactions_page(
+            self._ledger_id, self.page_size, self._next_token)
+        self._has_more = self._next_token is not None
+        if not rows:
+            return
+
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
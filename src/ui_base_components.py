@@ -1,13 +1,16 @@
 """
 基础UI组件模块 - 提供通用的UI组件和功能
 """
+import threading
+
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGroupBox, 
                             QFormLayout, QLabel, QPushButton, QLineEdit, 
                             QTextEdit, QComboBox, QCheckBox, QDoubleSpinBox, 
                             QScrollArea, QWidget, QMessageBox)
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QObject, pyqtSignal
 from PyQt6.QtGui import QFont
 from theme_manager import theme_manager
+from money import Money
 
 
 class BaseDialog(QDialog):
@@ -370,7 +373,7 @@ class BaseEditDialog(BaseTransactionDialog):
          refund_reason, created_time) = self.transaction_data
         
         self.date_edit.setDate(QDate.fromString(transaction_date, "yyyy-MM-dd"))
-        self.amount_spin.setValue(abs(amount))
+        self.amount_spin.setValue(float(abs(amount)))
         self.account_combo.setCurrentText(account or "")
         self.description_edit.setText(description or "")
         
@@ -384,7 +387,7 @@ class BaseEditDialog(BaseTransactionDialog):
         # 支出特有字段
         if transaction_type == "支出" and hasattr(self, 'settled_check'):
             self.settled_check.setChecked(is_settled)
-            self.refund_amount_spin.setValue(refund_amount)
+            self.refund_amount_spin.setValue(float(refund_amount or 0))
             self.refund_reason_edit.setText(refund_reason or "")
 
 
@@ -558,7 +561,7 @@ class BaseAccountDialog(BaseDialog):
             'name': self.name_edit.text(),
             'type': self.type_combo.currentText(),
             'bank': self.bank_edit.text(),
-            'balance': self.balance_spin.value(),
+            'balance': Money.from_yuan(self.balance_spin.value()),
             'description': self.description_edit.toPlainText()
         }
 
@@ -644,7 +647,7 @@ class BaseTransferDialog(BaseDialog):
             'transfer_date': self.date_edit.date().toString("yyyy-MM-dd"),
             'from_account': from_account,
             'to_account': to_account,
-            'amount': self.amount_spin.value(),
+            'amount': Money.from_yuan(self.amount_spin.value()),
             'description': self.description_edit.text()
         }
 
@@ -726,7 +729,7 @@ class BaseBudgetDialog(BaseDialog):
         return {
             'category': self.category_combo.currentText(),
             'budget_type': budget_type,
-            'amount': self.amount_spin.value(),
+            'amount': Money.from_yuan(self.amount_spin.value()),
             'warning_threshold': self.threshold_spin.value(),
             'start_date': self.start_date_edit.date().toString("yyyy-MM-dd"),
             'end_date': self.end_date_edit.date().toString("yyyy-MM-dd") if self.end_date_check.isChecked() else None
@@ -815,6 +818,44 @@ class FeatureExtensionManager:
 extension_manager = FeatureExtensionManager()
 
 
+class DataChangeNotifier(QObject):
+    """把数据库变更事件转到界面线程
+
+    订阅 db_manager.changes，在界面线程中以 changed 信号发出事件元组，
+    并执行扩展管理器的 "data_changed" 钩子。同一轮事件循环内收到的事件合并为一次通知，
+    连续多次写入（如修改转账时的多次余额调整）只触发一次界面刷新。
+    """
+
+    changed = pyqtSignal(object)
+    _received = pyqtSignal()
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._received.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+        self._unsubscribe = db_manager.changes.subscribe(self._on_changes)
+
+    def _on_changes(self, events):
+        """在写入线程中调用，只暂存事件并唤醒界面线程"""
+        with self._lock:
+            wake = not self._pending
+            self._pending.extend(events)
+        if wake:
+            self._received.emit()
+
+    def _dispatch(self):
+        with self._lock:
+            events, self._pending = tuple(self._pending), []
+        if events:
+            self.changed.emit(events)
+            extension_manager.execute_hooks("data_changed", events)
+
+    def detach(self):
+        """取消订阅，之后不再发出通知"""
+        self._unsubscribe()
+
+
 class DialogFactory:
     """对话框工厂类，统一管理对话框的创建"""
     
@@ -972,6 +1013,22 @@ class ConfigManager:
         """设置上次统计视图"""
         self.set_setting("last_stats_view", view)
     
+    def get_chart_renderer(self):
+        """获取统计图表的绘制方式：native（QPainter 原生绘制）或 matplotlib"""
+        return self.get_setting("chart_renderer", "native")
+    
+    def set_chart_renderer(self, renderer):
+        """设置统计图表的绘制方式"""
+        self.set_setting("chart_renderer", renderer)
+    
+    def get_use_chart_disk_cache(self):
+        """获取是否把统计图表缓存到磁盘"""
+        return self.get_setting("use_chart_disk_cache", False, bool)
+    
+    def set_use_chart_disk_cache(self, value):
+        """设置是否把统计图表缓存到磁盘"""
+        self.set_setting("use_chart_disk_cache", value)
+    
     def save_window_geometry(self, window):
         """保存窗口几何信息"""
         self.set_setting("geometry", window.saveGeometry())